@@ -0,0 +1,256 @@
+"""
+Command line entry point to plot the flux data of a catalogue of sites without a display, e.g. on batch nodes.
+
+The run is described by a TOML (or YAML) configuration file whose keys are the inputs of
+plot_flux_results_multiple_sites.plot_multi_site_flux_data. Relative paths are relative to the configuration file.
+For example:
+
+    observation_folder = "Flux/"
+    JULES_run_folders = ["JULES_fsmc_run/", "JULES_root_weighted_run/"]
+    JULES_labels = ["JULES soil root conductance", "JULES root weighted"]
+    stress_indicator = ["beta", "beta"]
+    output_folder = "figures/"
+    smoothing = 5
+    data_colours = ["blue", "red"]
+    observation_colour = "orange"
+
+Run it with:
+    jules-plot-sites run.toml --jobs 4 --sites AT-Neu US-Ha1 --start 2003-01-01 --end 2003-12-31
+or, for nightly refreshes that only replot the sites whose files or settings have changed:
+    jules-plot-sites run.toml --skip-unchanged
+or list the sites that would be plotted with:
+    jules-plot-sites run.toml --dry-run
+
+The plotting modules are only imported once the arguments have been read, after selecting the non-interactive Agg
+backend, so the help and dry runs start quickly.
+"""
+
+import argparse
+import sys
+from os import sep
+from os.path import abspath, dirname, join, normpath, splitext
+
+# The configuration keys, the inputs of plot_multi_site_flux_data
+REQUIRED_CONFIG_KEYS = ["observation_folder", "JULES_run_folders", "JULES_labels", "output_folder",
+                        "stress_indicator"]
+OPTIONAL_CONFIG_KEYS = ["smoothing", "smoothing_type", "data_colours", "observation_colour", "percentiles", "n_jobs",
+                        "cache_folder", "window_export", "instrumentation_file", "instrumentation_memory",
+                        "observation_file_pattern", "JULES_file_pattern", "catalogue_index_file", "decimation",
+                        "sites", "exclude_sites", "time_range", "site_time_ranges", "skip_unchanged",
+                        "align_observations", "model_time_offset", "observation_time_offset",
+                        "site_observation_time_offsets", "chunk_days"]
+
+# The configuration keys holding paths, which are made relative to the configuration file
+PATH_CONFIG_KEYS = ["observation_folder", "JULES_run_folders", "output_folder", "cache_folder",
+                    "instrumentation_file", "catalogue_index_file"]
+
+
+def load_run_config(config_file):
+    """
+    Load a run configuration file.
+
+    Args:
+    config_file (str): The TOML (.toml) or YAML (.yaml, .yml) configuration file.
+
+    Returns:
+    config (dict): The inputs of plot_multi_site_flux_data, with the paths in the file, which are relative to the
+                   configuration file, made absolute.
+    """
+
+    extension = splitext(config_file)[1].lower()
+
+    if(extension == ".toml"):
+        import tomllib
+
+        with open(config_file, "rb") as file:
+            config = tomllib.load(file)
+
+    elif(extension in [".yaml", ".yml"]):
+        try:
+            import yaml
+        except ImportError as error:
+            raise ImportError("Reading YAML configuration files requires PyYAML. Install it or use a TOML "
+                              "configuration file.") from error
+
+        with open(config_file) as file:
+            config = yaml.safe_load(file)
+
+    else:
+        raise ValueError("The configuration file must be a TOML (.toml) or YAML (.yaml, .yml) file.")
+
+    if(type(config) != dict):
+        raise ValueError("The configuration file " + str(config_file) + " must hold a table of settings.")
+
+    # Check the keys
+    missing_keys = [key for key in REQUIRED_CONFIG_KEYS if key not in config]
+    if(len(missing_keys) > 0):
+        raise ValueError("The configuration file " + str(config_file) + " is missing the settings "
+                         + str(missing_keys) + ".")
+
+    unknown_keys = [key for key in config if key not in REQUIRED_CONFIG_KEYS + OPTIONAL_CONFIG_KEYS]
+    if(len(unknown_keys) > 0):
+        raise ValueError("Unknown settings " + str(unknown_keys) + " in the configuration file " + str(config_file)
+                         + ". Must be from " + str(REQUIRED_CONFIG_KEYS + OPTIONAL_CONFIG_KEYS) + ".")
+
+    # Make the paths relative to the configuration file
+    config_folder = dirname(abspath(config_file))
+    for key in PATH_CONFIG_KEYS:
+        if(config.get(key) is None):
+            continue
+
+        if(type(config[key]) == list):
+            config[key] = [_config_path(config_folder, path) for path in config[key]]
+        else:
+            config[key] = _config_path(config_folder, config[key])
+
+    # The site folders are added to the end of the output folder
+    if(not config["output_folder"].endswith(sep)):
+        config["output_folder"] = config["output_folder"] + sep
+
+    return config
+
+
+def main(argv = None):
+    """
+    Plot the flux data of the sites in a run configuration file.
+
+    Args:
+    argv (list): The command line arguments. If None the arguments of the script are used.
+
+    Returns:
+    exit_code (int): 0 if every site was plotted (or listed), 1 if any site failed.
+    """
+
+    parser = argparse.ArgumentParser(description = "Plot the flux data of a catalogue of sites from a TOML or YAML "
+                                                   "run configuration file.")
+    parser.add_argument("config_file", help = "The run configuration file.")
+    parser.add_argument("--jobs", type = int, default = None,
+                        help = "The number of worker processes. Overrides n_jobs in the configuration file.")
+    parser.add_argument("--sites", nargs = "+", default = None,
+                        help = "The sites to plot, e.g. AT-Neu US-Ha1. Overrides sites in the configuration file.")
+    parser.add_argument("--exclude-sites", nargs = "+", default = None,
+                        help = "The sites not to plot. Overrides exclude_sites in the configuration file.")
+    parser.add_argument("--start", default = None,
+                        help = "The first time to plot for every site, e.g. 2003-01-01. Overrides time_range in the "
+                               "configuration file.")
+    parser.add_argument("--end", default = None,
+                        help = "The last time to plot for every site, e.g. 2003-12-31. A date includes the whole of "
+                               "that day. Overrides time_range in the configuration file.")
+    parser.add_argument("--skip-unchanged", action = "store_true",
+                        help = "Skip the sites whose input files and settings are unchanged since their figures "
+                               "were saved.")
+    parser.add_argument("--dry-run", action = "store_true",
+                        help = "List the sites and files that would be plotted without reading, plotting or writing "
+                               "anything.")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_run_config(args.config_file)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    if(args.jobs is not None):
+        config["n_jobs"] = args.jobs
+
+    if(args.sites is not None):
+        config["sites"] = args.sites
+
+    if(args.exclude_sites is not None):
+        config["exclude_sites"] = args.exclude_sites
+
+    if(args.start is not None or args.end is not None):
+        config["time_range"] = [args.start, args.end]
+
+    if(args.skip_unchanged):
+        config["skip_unchanged"] = True
+
+    if(args.dry_run):
+        _print_dry_run(config)
+        return 0
+
+    # Select the non-interactive backend before pyplot is imported by the plotting modules
+    import matplotlib
+    matplotlib.use("Agg")
+
+    from JULES_Plotting_and_Analysis.src.plotting.plot_flux_results_multiple_sites import plot_multi_site_flux_data
+
+    summary = plot_multi_site_flux_data(**config)
+
+    if(len(summary["failed"]) > 0):
+        return 1
+
+    return 0
+
+
+def _print_dry_run(config):
+    """
+    Print the sites, and their files, that a run configuration would plot.
+    The folders are scanned (or their saved indexes reused) to find the sites, but nothing is written.
+
+    Args:
+    config (dict): The run configuration, see load_run_config.
+
+    Returns:
+    None
+    """
+
+    from JULES_Plotting_and_Analysis.src.site_catalogue import (get_site_catalogue, filter_site_catalogue,
+                                                                normalise_site_name, OBSERVATION_FILE_PATTERN,
+                                                                JULES_FILE_PATTERN)
+
+    collated_sites_files = get_site_catalogue(config["observation_folder"], config["JULES_run_folders"],
+                                              observation_file_pattern = config.get("observation_file_pattern",
+                                                                                    OBSERVATION_FILE_PATTERN),
+                                              JULES_file_pattern = config.get("JULES_file_pattern",
+                                                                              JULES_FILE_PATTERN),
+                                              index_file = config.get("catalogue_index_file"),
+                                              save_index = False)
+    collated_sites_files = filter_site_catalogue(collated_sites_files, config.get("sites"),
+                                                 config.get("exclude_sites"))
+
+    site_time_ranges = {normalise_site_name(site): time_range
+                        for site, time_range in (config.get("site_time_ranges") or {}).items()}
+    site_observation_time_offsets = {normalise_site_name(site): offset
+                                     for site, offset in (config.get("site_observation_time_offsets") or {}).items()}
+
+    for site_files in collated_sites_files:
+        print(site_files[0] + " -> " + config["output_folder"] + site_files[0] + sep)
+
+        time_range = site_time_ranges.get(site_files[0], config.get("time_range"))
+        if(time_range is not None):
+            print("    time range: " + str(time_range[0]) + " to " + str(time_range[1]))
+
+        if(config.get("align_observations")):
+            observation_time_offset = site_observation_time_offsets.get(site_files[0],
+                                                                         config.get("observation_time_offset"))
+            print("    observations aligned, time offset: " + str(observation_time_offset or 0) + " hours")
+
+        print("    observation: " + site_files[1])
+        for label, file_path in zip(config["JULES_labels"], site_files[2:]):
+            print("    " + str(label) + ": " + file_path)
+
+    print(str(len(collated_sites_files)) + " sites would be plotted.")
+
+    return None
+
+
+def _config_path(config_folder, path):
+    """
+    Make a path in a configuration file absolute.
+
+    Args:
+    config_folder (str): The folder holding the configuration file.
+    path (str): The path, absolute or relative to the configuration file.
+
+    Returns:
+    path (str): The path. Absolute paths are unchanged.
+    """
+
+    if(type(path) != str):
+        raise ValueError("The paths in the configuration file must be strings.")
+
+    return normpath(join(config_folder, path))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
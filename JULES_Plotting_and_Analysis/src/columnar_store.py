@@ -0,0 +1,305 @@
+"""
+Export JULES output and observation files to a memory mapped columnar store, and load them back.
+
+A store is a folder holding one NumPy .npy file for each variable and coordinate, with the decoded values, and a
+metadata.json file with the dimensions and attributes. Loading a store memory maps the .npy files, so no NetCDF
+decoding is done and only the parts of each variable that are used are read from disk. Time selections are
+views of the memory mapped arrays.
+
+The store uses NumPy files rather than Zarr or Parquet, so it needs no packages beyond NumPy. Each variable is a
+separate column file, and its time steps are contiguous on disk. A time selection therefore only reads the pages
+holding those time steps, which is what partitioning the files by time would give.
+
+Convert a file from the command line with:
+    python -m JULES_Plotting_and_Analysis.src.columnar_store <JULES output file> <store folder>
+"""
+
+import argparse
+import json
+from os import listdir, makedirs, remove, stat
+from os.path import abspath, exists, join
+
+import numpy as np
+from pandas import Timestamp
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.load_jules_output_file import load_jules_output_file_xarray, get_time_range_bounds
+
+# The name of the metadata file in a store
+METADATA_FILE = "metadata.json"
+
+# The number of time steps converted at once when exporting, bounds the memory used
+EXPORT_BLOCK_SIZE = 2 ** 16
+
+
+def export_columnar_store(file_path, store_folder, variables = None, time_range = None, overwrite = False):
+    """
+    Export a JULES output file to a columnar store.
+
+    Args:
+    file_path (str): The file path to the JULES output file.
+    store_folder (str): The folder to write the store to.
+    variables (list, str): The variables to export. If None all variables are exported.
+    time_range (list): The range of times to export, in the form [start, end], see load_jules_output_file_xarray.
+    overwrite (bool): Whether to export the file again if the store is already up to date with it.
+
+    Returns:
+    store_folder (str): The folder the store was written to.
+    """
+
+    if(not overwrite and is_columnar_store_current(store_folder, file_path, variables, time_range)):
+        return store_folder
+
+    data_xarray = load_jules_output_file_xarray(file_path, variables = variables, time_range = time_range)
+
+    # Check every variable can be stored without pickling
+    unsupported_keys = [key for key in data_xarray.variables if data_xarray[key].dtype.kind == "O"]
+    if(len(unsupported_keys) > 0):
+        raise ValueError("The variables " + str(unsupported_keys) + " have an object data type and can not be "
+                         "exported. Select the other variables with the variables input.")
+
+    makedirs(store_folder, exist_ok = True)
+
+    # Remove the metadata of any previous export first, so the store is not used while it is rewritten
+    if(exists(join(store_folder, METADATA_FILE))):
+        remove(join(store_folder, METADATA_FILE))
+
+    source_stat = stat(file_path)
+    metadata = {"source_file": abspath(file_path),
+                "source_mtime_ns": source_stat.st_mtime_ns,
+                "source_size": source_stat.st_size,
+                "selected_variables": variables,
+                "time_range": None if time_range is None else [_time_string(time) for time in time_range],
+                "attrs": _json_attrs(data_xarray.attrs),
+                "variables": {}}
+
+    for key in data_xarray.variables:
+        data_array = data_xarray[key]
+        file_name = key + ".npy"
+
+        # Write the variable in blocks of time steps so only one block is decoded at a time
+        values = np.lib.format.open_memmap(join(store_folder, file_name), mode = "w+", dtype = data_array.dtype,
+                                           shape = data_array.shape)
+
+        if(data_array.ndim > 0 and data_array.dims[0] == "time"):
+            for start in range(0, data_array.shape[0], EXPORT_BLOCK_SIZE):
+                end = min(start + EXPORT_BLOCK_SIZE, data_array.shape[0])
+                values[start:end] = data_array.variable[start:end].values
+        else:
+            values[...] = data_array.values
+
+        values.flush()
+        del values
+
+        metadata["variables"][key] = {"file": file_name,
+                                      "dims": list(data_array.dims),
+                                      "attrs": _json_attrs(data_array.attrs),
+                                      "coordinate": key in data_xarray.coords}
+
+    # The metadata is written last, so a store is only used once it is complete
+    with open(join(store_folder, METADATA_FILE), "w") as file:
+        json.dump(metadata, file, indent = 1)
+
+    # Remove the files of variables from previous exports that are not in this one
+    store_files = [variable_metadata["file"] for variable_metadata in metadata["variables"].values()]
+    for file_name in listdir(store_folder):
+        if(file_name.endswith(".npy") and file_name not in store_files):
+            remove(join(store_folder, file_name))
+
+    return store_folder
+
+
+def load_columnar_store(store_folder, variables = None, time_range = None):
+    """
+    Load a columnar store as an xarray dataset backed by memory mapped arrays.
+
+    Args:
+    store_folder (str): The folder holding the store.
+    variables (list, str): The variables to load. If None all variables are loaded.
+    time_range (list): The range of times to load, in the form [start, end]. The start and end are inclusive and
+                       either can be None to leave that side of the range open. An end without a time of day
+                       includes the whole of that day, see load_jules_output_file.get_time_range_bounds.
+                       If None all times are loaded.
+
+    Returns:
+    data_xarray (xarray.Dataset): The dataset. The arrays are read only views of the store's files.
+    """
+
+    metadata = _load_metadata(store_folder)
+    if(metadata is None):
+        raise ValueError("No columnar store found in " + str(store_folder) + ".")
+
+    # Check that variables is a list
+    if(type(variables) == str):
+        variables = [variables]
+    elif(variables is not None and type(variables) != list):
+        raise ValueError("The input variables must be a string or list of variable names.")
+
+    if(variables is not None):
+        missing_variables = [key for key in variables if key not in metadata["variables"]]
+        if(len(missing_variables) > 0):
+            raise ValueError("The variables " + str(missing_variables) + " are not in the store.")
+
+    # Find the time steps to load, as a slice so the arrays stay views of the files
+    time_slice = slice(None)
+    if(time_range is not None and "time" in metadata["variables"]):
+        if(type(time_range) not in [list, tuple] or len(time_range) != 2):
+            raise ValueError("The input time_range must be a list of the form [start, end].")
+
+        time_values = _load_array(store_folder, metadata, "time")
+        start_time, end_time = get_time_range_bounds(time_range)
+
+        start = 0 if start_time is None else np.searchsorted(time_values, np.datetime64(start_time), side = "left")
+        end = len(time_values) if end_time is None else np.searchsorted(time_values, np.datetime64(end_time),
+                                                                        side = "right")
+        time_slice = slice(int(start), int(end))
+
+    data_vars = {}
+    coords = {}
+    for key, variable_metadata in metadata["variables"].items():
+        # Coordinates are always loaded
+        if(variables is not None and key not in variables and not variable_metadata["coordinate"]):
+            continue
+
+        values = _load_array(store_folder, metadata, key)
+        dims = variable_metadata["dims"]
+
+        if("time" in dims):
+            index = [slice(None)] * len(dims)
+            index[dims.index("time")] = time_slice
+            values = values[tuple(index)]
+
+        variable = xr.Variable(dims, values, attrs = variable_metadata["attrs"])
+
+        if(variable_metadata["coordinate"]):
+            coords[key] = variable
+        else:
+            data_vars[key] = variable
+
+    return xr.Dataset(data_vars, coords = coords, attrs = metadata["attrs"])
+
+
+def is_columnar_store_current(store_folder, file_path, variables = None, time_range = None):
+    """
+    Check if a columnar store was exported from the current version of a file with the same selection.
+
+    Args:
+    store_folder (str): The folder holding the store.
+    file_path (str): The file path to the JULES output file.
+    variables (list, str): The variables exported.
+    time_range (list): The range of times exported.
+
+    Returns:
+    current (bool): Whether the store is up to date.
+    """
+
+    metadata = _load_metadata(store_folder)
+    if(metadata is None or not exists(file_path)):
+        return False
+
+    source_stat = stat(file_path)
+
+    return (metadata["source_file"] == abspath(file_path)
+            and metadata["source_mtime_ns"] == source_stat.st_mtime_ns
+            and metadata["source_size"] == source_stat.st_size
+            and metadata["selected_variables"] == variables
+            and metadata["time_range"] == (None if time_range is None else
+                                           [_time_string(time) for time in time_range]))
+
+
+def _load_metadata(store_folder):
+    """
+    Load the metadata of a columnar store.
+
+    Args:
+    store_folder (str): The folder holding the store.
+
+    Returns:
+    metadata (dict): The metadata. None if there is no complete store in the folder.
+    """
+
+    metadata_path = join(store_folder, METADATA_FILE)
+    if(not exists(metadata_path)):
+        return None
+
+    try:
+        with open(metadata_path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _load_array(store_folder, metadata, key):
+    """
+    Memory map the array of a variable in a columnar store.
+
+    Args:
+    store_folder (str): The folder holding the store.
+    metadata (dict): The metadata of the store.
+    key (str): The variable.
+
+    Returns:
+    values (np.memmap): The read only memory mapped array.
+    """
+
+    return np.load(join(store_folder, metadata["variables"][key]["file"]), mmap_mode = "r")
+
+
+def _json_attrs(attrs):
+    """
+    Convert attributes to values that can be saved as JSON.
+
+    Args:
+    attrs (dict): The attributes.
+
+    Returns:
+    attrs_out (dict): The attributes with NumPy values converted to Python values and others to strings.
+    """
+
+    attrs_out = {}
+    for key, value in attrs.items():
+        if(isinstance(value, (np.ndarray, np.generic))):
+            value = value.tolist()
+
+        if(not isinstance(value, (str, int, float, bool, list)) and value is not None):
+            value = str(value)
+
+        attrs_out[key] = value
+
+    return attrs_out
+
+
+def _time_string(time):
+    """
+    Convert a time to a string, used to record the exported time range.
+
+    Args:
+    time (datetime, date, str): The time. Can be None.
+
+    Returns:
+    time_string (str): The time in ISO format. None if the time is None.
+    """
+
+    if(time is None):
+        return None
+
+    return Timestamp(time).isoformat()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = "Export a JULES output file to a memory mapped columnar store.")
+    parser.add_argument("file_path", help = "The JULES output file.")
+    parser.add_argument("store_folder", help = "The folder to write the store to.")
+    parser.add_argument("--variables", nargs = "+", default = None, help = "The variables to export.")
+    parser.add_argument("--start", default = None, help = "The first time to export, e.g. 2005-01-01.")
+    parser.add_argument("--end", default = None, help = "The last time to export, e.g. 2010-12-31.")
+    parser.add_argument("--overwrite", action = "store_true", help = "Export again even if the store is current.")
+    args = parser.parse_args()
+
+    time_range = None
+    if(args.start is not None or args.end is not None):
+        time_range = [args.start, args.end]
+
+    export_columnar_store(args.file_path, args.store_folder, variables = args.variables, time_range = time_range,
+                          overwrite = args.overwrite)
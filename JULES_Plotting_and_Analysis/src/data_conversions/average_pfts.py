@@ -2,8 +2,13 @@
     Functions to calculate different averages over plant functional types (PFTs).
 """
 
+import warnings
+import numpy as np
 import xarray as xr
 
+# The reductions over the plant functional types (PFTs) that reduce_pfts can calculate
+PFT_REDUCTIONS = ["mean", "sum"]
+
 def mean_pfts(data_xarray, col_ids):
     """
     Calculate the mean value of the input data_xarray over the plant functional types (PFTs).
@@ -22,12 +27,12 @@ def mean_pfts(data_xarray, col_ids):
     elif(type(col_ids) != list):
         raise ValueError("The input col_ids must be a string or list of column IDs.")
 
-    # Generate the new column IDs for the mean values
-    new_col_ids = [col_id + "_mean" for col_id in col_ids]
+    # Calculate the mean value of the input data_xarray over the plant functional types (PFTs)
+    # The new variables are added to the input dataset, see reduce_pfts to get a new dataset instead
+    data_xarray_out = reduce_pfts(data_xarray, col_ids, "mean")
 
-    for i in range(len(col_ids)):
-        # Calculate the mean value of the input data_xarray over the plant functional types (PFTs)
-        data_xarray[new_col_ids[i]] = data_xarray[col_ids[i]].mean(dim='pft')
+    for col_id in col_ids:
+        data_xarray[col_id + "_mean"] = data_xarray_out[col_id + "_mean"]
 
     return data_xarray
 
@@ -49,11 +54,121 @@ def sum_pfts(data_xarray, col_ids):
     elif(type(col_ids) != list):
         raise ValueError("The input col_ids must be a string or list of column IDs.")
 
-    # Generate the new column IDs for the mean values
-    new_col_ids = [col_id + "_sum" for col_id in col_ids]
+    # Calculate the sum value of the input data_xarray over the plant functional types (PFTs)
+    # The new variables are added to the input dataset, see reduce_pfts to get a new dataset instead
+    data_xarray_out = reduce_pfts(data_xarray, col_ids, "sum")
+
+    for col_id in col_ids:
+        data_xarray[col_id + "_sum"] = data_xarray_out[col_id + "_sum"]
+
+    return data_xarray
+
+def reduce_pfts(data_xarray, col_ids, reduction = "mean", weights = None, suffix = None):
+    """
+    Calculate the mean or sum of several variables over the plant functional types (PFTs) at once.
+
+    Each variable is reduced in a single vectorised operation over the PFT axis, without copying the variables
+    together, and the broadcast weights are shared by the variables of the same shape. Missing (NaN) values are
+    skipped. Weighted reductions use the weights of the PFTs, such as the JULES tile fractions, and
+    skip the weights of missing values, so a weighted mean is over the PFTs with values.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+    col_ids (list, str): The column IDs to reduce. Each must have a 'pft' dimension.
+    reduction (str): The reduction, 'mean' or 'sum'.
+    weights (str, xarray.DataArray): The weight of each PFT. Either the key of a variable in the dataset, such as
+                                     the JULES tile fractions 'frac', or a data array. Variables with a 'tile'
+                                     dimension use the first tiles, which are the PFTs in JULES. If None the PFTs
+                                     are weighted equally.
+    suffix (str): Added to the column IDs to name the new variables. If None '_mean' or '_sum' is used, or
+                  '_weighted_mean' or '_weighted_sum' with weights.
+
+    Returns:
+    data_xarray_out (xarray.Dataset): A new dataset holding the input variables, without copying their data, and
+                                      the reduced variables.
+    """
+
+    # Check that col_ids is a list
+    if(type(col_ids) == str):
+        col_ids = [col_ids]
+    elif(type(col_ids) != list):
+        raise ValueError("The input col_ids must be a string or list of column IDs.")
+
+    if(reduction not in PFT_REDUCTIONS):
+        raise ValueError("The input reduction must be one of " + str(PFT_REDUCTIONS) + ".")
+
+    if(suffix is None):
+        suffix = "_" + reduction if weights is None else "_weighted_" + reduction
+
+    for col_id in col_ids:
+        if("pft" not in data_xarray[col_id].dims):
+            raise ValueError("The variable " + str(col_id) + " does not have a 'pft' dimension.")
+
+    if(weights is not None):
+        weights = _get_pft_weights(data_xarray, weights, data_xarray.sizes["pft"])
+
+    # The weights are broadcast once for each shape of variable. Each variable is reduced separately, so no copy of
+    # all the variables together is made.
+    broadcast_weights = {}
+
+    new_variables = {}
+    for col_id in col_ids:
+        data_array = data_xarray[col_id]
+        values = data_array.data
+        pft_axis = data_array.dims.index("pft")
+
+        with warnings.catch_warnings(), np.errstate(invalid = "ignore", divide = "ignore"):
+            warnings.simplefilter("ignore", category = RuntimeWarning)
+
+            if(weights is None):
+                if(reduction == "mean"):
+                    reduced = np.nanmean(values, axis = pft_axis)
+                else:
+                    reduced = np.nansum(values, axis = pft_axis)
+
+            else:
+                shape_key = (data_array.dims, data_array.shape)
+                if(shape_key not in broadcast_weights):
+                    broadcast_weights[shape_key] = weights.broadcast_like(data_array).transpose(*data_array.dims).data
+
+                # Missing values and missing weights are given no weight
+                weight_values = broadcast_weights[shape_key]
+                weight_values = np.where(np.isnan(values) | np.isnan(weight_values), 0., weight_values)
+
+                reduced = np.nansum(values * weight_values, axis = pft_axis)
+                if(reduction == "mean"):
+                    reduced = reduced / np.sum(weight_values, axis = pft_axis)
+
+        reduced_dims = tuple(dim for dim in data_array.dims if dim != "pft")
+        new_variables[col_id + suffix] = xr.Variable(reduced_dims, reduced, attrs = data_array.attrs)
+
+    # Assign makes a new dataset that shares the data of the input variables
+    return data_xarray.assign(new_variables)
+
+
+def _get_pft_weights(data_xarray, weights, n_pfts):
+    """
+    Get the weight of each plant functional type (PFT).
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+    weights (str, xarray.DataArray): The key of the weights variable in the dataset, or a data array.
+    n_pfts (int): The number of PFTs.
+
+    Returns:
+    weights (xarray.DataArray): The weights with a 'pft' dimension.
+    """
+
+    if(type(weights) == str):
+        weights = data_xarray[weights]
+    elif(type(weights) != xr.DataArray):
+        raise ValueError("The input weights must be a variable key or an xarray.DataArray.")
+
+    # The PFTs are the first JULES tiles
+    if("tile" in weights.dims):
+        weights = weights.isel(tile = slice(0, n_pfts)).rename(tile = "pft")
 
-    for i in range(len(col_ids)):
-        # Calculate the sum value of the input data_xarray over the plant functional types (PFTs)
-        data_xarray[new_col_ids[i]] = data_xarray[col_ids[i]].sum(dim='pft')
+    if("pft" not in weights.dims or weights.sizes["pft"] != n_pfts):
+        raise ValueError("The weights must have a 'pft' dimension, or a 'tile' dimension starting with the PFTs.")
 
-    return data_xarray
\ No newline at end of file
+    return weights.reset_coords(drop = True)
@@ -0,0 +1,185 @@
+"""
+A persistent on-disk cache of daily values calculated from JULES output and observation files.
+
+Each cached entry is a small NetCDF file holding the daily values of one variable for one statistic. Entries
+are keyed by the source file path, its modification time and size, the variable, its dimensions, shape and
+non-time coordinates, the statistic and the time range of the data, so an entry is only reused while the source
+file is unchanged. Variables that have been read into memory, and so may have been edited, are also keyed by
+their values. The cache is limited in size with least recently used entries removed first.
+"""
+
+from hashlib import sha1
+from os import listdir, makedirs, remove, replace, stat, utime, getpid
+from os.path import abspath, join, getmtime, getsize
+
+import numpy as np
+from xarray import open_dataset
+
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import DAILY_STATISTICS, to_daily_value
+
+# The default maximum size of the cache in bytes
+DEFAULT_MAX_CACHE_SIZE = 1024 ** 3
+
+
+def cached_to_daily_value(data_xarray, col_key, statistic, cache_folder = None,
+                          max_cache_size = DEFAULT_MAX_CACHE_SIZE):
+    """
+    Convert a variable of the input xarray dataset into daily values, using the on-disk cache.
+
+    Only variables that are unchanged since they were read from file can be cached. Other variables, and all
+    variables if cache_folder is None, are converted to daily values without the cache.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+    col_key (str): The key for the variable.
+    statistic (str): The daily statistic. One of "total", "mean", "median", "max", "min" or "std".
+    cache_folder (str): The folder holding the cache. If None the cache is not used.
+    max_cache_size (int): The maximum size of the cache in bytes.
+
+    Returns:
+    data_xarray_out (xarray.Dataset): Dataset holding the daily values of the variable.
+    """
+
+    if(statistic not in DAILY_STATISTICS):
+        raise ValueError("Unknown daily statistic '" + str(statistic) + "'. Must be one of "
+                         + str(list(DAILY_STATISTICS.keys())) + ".")
+
+    cache_file = None
+    if(cache_folder is not None):
+        cache_file = get_cache_file_path(data_xarray, col_key, statistic, cache_folder)
+
+    # The variable can not be cached
+    if(cache_file is None):
+        return to_daily_value(data_xarray[[col_key]], statistic)
+
+    # Read the daily values from the cache if they are available
+    try:
+        with open_dataset(cache_file) as cached_file:
+            data_xarray_out = cached_file.load()
+
+        # Mark the entry as recently used
+        utime(cache_file)
+
+        return data_xarray_out
+
+    except (FileNotFoundError, OSError, ValueError):
+        pass
+
+    # Calculate the daily values and add them to the cache. A copy is reduced, so reading a lazy variable does not
+    # load it into memory in the input dataset and change its cache key.
+    data_xarray_out = to_daily_value(data_xarray[[col_key]].copy(deep = True), statistic).compute()
+
+    makedirs(cache_folder, exist_ok = True)
+
+    # Write to a temporary file first so that other processes never read a partly written entry
+    tmp_cache_file = cache_file + "." + str(getpid()) + ".tmp"
+    data_xarray_out.to_netcdf(tmp_cache_file)
+    replace(tmp_cache_file, cache_file)
+
+    evict_daily_value_cache(cache_folder, max_cache_size)
+
+    return data_xarray_out
+
+
+def get_cache_file_path(data_xarray, col_key, statistic, cache_folder):
+    """
+    Get the path of the cache entry for the daily values of a variable.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+    col_key (str): The key for the variable.
+    statistic (str): The daily statistic.
+    cache_folder (str): The folder holding the cache.
+
+    Returns:
+    cache_file (str): The path of the cache entry. None if the variable can not be matched to the data in its
+                      source file, so can not be cached.
+    """
+
+    data_array = data_xarray[col_key]
+
+    # Variables calculated in memory have no source file
+    source = data_array.encoding.get("source")
+    if(source is None or len(data_xarray["time"]) == 0 or "time" not in data_array.dims):
+        return None
+
+    try:
+        source_stat = stat(source)
+    except OSError:
+        return None
+
+    # Variables still read lazily from file are unchanged apart from their selection. A selection along the
+    # other dimensions can not be identified from the variable, so these variables are only cached whole.
+    in_memory = getattr(data_array.variable, "_in_memory", True)
+    original_shape = data_array.encoding.get("original_shape")
+    if(not in_memory):
+        time_axis = data_array.dims.index("time")
+        if(original_shape is None or len(original_shape) != data_array.ndim
+           or tuple(original_shape[:time_axis]) + tuple(original_shape[time_axis + 1:])
+           != data_array.shape[:time_axis] + data_array.shape[time_axis + 1:]):
+            return None
+
+    time_values = data_xarray["time"].values
+
+    key_parts = [abspath(source),
+                 str(source_stat.st_mtime_ns),
+                 str(source_stat.st_size),
+                 col_key,
+                 statistic,
+                 str(time_values[0]),
+                 str(time_values[-1]),
+                 str(len(time_values)),
+                 str(data_array.dims),
+                 str(data_array.shape)]
+
+    # The coordinates of the other dimensions identify selections made along them
+    for coord_key in sorted(data_array.coords):
+        if("time" not in data_array.coords[coord_key].dims):
+            key_parts.append(coord_key + "=" + str(data_array.coords[coord_key].values.tolist()))
+
+    # Variables read into memory may have been edited in place, so their values are part of the key
+    if(in_memory):
+        key_parts.append(sha1(np.ascontiguousarray(data_array.values).tobytes()).hexdigest())
+
+    key = "|".join(key_parts)
+
+    return join(cache_folder, sha1(key.encode()).hexdigest() + ".nc")
+
+
+def evict_daily_value_cache(cache_folder, max_cache_size = DEFAULT_MAX_CACHE_SIZE):
+    """
+    Remove the least recently used entries from the cache until it is no larger than max_cache_size.
+
+    Args:
+    cache_folder (str): The folder holding the cache.
+    max_cache_size (int): The maximum size of the cache in bytes.
+
+    Returns:
+    None
+    """
+
+    cache_files = []
+    for file in listdir(cache_folder):
+        if(file.endswith(".nc")):
+            try:
+                cache_files.append((getmtime(join(cache_folder, file)), getsize(join(cache_folder, file)),
+                                    join(cache_folder, file)))
+            except OSError:
+                # Removed by another process
+                pass
+
+    cache_size = sum([cache_file[1] for cache_file in cache_files])
+
+    # Remove the oldest entries first
+    for mtime, size, path in sorted(cache_files):
+        if(cache_size <= max_cache_size):
+            break
+
+        try:
+            remove(path)
+        except OSError:
+            pass
+
+        cache_size -= size
+
+    return None
@@ -0,0 +1,113 @@
+"""
+Functions to keep a stored daily series up to date with a JULES output file that is still being written.
+
+The daily values are stored in a NetCDF file together with the last time step processed. Each update only
+reads the time steps after the start of the last processed day, converts them to daily values and merges them
+into the stored series, so the cost of an update scales with the new data rather than the full run length.
+"""
+
+from os import getpid, replace
+from os.path import exists
+
+import numpy as np
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.load_jules_output_file import load_jules_output_file_xarray
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import (to_daily_statistics,
+                                                                             get_daily_statistics_labels)
+
+
+def update_daily_value_store(file_path, store_path, variables, statistics = ("total", "mean"), quantiles = None):
+    """
+    Update the stored daily values for a JULES output file with any time steps added since the last update.
+
+    The last stored day is recalculated as it may have been incomplete at the last update. The stored values
+    are recalculated from the start of the file if the file has been restarted (its first time step has changed)
+    or the variables or statistics have changed.
+
+    Args:
+    file_path (str): The file path to the JULES output file.
+    store_path (str): The file path to the NetCDF file holding the stored daily values.
+    variables (list, str): The variables to convert to daily values.
+    statistics (list, str): The daily statistics to calculate, see to_daily_statistics.
+    quantiles (list, float): The daily quantiles to calculate, see to_daily_statistics.
+
+    Returns:
+    data_xarray_daily (xarray.Dataset): All the daily values, with each statistic along the "stat" dimension.
+    """
+
+    if(type(variables) == str):
+        variables = [variables]
+    elif(type(variables) != list):
+        raise ValueError("The input variables must be a string or list of variable names.")
+
+    # Only the time coordinate is read here, the data is read lazily below
+    data_xarray = load_jules_output_file_xarray(file_path, variables = variables)
+    time_values = data_xarray["time"].values
+
+    if(len(time_values) == 0):
+        raise ValueError("The JULES output file " + str(file_path) + " has no time steps.")
+
+    stored_daily = _load_daily_value_store(store_path)
+
+    # Check the stored values can be extended. Otherwise recalculate them from the start of the file.
+    if(stored_daily is not None):
+        if(stored_daily.attrs.get("first_time") != str(time_values[0])
+                or sorted(stored_daily.data_vars) != sorted(variables)
+                or list(stored_daily["stat"].values) != get_daily_statistics_labels(statistics, quantiles)):
+            stored_daily = None
+
+    if(stored_daily is None):
+        # Process the full record
+        data_xarray_daily = to_daily_statistics(data_xarray, statistics, quantiles)
+
+    else:
+        last_time = np.datetime64(stored_daily.attrs["last_processed_time"])
+
+        # Nothing new has been written
+        if(time_values[-1] <= last_time):
+            return stored_daily
+
+        # Process from the start of the last stored day, which may have been incomplete
+        restart_day = last_time.astype("datetime64[D]")
+        new_daily = to_daily_statistics(data_xarray.sel(time = slice(restart_day, None)), statistics, quantiles)
+
+        # Replace the stored values from the restart day onwards with the new values
+        stored_daily = stored_daily.sel(time = stored_daily["time"] < restart_day.astype(time_values.dtype))
+        data_xarray_daily = xr.concat([stored_daily, new_daily], dim = "time", data_vars = "all")
+
+    data_xarray_daily = data_xarray_daily.compute()
+    data_xarray_daily.attrs["source_file"] = str(file_path)
+    data_xarray_daily.attrs["first_time"] = str(time_values[0])
+    data_xarray_daily.attrs["last_processed_time"] = str(time_values[-1])
+
+    # Write to a temporary file first so the store is never left partly written
+    tmp_store_path = store_path + "." + str(getpid()) + ".tmp"
+    data_xarray_daily.to_netcdf(tmp_store_path)
+    replace(tmp_store_path, store_path)
+
+    return data_xarray_daily
+
+
+def _load_daily_value_store(store_path):
+    """
+    Load the stored daily values into memory.
+
+    Args:
+    store_path (str): The file path to the NetCDF file holding the stored daily values.
+
+    Returns:
+    data_xarray_daily (xarray.Dataset): The stored daily values. None if there are no stored values.
+    """
+
+    if(not exists(store_path)):
+        return None
+
+    # Load into memory and close the file so that it can be overwritten
+    with xr.open_dataset(store_path) as store:
+        data_xarray_daily = store.load()
+
+    if("last_processed_time" not in data_xarray_daily.attrs):
+        return None
+
+    return data_xarray_daily
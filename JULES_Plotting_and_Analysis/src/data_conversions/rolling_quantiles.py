@@ -0,0 +1,97 @@
+"""
+Functions to calculate rolling quantiles, such as a rolling median and percentile bands.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import xarray as xr
+
+# The maximum number of values sorted at once. Bounds the memory used independently of the window size.
+DEFAULT_MAX_BLOCK_SIZE = 2 ** 22
+
+
+def rolling_quantiles(data_array, window, quantiles, dim = "time", center = True, min_periods = 1,
+                      max_block_size = DEFAULT_MAX_BLOCK_SIZE):
+    """
+    Calculate several rolling quantiles of the input data array from a single pass over the windows.
+
+    The windows are zero copy views of the data. They are sorted in blocks of at most max_block_size values and
+    every quantile is interpolated from the same sorted windows, so the memory used does not depend on the
+    window size. Missing values are skipped. The results match
+    data_array.rolling(...).construct("tmp").quantile(quantile, dim = "tmp") with the default linear method.
+
+    Args:
+    data_array (xarray.DataArray): The input data array.
+    window (int): The number of values in each window.
+    quantiles (list, float): The quantiles to calculate, between 0 and 1.
+    dim (str): The dimension to roll over.
+    center (bool): Whether to centre the windows on each value. Otherwise each window ends at its value.
+    min_periods (int): The minimum number of non-missing values in a window. Windows with fewer give NaN.
+    max_block_size (int): The maximum number of values sorted at once.
+
+    Returns:
+    data_arrays_out (list): The rolling quantiles, one xarray.DataArray for each quantile.
+    """
+
+    # Check that quantiles is a list
+    if(type(quantiles) in [float, int]):
+        quantiles = [quantiles]
+    elif(type(quantiles) not in [list, tuple]):
+        raise ValueError("The input quantiles must be a float or list of floats.")
+
+    if(type(window) != int or window < 1):
+        raise ValueError("The input window must be a positive integer.")
+
+    # Move the rolling dimension first and flatten the others
+    data_array_tmp = data_array.transpose(dim, ...)
+    values = np.asarray(data_array_tmp.values, dtype = float)
+    n_values = values.shape[0]
+    values = values.reshape(n_values, -1)
+
+    # Pad with missing values so there is a window for every value
+    if(center):
+        n_before = window // 2
+    else:
+        n_before = window - 1
+    n_after = window - 1 - n_before
+
+    values = np.pad(values, ((n_before, n_after), (0, 0)), constant_values = np.nan)
+
+    # Zero copy view of the windows, shape (n_values, n_columns, window)
+    windows = sliding_window_view(values, window, axis = 0)
+
+    out = np.full((len(quantiles), n_values, values.shape[1]), np.nan)
+
+    block_size = max(1, max_block_size // (window * max(1, values.shape[1])))
+
+    for start in range(0, n_values, block_size):
+        end = min(start + block_size, n_values)
+
+        # Sort each window once. Missing values are sorted to the end.
+        sorted_windows = np.sort(windows[start:end], axis = -1)
+        counts = np.sum(~np.isnan(sorted_windows), axis = -1)
+        valid = counts >= max(1, min_periods)
+
+        for i in range(len(quantiles)):
+            # Linear interpolation between the closest ranks, as in numpy.quantile
+            position = quantiles[i] * np.maximum(counts - 1, 0)
+            lower = np.floor(position).astype(int)
+            upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+            fraction = position - lower
+
+            lower_values = np.take_along_axis(sorted_windows, lower[..., None], axis = -1)[..., 0]
+            upper_values = np.take_along_axis(sorted_windows, upper[..., None], axis = -1)[..., 0]
+
+            out[i, start:end] = np.where(valid, lower_values + (upper_values - lower_values) * fraction, np.nan)
+
+    # Restore the shape and dimension order of the input
+    data_arrays_out = []
+    for i in range(len(quantiles)):
+        data_array_out = xr.DataArray(out[i].reshape(data_array_tmp.shape),
+                                      dims = data_array_tmp.dims,
+                                      coords = data_array_tmp.coords,
+                                      name = data_array.name)
+
+        data_arrays_out.append(data_array_out.transpose(*data_array.dims).assign_coords(quantile = quantiles[i]))
+
+    return data_arrays_out
@@ -0,0 +1,126 @@
+"""
+Functions to convert a variable into smoothed daily values in a single step.
+
+The daily values are calculated from the raw time steps, their units converted and the rolling smoothing applied
+to the same NumPy array, so no intermediate datasets are copied. The output has the same layout as
+plot_time_series.smooth_time_series, so it can be plotted with plot_time_series(..., smoothed = True) or used
+directly in analyses.
+"""
+
+import numpy as np
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.instrumentation import timed_stage
+from JULES_Plotting_and_Analysis.src.data_conversions.daily_value_cache import cached_to_daily_value
+from JULES_Plotting_and_Analysis.src.data_conversions.rolling_quantiles import rolling_quantiles
+from JULES_Plotting_and_Analysis.src.data_conversions.unit_conversions import get_unit_scale_factor
+
+
+def to_smoothed_daily_value(data_xarray, col_key, statistic, smoothing = None, smoothing_type = "mean",
+                            percentiles = None, unit_conversion = None, cache_folder = None):
+    """
+    Convert a variable of the input xarray dataset into daily values and smooth them.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+    col_key (str): The key for the variable.
+    statistic (str): The daily statistic, see to_daily_value.DAILY_STATISTICS.
+    smoothing (int): The number of days to smooth the data by. If None no smoothing is applied.
+    smoothing_type (str): The type of smoothing to apply to the data. 'mean' or 'median'.
+    percentiles (list): The percentiles of the band around the median. List of two floats.
+    unit_conversion (str): The unit conversion applied to the daily values, see unit_conversions.UNIT_CONVERSIONS.
+                           If None the units are not converted.
+    cache_folder (str): The folder holding the on-disk cache of daily values. If None the cache is not used.
+
+    Returns:
+    data_xarray_out (xarray.Dataset): Dataset holding the daily values of the variable and the smoothed values,
+                                      'mean' or 'median' and the 'lower' and 'upper' percentile values, as
+                                      returned by smooth_time_series.
+    """
+
+    if(smoothing is not None and smoothing_type not in ["mean", "median"]):
+        raise ValueError("The input smoothing_type must be either 'mean' or 'median'.")
+
+    # Calculate the daily values from the raw time steps (or read them from the cache). Dask backed values are
+    # computed here, as the smoothing works on the NumPy array
+    daily_array = cached_to_daily_value(data_xarray, col_key, statistic, cache_folder)[col_key].load()
+
+    # The daily values are a new array, so floating point values can be converted in place
+    if(unit_conversion is not None):
+        if(daily_array.dtype.kind == "f"):
+            daily_array.values *= get_unit_scale_factor(data_xarray, unit_conversion)
+        else:
+            daily_array = daily_array * get_unit_scale_factor(data_xarray, unit_conversion)
+
+    values = daily_array.values
+
+    data_vars = {col_key: daily_array.variable}
+
+    # Smooth the daily values along the time axis
+    if(smoothing is not None):
+        with timed_stage("smoothing_" + smoothing_type, detail = col_key):
+            if(smoothing_type == "mean"):
+                time_axis = daily_array.dims.index("time")
+                data_vars["mean"] = xr.Variable(daily_array.dims,
+                                                np.moveaxis(rolling_mean(np.moveaxis(values, time_axis, 0),
+                                                                         smoothing), 0, time_axis))
+
+            else:
+                # All the quantiles are calculated from a single pass over the rolling windows
+                quantiles = [.50]
+                if(percentiles is not None):
+                    quantiles += [1 - percentiles[0] / 100., 1 - percentiles[1] / 100.]
+
+                rolling_values = rolling_quantiles(daily_array, smoothing, quantiles, center = True, min_periods = 1)
+
+                data_vars["median"] = rolling_values[0].variable
+                if(percentiles is not None):
+                    data_vars["lower"] = rolling_values[1].variable
+                    data_vars["upper"] = rolling_values[2].variable
+
+    coords = {key: daily_array.coords[key] for key in daily_array.coords}
+
+    return xr.Dataset(data_vars, coords = coords)
+
+
+def rolling_mean(values, window):
+    """
+    Calculate the centred rolling mean along the first axis, skipping missing values.
+
+    Uses cumulative sums, so the cost does not depend on the window size. The results match
+    xarray's rolling(..., center = True, min_periods = 1).mean().
+
+    Args:
+    values (np.ndarray): The values, rolled along the first axis.
+    window (int): The number of values in each window.
+
+    Returns:
+    values_out (np.ndarray): The rolling mean. NaN where a window has no values.
+    """
+
+    if(type(window) != int or window < 1):
+        raise ValueError("The input window must be a positive integer.")
+
+    values = np.asarray(values, dtype = float)
+    n_values = values.shape[0]
+
+    # Each window covers window // 2 values before its value and the rest after, as in xarray
+    n_before = window // 2
+    n_after = window - 1 - n_before
+
+    valid = ~np.isnan(values)
+
+    # Cumulative sums of the values and the number of values, starting from zero
+    zeros = np.zeros((1,) + values.shape[1:])
+    value_sums = np.concatenate([zeros, np.cumsum(np.where(valid, values, 0.), axis = 0)])
+    value_counts = np.concatenate([zeros, np.cumsum(valid, axis = 0)])
+
+    starts = np.clip(np.arange(n_values) - n_before, 0, n_values)
+    ends = np.clip(np.arange(n_values) + n_after + 1, 0, n_values)
+
+    counts = value_counts[ends] - value_counts[starts]
+
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        values_out = (value_sums[ends] - value_sums[starts]) / counts
+
+    return np.where(counts > 0, values_out, np.nan)
@@ -0,0 +1,152 @@
+"""
+Functions to convert JULES output files that are too large to fit in memory into daily values.
+
+The file is opened lazily and its time axis is split into blocks of whole days. Each block is read, reduced to
+daily values and released before the next block is read, so the memory used depends on the block size rather
+than the length of the run. As the blocks start and end on day boundaries, every day is reduced over all of its
+time steps and the daily values are the same as those calculated from the whole file at once.
+"""
+
+import numpy as np
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.load_jules_output_file import (load_jules_output_file_xarray,
+                                                                    get_daily_time_chunks)
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import to_daily_value, to_daily_statistics
+
+# The default number of days in each block
+DEFAULT_BLOCK_DAYS = 365
+
+
+def iter_day_blocks(data_xarray, block_days = DEFAULT_BLOCK_DAYS):
+    """
+    Split the time axis of the input xarray dataset into blocks of whole days.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset. Opened lazily, so each block is only read when used.
+    block_days (int): The number of days in each block.
+
+    Yields:
+    data_xarray_block (xarray.Dataset): The time steps of each block of days, in order.
+    """
+
+    if(type(block_days) != int or block_days < 1):
+        raise ValueError("The input block_days must be a positive integer.")
+
+    block_sizes = get_daily_time_chunks(data_xarray["time"].values, block_days)
+    block_ends = np.cumsum(block_sizes)
+
+    start = 0
+    for end in block_ends:
+        yield data_xarray.isel(time = slice(start, int(end)))
+        start = int(end)
+
+
+def iter_daily_values(data_xarray, statistic = "mean", block_days = DEFAULT_BLOCK_DAYS, quantiles = None):
+    """
+    Convert the input xarray dataset into daily values one block of days at a time.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset. Opened lazily, so each block is only read when used.
+    statistic (str, list): The daily statistic, see to_daily_value.DAILY_STATISTICS. Or a list of statistics,
+                           which are calculated together with to_daily_statistics.
+    block_days (int): The number of days in each block.
+    quantiles (list, float): The daily quantiles calculated with a list of statistics, see to_daily_statistics.
+
+    Yields:
+    data_xarray_daily (xarray.Dataset): The daily values of each block of days, in order.
+    """
+
+    for data_xarray_block in iter_day_blocks(data_xarray, block_days):
+        # Read the block into memory, so the fixed time step method can be used
+        data_xarray_block = data_xarray_block.load()
+
+        if(type(statistic) == str):
+            yield to_daily_value(data_xarray_block, statistic)
+        else:
+            yield to_daily_statistics(data_xarray_block, statistic, quantiles)
+
+        del data_xarray_block
+
+
+def stream_daily_values(file_path, statistic = "mean", variables = None, time_range = None,
+                        block_days = DEFAULT_BLOCK_DAYS, quantiles = None, output_file = None):
+    """
+    Convert a JULES output file into daily values, reading the file one block of days at a time.
+
+    Args:
+    file_path (str): The file path to the JULES output file.
+    statistic (str, list): The daily statistic or statistics, see iter_daily_values.
+    variables (list, str): The variables to convert. If None all variables are converted.
+    time_range (list): The range of times to convert, in the form [start, end], see load_jules_output_file_xarray.
+    block_days (int): The number of days in each block.
+    quantiles (list, float): The daily quantiles calculated with a list of statistics, see to_daily_statistics.
+    output_file (str): NetCDF file to write the daily values to. The daily values of each block are appended to
+                       the file as soon as they are calculated, along an unlimited time dimension, so only one block
+                       is held in memory. Requires netCDF4. If None the daily values are only returned.
+
+    Returns:
+    data_xarray_daily (xarray.Dataset): The daily values. Opened lazily from output_file if it is given, otherwise
+                                        held in memory.
+    """
+
+    data_xarray = load_jules_output_file_xarray(file_path, variables = variables, time_range = time_range)
+
+    if(output_file is not None):
+        n_blocks = 0
+        for data_xarray_daily in iter_daily_values(data_xarray, statistic, block_days, quantiles):
+            if(n_blocks == 0):
+                data_xarray_daily.to_netcdf(output_file, unlimited_dims = ["time"])
+            else:
+                _append_daily_values(output_file, data_xarray_daily)
+            n_blocks += 1
+
+        if(n_blocks == 0):
+            raise ValueError("The JULES output file " + str(file_path) + " has no time steps to convert.")
+
+        return xr.open_dataset(output_file)
+
+    daily_blocks = list(iter_daily_values(data_xarray, statistic, block_days, quantiles))
+
+    if(len(daily_blocks) == 0):
+        raise ValueError("The JULES output file " + str(file_path) + " has no time steps to convert.")
+
+    # Variables without a time dimension are the same in every block
+    time_keys = [key for key in daily_blocks[0].data_vars if "time" in daily_blocks[0][key].dims]
+
+    return xr.concat(daily_blocks, dim = "time", data_vars = time_keys)
+
+
+def _append_daily_values(output_file, data_xarray_daily):
+    """
+    Append the daily values of a block to a NetCDF file along its unlimited time dimension.
+
+    Args:
+    output_file (str): The NetCDF file, holding the daily values of the previous blocks.
+    data_xarray_daily (xarray.Dataset): The daily values of the block, with the same variables as the file.
+
+    Returns:
+    None
+    """
+
+    import netCDF4
+
+    with netCDF4.Dataset(output_file, "a") as output:
+        n_days = len(output.dimensions["time"])
+        time_slice = slice(n_days, n_days + data_xarray_daily.sizes["time"])
+
+        # The times are encoded with the units and calendar the first block was written with
+        time_variable = output.variables["time"]
+        time_variable[time_slice] = netCDF4.date2num(data_xarray_daily["time"].to_index().to_pydatetime(),
+                                                     time_variable.units,
+                                                     getattr(time_variable, "calendar", "standard"))
+
+        for key in data_xarray_daily.variables:
+            if(key == "time" or "time" not in data_xarray_daily[key].dims):
+                continue
+
+            variable = output.variables[key]
+            values = data_xarray_daily[key].transpose(*variable.dimensions).values
+            variable[tuple(time_slice if dim == "time" else slice(None) for dim in variable.dimensions)] = values
+
+    return None
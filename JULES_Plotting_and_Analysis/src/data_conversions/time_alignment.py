@@ -0,0 +1,305 @@
+"""
+Functions to align observation and JULES output time series onto a shared time axis.
+
+Observation files and JULES outputs often differ in their time step, the part of each time step their times label
+(e.g. FLUXNET times label the start of each half hour and JULES times the end) and their time zone (FLUXNET uses
+local standard time, JULES usually UTC). The alignment shifts each time axis by an offset, then maps every time
+step of both series onto the shared time axis on the coarser of the two time steps, over the period both cover.
+
+The mapping (the join indices) only depends on the time axes, so it is calculated once and reused for every variable
+and for every dataset on the same time axis, e.g. several JULES runs of a site. The values are then co-located by
+averaging the time steps that fall in each shared time step, so they can be compared element by element.
+"""
+
+from collections import namedtuple, OrderedDict
+from datetime import timedelta
+import hashlib
+import numpy as np
+from pandas import Timedelta
+import xarray as xr
+
+# The join indices between a JULES output and an observation time axis
+# time: The shared time values, np.datetime64. Each labels the start of a shared time step, in the time frame of the
+#       shifted times.
+# timestep: The shared time step, np.timedelta64.
+# model_bins: The shared time step each JULES output time step falls in, -1 if it is outside the shared period.
+# observation_bins: The shared time step each observation time step falls in, -1 if it is outside the shared period.
+TimeAlignment = namedtuple("TimeAlignment", ["time", "timestep", "model_bins", "observation_bins"])
+
+# The number of alignments kept in memory
+MAX_CACHED_ALIGNMENTS = 64
+
+# The cached alignments, {key: TimeAlignment}, oldest first
+_alignment_cache = OrderedDict()
+
+
+def get_time_alignment(model_times, observation_times, model_time_offset = None, observation_time_offset = None):
+    """
+    Get the join indices between a JULES output and an observation time axis.
+
+    The alignments are cached in memory, so aligning more variables or datasets on the same time axes is free.
+    The time axes are identified by a hash of all their times, so axes with different gaps are never confused.
+
+    Args:
+    model_times (np.ndarray): The JULES output time values, np.datetime64, sorted in ascending order.
+    observation_times (np.ndarray): The observation time values, np.datetime64, sorted in ascending order.
+    model_time_offset (float, timedelta): Added to the JULES output times before aligning them. Hours, or a
+                                          timedelta. E.g. -0.5 for half hourly times that label the end of each
+                                          time step. If None the times are not shifted.
+    observation_time_offset (float, timedelta): Added to the observation times before aligning them. Hours, or a
+                                                timedelta. E.g. minus the UTC offset of the site to convert local
+                                                standard time to UTC. If None the times are not shifted.
+
+    Returns:
+    alignment (TimeAlignment): The join indices.
+    """
+
+    model_times = np.asarray(model_times).astype("datetime64[ns]", copy = False)
+    observation_times = np.asarray(observation_times).astype("datetime64[ns]", copy = False)
+    model_time_offset = _to_timedelta64(model_time_offset)
+    observation_time_offset = _to_timedelta64(observation_time_offset)
+
+    # Reuse the alignment of the same time axes
+    key = _get_alignment_key(model_times, observation_times, model_time_offset, observation_time_offset)
+    if(key in _alignment_cache):
+        _alignment_cache.move_to_end(key)
+        return _alignment_cache[key]
+
+    model_times = model_times + model_time_offset
+    observation_times = observation_times + observation_time_offset
+
+    model_timestep = _get_timestep(model_times, "model_times")
+    observation_timestep = _get_timestep(observation_times, "observation_times")
+
+    # The shared time steps are those of the coarser series, so each of its time steps is a shared time step
+    if(observation_timestep > model_timestep):
+        timestep = observation_timestep
+        origin = observation_times[0]
+    else:
+        timestep = model_timestep
+        origin = model_times[0]
+
+    # The period covered by both series
+    start = max(model_times[0], observation_times[0])
+    end = min(model_times[-1], observation_times[-1])
+    if(start > end):
+        raise ValueError("The JULES output and observation times do not overlap.")
+
+    first_step = (start - origin) // timestep
+    n_steps = int((end - origin) // timestep - first_step) + 1
+
+    time_values = origin + (first_step + np.arange(n_steps)) * timestep
+
+    alignment = TimeAlignment(time_values, timestep,
+                              _get_time_bins(model_times, origin, timestep, first_step, n_steps),
+                              _get_time_bins(observation_times, origin, timestep, first_step, n_steps))
+
+    _alignment_cache[key] = alignment
+    if(len(_alignment_cache) > MAX_CACHED_ALIGNMENTS):
+        _alignment_cache.popitem(last = False)
+
+    return alignment
+
+
+def colocate_time_series(data_xarray, bins, time_values, keys = None, min_count = 1):
+    """
+    Average the time steps of a dataset onto the shared time axis of an alignment.
+
+    Args:
+    data_xarray (xarray.Dataset): The dataset, the JULES output or observations the bins were calculated for.
+    bins (np.ndarray): The shared time step of each time step of the dataset, -1 if it is outside the shared
+                       period. TimeAlignment.model_bins or TimeAlignment.observation_bins.
+    time_values (np.ndarray): The shared time values, TimeAlignment.time.
+    keys (list): The variables to co-locate. If None all variables are co-located.
+    min_count (int): The number of values a shared time step needs, otherwise it is missing. Missing values are
+                     not counted.
+
+    Returns:
+    data_xarray_out (xarray.Dataset): The variables on the shared time axis. Variables without a time dimension are
+                                      unchanged.
+    """
+
+    if(len(bins) != data_xarray.sizes["time"]):
+        raise ValueError("The input bins must have a value for each time step of the input data_xarray.")
+
+    if(type(min_count) != int or min_count < 1):
+        raise ValueError("The input min_count must be a positive integer.")
+
+    if(keys is None):
+        keys = list(data_xarray.data_vars)
+
+    n_steps = len(time_values)
+
+    # The times are sorted, so the time steps in the shared period are a contiguous block and the time steps in
+    # each shared time step are contiguous runs within it
+    in_period = np.flatnonzero(bins >= 0)
+    if(len(in_period) > 0):
+        first, last = in_period[0], in_period[-1] + 1
+    else:
+        first, last = 0, 0
+
+    period_bins = bins[first:last]
+    run_starts = np.flatnonzero(np.diff(period_bins, prepend = -1))
+    run_bins = period_bins[run_starts]
+
+    data_vars = {}
+    for key in keys:
+        data_array = data_xarray[key]
+
+        if("time" not in data_array.dims):
+            data_vars[key] = data_array.variable
+            continue
+
+        dims = ("time",) + tuple(dim for dim in data_array.dims if dim != "time")
+        values = data_array.transpose(*dims).values[first:last]
+        values = values.reshape(values.shape[0], -1).astype(float)
+
+        values_out = np.full((n_steps, values.shape[1]), np.nan)
+
+        if(len(run_starts) > 0):
+            valid = ~np.isnan(values)
+            sums = np.add.reduceat(np.where(valid, values, 0.), run_starts, axis = 0)
+            counts = np.add.reduceat(valid, run_starts, axis = 0)
+
+            with np.errstate(invalid = "ignore", divide = "ignore"):
+                values_out[run_bins] = np.where(counts >= min_count, sums / counts, np.nan)
+
+        values_out = values_out.reshape((n_steps,) + tuple(data_array.sizes[dim] for dim in dims[1:]))
+        data_vars[key] = xr.Variable(dims, values_out, attrs = data_array.attrs).transpose(*data_array.dims)
+
+    # Keep the coordinates without a time dimension, such as the site's latitude and longitude
+    coords = {key: data_xarray.coords[key].variable for key in data_xarray.coords
+              if "time" not in data_xarray.coords[key].dims}
+    coords["time"] = time_values
+
+    return xr.Dataset(data_vars, coords = coords, attrs = data_xarray.attrs)
+
+
+def colocate_observations(model_xarray, observation_xarray, model_keys = None, observation_keys = None,
+                          model_time_offset = None, observation_time_offset = None, min_count = 1):
+    """
+    Co-locate a JULES output and observations on a shared time axis.
+
+    Args:
+    model_xarray (xarray.Dataset): The JULES output.
+    observation_xarray (xarray.Dataset): The observations.
+    model_keys (list): The JULES output variables to co-locate. If None all variables are co-located.
+    observation_keys (list): The observation variables to co-locate. If None all variables are co-located.
+    model_time_offset (float, timedelta): Added to the JULES output times, see get_time_alignment.
+    observation_time_offset (float, timedelta): Added to the observation times, see get_time_alignment.
+    min_count (int): The number of values a shared time step needs, see colocate_time_series.
+
+    Returns:
+    model_xarray_out (xarray.Dataset): The JULES output on the shared time axis.
+    observation_xarray_out (xarray.Dataset): The observations on the shared time axis.
+    """
+
+    alignment = get_time_alignment(model_xarray["time"].values, observation_xarray["time"].values,
+                                   model_time_offset = model_time_offset,
+                                   observation_time_offset = observation_time_offset)
+
+    model_xarray_out = colocate_time_series(model_xarray, alignment.model_bins, alignment.time, model_keys,
+                                            min_count)
+    observation_xarray_out = colocate_time_series(observation_xarray, alignment.observation_bins, alignment.time,
+                                                  observation_keys, min_count)
+
+    return model_xarray_out, observation_xarray_out
+
+
+def clear_time_alignment_cache():
+    """
+    Remove all the cached alignments.
+
+    Returns:
+    None
+    """
+
+    _alignment_cache.clear()
+
+    return None
+
+
+def _get_time_bins(time_values, origin, timestep, first_step, n_steps):
+    """
+    Get the shared time step each time falls in.
+
+    Args:
+    time_values (np.ndarray): The shifted time values, np.datetime64[ns].
+    origin (np.datetime64): A time at the start of a shared time step.
+    timestep (np.timedelta64): The shared time step.
+    first_step (int): The number of time steps from the origin to the first shared time step.
+    n_steps (int): The number of shared time steps.
+
+    Returns:
+    bins (np.ndarray): The index of the shared time step of each time, -1 if it is outside the shared period.
+    """
+
+    bins = (time_values - origin) // timestep - first_step
+
+    return np.where((bins >= 0) & (bins < n_steps), bins, -1).astype(np.int64)
+
+
+def _get_timestep(time_values, input_name):
+    """
+    Get the time step of a time axis. The most common step is used, so gaps do not change it.
+
+    Args:
+    time_values (np.ndarray): The time values, np.datetime64[ns], sorted in ascending order.
+    input_name (str): The name of the input, used in the error messages.
+
+    Returns:
+    timestep (np.timedelta64): The time step.
+    """
+
+    if(len(time_values) < 2):
+        raise ValueError("The input " + input_name + " must have at least two times.")
+
+    time_steps = np.diff(time_values)
+    if((time_steps <= np.timedelta64(0)).any()):
+        raise ValueError("The input " + input_name + " must be sorted in ascending order without repeated times.")
+
+    unique_steps, counts = np.unique(time_steps, return_counts = True)
+
+    return unique_steps[np.argmax(counts)]
+
+
+def _to_timedelta64(offset):
+    """
+    Convert a time offset to a NumPy timedelta.
+
+    Args:
+    offset (float, timedelta): The offset in hours, or as a timedelta. None for no offset.
+
+    Returns:
+    offset (np.timedelta64): The offset in ns.
+    """
+
+    if(offset is None):
+        return np.timedelta64(0, "ns")
+
+    if(isinstance(offset, (int, float)) and not isinstance(offset, bool)):
+        return Timedelta(hours = offset).to_timedelta64()
+
+    if(isinstance(offset, (timedelta, np.timedelta64, Timedelta))):
+        return Timedelta(offset).to_timedelta64()
+
+    raise ValueError("The time offsets must be a number of hours or a timedelta.")
+
+
+def _get_alignment_key(model_times, observation_times, model_time_offset, observation_time_offset):
+    """
+    Get the cache key of an alignment.
+
+    Args:
+    model_times (np.ndarray): The JULES output time values, np.datetime64[ns].
+    observation_times (np.ndarray): The observation time values, np.datetime64[ns].
+    model_time_offset (np.timedelta64): The JULES output time offset.
+    observation_time_offset (np.timedelta64): The observation time offset.
+
+    Returns:
+    key (tuple): The key.
+    """
+
+    return (hashlib.sha1(np.ascontiguousarray(model_times).tobytes()).hexdigest(), len(model_times),
+            hashlib.sha1(np.ascontiguousarray(observation_times).tobytes()).hexdigest(), len(observation_times),
+            int(model_time_offset.astype(np.int64)), int(observation_time_offset.astype(np.int64)))
@@ -1,8 +1,33 @@
 """
 Functions to convert xarray data sets to daily values.
+
+Data on a fixed time step that divides a day (e.g. JULES output) is reduced by reshaping the time axis to
+(days, steps per day) and reducing each day with NumPy. Any other data, such as gappy observations or dask
+backed datasets, is reduced with xarray's resample.
 """
 
 from datetime import time
+import warnings
+import numpy as np
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.instrumentation import timed_stage
+
+# The daily statistics that can be calculated, and the name of the resample method that calculates them
+DAILY_STATISTICS = {"total": "sum",
+                    "mean": "mean",
+                    "median": "median",
+                    "max": "max",
+                    "min": "min",
+                    "std": "std"}
+
+# The NumPy functions used to reduce each day of fixed time step data. Missing values are skipped, as in resample.
+FIXED_TIMESTEP_REDUCTIONS = {"total": np.nansum,
+                             "mean": np.nanmean,
+                             "median": np.nanmedian,
+                             "max": np.nanmax,
+                             "min": np.nanmin,
+                             "std": np.nanstd}
 
 def to_daily_total(data_xarray):
     """
@@ -15,7 +40,7 @@ def to_daily_total(data_xarray):
     data_xarray (xarray.Dataset): The input xarray dataset with the values converted to daily total values.
     """
     # Convert the input xarray dataset into daily total values
-    data_xarray_out = data_xarray.resample(time="1D").sum()
+    data_xarray_out = to_daily_value(data_xarray, "total")
 
     return data_xarray_out
 
@@ -30,7 +55,7 @@ def to_daily_mean(data_xarray):
     data_xarray (xarray.Dataset): The input xarray dataset with the values converted to daily mean values.
     """
     # Convert the input xarray dataset into daily mean values
-    data_xarray_out = data_xarray.resample(time="1D").mean()
+    data_xarray_out = to_daily_value(data_xarray, "mean")
 
     return data_xarray_out
 
@@ -45,7 +70,7 @@ def to_daily_median(data_xarray):
     data_xarray (xarray.Dataset): The input xarray dataset with the values converted to daily median values.
     """
     # Convert the input xarray dataset into daily median values
-    data_xarray_out = data_xarray.resample(time="1D").median()
+    data_xarray_out = to_daily_value(data_xarray, "median")
 
     return data_xarray_out
 
@@ -60,7 +85,7 @@ def to_daily_max(data_xarray):
     data_xarray (xarray.Dataset): The input xarray dataset with the values converted to daily maximum values.
     """
     # Convert the input xarray dataset into daily maximum values
-    data_xarray_out = data_xarray.resample(time="1D").max()
+    data_xarray_out = to_daily_value(data_xarray, "max")
 
     return data_xarray_out
 
@@ -75,7 +100,7 @@ def to_daily_min(data_xarray):
     data_xarray (xarray.Dataset): The input xarray dataset with the values converted to daily minimum values.
     """
     # Convert the input xarray dataset into daily minimum values
-    data_xarray_out = data_xarray.resample(time="1D").min()
+    data_xarray_out = to_daily_value(data_xarray, "min")
 
     return data_xarray_out
 
@@ -90,7 +115,7 @@ def to_daily_std(data_xarray):
     data_xarray (xarray.Dataset): The input xarray dataset with the values converted to daily standard deviation values.
     """
     # Convert the input xarray dataset into daily standard deviation values
-    data_xarray_out = data_xarray.resample(time="1D").std()
+    data_xarray_out = to_daily_value(data_xarray, "std")
 
     return data_xarray_out
 
@@ -106,34 +131,536 @@ def to_daily_quantile(data_xarray, quantile = 0.5):
     data_xarray (xarray.Dataset): The input xarray dataset with the values converted to daily quantile values.
     """
     # Convert the input xarray dataset into daily quantile values
-    data_xarray_out = data_xarray.resample(time="1D").quantile(quantile)
+    data_xarray_out = to_daily_value(data_xarray, "quantile", quantile)
+
+    return data_xarray_out
+
+def to_daily_statistics(data_xarray, statistics = ("total", "mean", "max", "min", "std"), quantiles = None):
+    """
+    Convert the input xarray dataset into several daily statistics in a single pass.
+
+    The data is grouped into days once and every statistic is calculated from the same groups. Data that has
+    not been read from file yet is read once, rather than once for each statistic.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+    statistics (list, str): The daily statistics to calculate. Any of "total", "mean", "median", "max", "min"
+                            and "std".
+    quantiles (list, float): The daily quantiles to calculate. These are labelled "quantile_<quantile>" in
+                             the output. If None no quantiles are calculated.
+
+    Returns:
+    data_xarray_out (xarray.Dataset): The daily values with each statistic along the "stat" dimension.
+    """
+
+    # Check that statistics and quantiles are lists
+    if(type(statistics) == str):
+        statistics = [statistics]
+    elif(type(statistics) not in [list, tuple]):
+        raise ValueError("The input statistics must be a string or list of statistics.")
+
+    if(quantiles is None):
+        quantiles = []
+    elif(type(quantiles) in [float, int]):
+        quantiles = [quantiles]
+    elif(type(quantiles) not in [list, tuple]):
+        raise ValueError("The input quantiles must be a float or list of floats.")
+
+    for statistic in statistics:
+        if(statistic not in DAILY_STATISTICS):
+            raise ValueError("Unknown daily statistic '" + str(statistic) + "'. Must be one of "
+                             + str(list(DAILY_STATISTICS.keys())) + ".")
+
+    if(len(statistics) + len(quantiles) == 0):
+        raise ValueError("At least one statistic or quantile must be given.")
+
+    # Read the data into memory once. Dask backed data is left lazy, the reads are shared between the
+    # statistics when the output is computed.
+    if(not data_xarray.chunks):
+        data_xarray = data_xarray.compute()
+
+    stat_labels = get_daily_statistics_labels(statistics, quantiles)
+
+    steps_per_day = _get_fixed_steps_per_day(data_xarray)
+
+    if(steps_per_day is not None):
+        # Reshape the time axis into days once for all the statistics
+        reductions = [FIXED_TIMESTEP_REDUCTIONS[statistic] for statistic in statistics]
+        reductions += [_nanquantile_reduction(quantile) for quantile in quantiles]
+
+        data_xarray_stats = _to_daily_values_fixed_timestep(data_xarray, reductions, steps_per_day)
+
+    else:
+        # Group the data into days once for all the statistics
+        data_xarray_resampled = data_xarray.resample(time="1D")
+
+        data_xarray_stats = []
+        for statistic in statistics:
+            data_xarray_stats.append(getattr(data_xarray_resampled, DAILY_STATISTICS[statistic])())
+
+        for quantile in quantiles:
+            data_xarray_stats.append(data_xarray_resampled.quantile(quantile).drop_vars("quantile"))
+
+    # Combine the statistics along a new stat dimension
+    data_xarray_out = xr.concat(data_xarray_stats, dim = "stat").assign_coords(stat = stat_labels)
 
     return data_xarray_out
 
+def get_daily_statistics_labels(statistics, quantiles = None):
+    """
+    Get the labels of the "stat" dimension returned by to_daily_statistics.
+
+    Args:
+    statistics (list, str): The daily statistics.
+    quantiles (list, float): The daily quantiles.
+
+    Returns:
+    stat_labels (list): The labels of the statistics, in order.
+    """
+
+    if(type(statistics) == str):
+        statistics = [statistics]
+
+    if(quantiles is None):
+        quantiles = []
+    elif(type(quantiles) in [float, int]):
+        quantiles = [quantiles]
+
+    return list(statistics) + ["quantile_" + str(quantile) for quantile in quantiles]
+
 def get_daily_values_at_time(data_xarray, time_selected = "12:00:00"):
     """
-    Get the daily values at a specific time.
+    Get the daily values at one or more specific times of day.
+
+    Data on a fixed time step that divides a day is indexed directly: a single time of day is a strided slice of
+    the time dimension and several times of day are taken together with a single (day, time of day) index. Other
+    data is selected with the time of day index of the time coordinate.
 
     Args:
     data_xarray (xarray.Dataset): The input xarray dataset.
-    time (str): The time to get the daily values at. The time should be in the format "HH:MM:SS".
+    time_selected (str, list): The time to get the daily values at, in the format "HH:MM:SS". Or a list of times.
 
     Returns:
-    data_xarray (xarray.Dataset): The input xarray dataset with the values at the specified time.
+    data_xarray_out (xarray.Dataset): For a single time, the input xarray dataset with the values at the specified
+                                      time. For a list of times, the values at each time with the dimensions
+                                      ("time", "time_of_day"), where time is the date of each day and
+                                      time_of_day the times in time_selected. Days missing a time are NaN.
     """
 
-    # Split the time into hours, minutes and seconds
-    h, m, s = time_selected.split(':')
+    # Check that time_selected is a string or list of strings
+    if(type(time_selected) == str):
+        times_selected = [time_selected]
+    elif(type(time_selected) in [list, tuple]):
+        times_selected = list(time_selected)
+    else:
+        raise ValueError("The input time_selected must be a string or list of strings in the format 'HH:MM:SS'.")
 
-    # Convert the hours, minutes and seconds to integers
-    h = int(h)
-    m = int(m)
-    s = int(s)
+    # Parse each time once
+    times_of_day = [_parse_time_of_day(time_string) for time_string in times_selected]
 
-    # Create a time object
-    time_selected = time(h, m, s)
+    with timed_stage("daily_values_at_time", detail = ",".join(times_selected)):
+        time_of_day_positions = _get_time_of_day_positions(data_xarray, times_of_day)
+
+        if(type(time_selected) == str):
+            if(time_of_day_positions is None):
+                # Get the daily values at the specified time
+                return data_xarray.sel(time = times_of_day[0])
+
+            # Every steps_per_day-th time step, starting from the first day with the time
+            first_position, steps_per_day = time_of_day_positions[2], time_of_day_positions[3]
+            if(first_position[0] < 0):
+                return data_xarray.isel(time = slice(0, 0))
+
+            return data_xarray.isel(time = slice(int(first_position[0]), None, steps_per_day))
+
+        # Several times of day are taken from the variables of a dataset, so DataArrays are selected instead
+        if(time_of_day_positions is None or isinstance(data_xarray, xr.DataArray)):
+            return _get_daily_values_at_times_sel(data_xarray, times_selected, times_of_day)
+
+        data_xarray_out = _take_times_of_day(data_xarray, time_of_day_positions[0], time_of_day_positions[1])
 
-    # Get the daily values at the specified time
-    data_xarray_out = data_xarray.sel(time = time_selected)
+        data_xarray_out = data_xarray_out.assign_coords(time_of_day = times_selected)
 
     return data_xarray_out
+
+def get_steps_per_day(data_xarray):
+    """
+    Get the number of time steps in each day for data on a fixed time step.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+
+    Returns:
+    steps_per_day (int): The number of time steps in each day. None if the time step is not fixed or does not
+                         divide a day.
+    """
+
+    time_values = data_xarray["time"].values
+
+    if(len(time_values) < 2):
+        return None
+
+    # Check every time step is the same
+    time_steps = np.diff(time_values)
+    timestep = time_steps[0]
+
+    if(timestep <= np.timedelta64(0) or not (time_steps == timestep).all()):
+        return None
+
+    # Check the time step divides a day
+    day = np.timedelta64(1, "D")
+    if(day % timestep != np.timedelta64(0)):
+        return None
+
+    return int(day // timestep)
+
+def _get_fixed_steps_per_day(data_xarray):
+    """
+    Get the number of time steps in each day if the dataset can be reduced by the fixed time step method.
+    This needs a dataset of floating point data on a fixed time step that divides a day. Dask backed datasets must
+    be chunked along time into whole days, as they are reduced one chunk at a time.
+
+    Args:
+    data_xarray (xarray.Dataset, xarray.DataArray): The input xarray data.
+
+    Returns:
+    steps_per_day (int): The number of time steps in each day. None if the data must be resampled instead.
+    """
+
+    # The fixed time step method reduces the variables of a dataset, so DataArrays are resampled
+    if(isinstance(data_xarray, xr.DataArray)):
+        return None
+
+    if("time" not in data_xarray.dims):
+        return None
+
+    if(data_xarray.chunks and not _has_daily_time_chunks(data_xarray)):
+        return None
+
+    for key in data_xarray.data_vars:
+        if("time" in data_xarray[key].dims and data_xarray[key].dtype.kind != "f"):
+            return None
+
+    return get_steps_per_day(data_xarray)
+
+def _parse_time_of_day(time_string):
+    """
+    Parse a time of day.
+
+    Args:
+    time_string (str): The time in the format "HH:MM:SS".
+
+    Returns:
+    time_of_day (datetime.time): The time of day.
+    """
+
+    # Split the time into hours, minutes and seconds
+    h, m, s = time_string.split(':')
+
+    # Create a time object
+    return time(int(h), int(m), int(s))
+
+def _get_time_of_day_positions(data_xarray, times_of_day):
+    """
+    Get the positions along the time dimension of each time of day, for data on a fixed time step that divides
+    a day. Day d starts on the date of the first time step plus d days.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+    times_of_day (list): The times of day. List of datetime.time.
+
+    Returns:
+    positions (np.ndarray): The position of each time of day on each day, shape (days, times of day).
+    valid (np.ndarray): Whether each position is within the data and falls on a time step.
+    first_position (np.ndarray): The position of each time of day on the first day it is in the data. -1 if the
+                                 time of day does not fall on a time step.
+    steps_per_day (int): The number of time steps in each day.
+    None is returned if the data is not on a fixed time step that divides a day.
+    """
+
+    if("time" not in data_xarray.dims or data_xarray["time"].dtype.kind != "M"):
+        return None
+
+    steps_per_day = get_steps_per_day(data_xarray)
+    if(steps_per_day is None):
+        return None
+
+    time_values = data_xarray["time"].values
+    n_times = len(time_values)
+    nanosecond = np.timedelta64(1, "ns")
+
+    # The time step and the offset of the first time step into its day
+    timestep = int((time_values[1] - time_values[0]) // nanosecond)
+    offset = int((time_values[0] - time_values[0].astype("datetime64[D]")) // nanosecond)
+    first_step, remainder = divmod(offset, timestep)
+
+    # The step of the day that each time of day falls on, -1 if it falls between time steps
+    steps = []
+    for time_of_day in times_of_day:
+        time_of_day_offset = ((time_of_day.hour * 60 + time_of_day.minute) * 60 + time_of_day.second) * 10 ** 9
+        if((time_of_day_offset - remainder) % timestep != 0):
+            steps.append(-1)
+        else:
+            steps.append((time_of_day_offset - remainder) // timestep)
+    steps = np.array(steps)
+
+    n_days = (first_step + n_times - 1) // steps_per_day + 1
+
+    positions = np.arange(n_days)[:, None] * steps_per_day + steps[None, :] - first_step
+    valid = (positions >= 0) & (positions < n_times) & (steps[None, :] >= 0)
+
+    first_position = np.where(steps >= 0, (steps - first_step) % steps_per_day, -1)
+
+    return positions, valid, first_position, steps_per_day
+
+def _take_times_of_day(data_xarray, positions, valid):
+    """
+    Take the values at several times of day with a single index along the time axis of each variable.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset, on a fixed time step that divides a day.
+    positions (np.ndarray): The position of each time of day on each day, shape (days, times of day).
+    valid (np.ndarray): Whether each position is within the data and falls on a time step.
+
+    Returns:
+    data_xarray_out (xarray.Dataset): The values with the time dimension replaced by ("time", "time_of_day").
+                                      Invalid positions are NaN.
+    """
+
+    time_values = data_xarray["time"].values
+
+    # The start of each day
+    first_day = time_values[0].astype("datetime64[D]")
+    days = (first_day + np.arange(positions.shape[0])).astype(time_values.dtype)
+
+    # Only keep the days with at least one of the times of day, as when each time of day is selected. The partial
+    # first and last days may have none.
+    days_present = valid.any(axis = 1)
+    positions, valid, days = positions[days_present], valid[days_present], days[days_present]
+
+    # Variables without a time dimension are passed through unchanged
+    coords = {key: data_xarray.coords[key] for key in data_xarray.coords if "time" not in data_xarray.coords[key].dims}
+    coords["time"] = days
+
+    positions = np.clip(positions, 0, len(time_values) - 1)
+
+    data_vars = {}
+    for key in data_xarray.data_vars:
+        data_array = data_xarray[key]
+
+        if("time" not in data_array.dims):
+            data_vars[key] = data_array
+            continue
+
+        time_axis = data_array.dims.index("time")
+
+        # Take the flattened positions, so that dask backed data can be indexed too, then split the time axis
+        # into (days, times of day)
+        values = np.take(data_array.data, positions.ravel(), axis = time_axis)
+        values = values.reshape(values.shape[:time_axis] + positions.shape + values.shape[time_axis + 1:])
+
+        # Mask the days before the start or after the end of the data
+        if(not valid.all()):
+            mask = valid.reshape(valid.shape + (1,) * (data_array.ndim - time_axis - 1))
+            values = np.where(mask, values, np.nan)
+
+        data_vars[key] = xr.Variable(data_array.dims[:time_axis] + ("time", "time_of_day")
+                                     + data_array.dims[time_axis + 1:],
+                                     values, attrs = data_array.attrs)
+
+    return xr.Dataset(data_vars, coords = coords, attrs = data_xarray.attrs)
+
+def _get_daily_values_at_times_sel(data_xarray, times_selected, times_of_day):
+    """
+    Get the daily values at several times of day by selecting each time, for data not on a fixed time step.
+
+    Args:
+    data_xarray (xarray.Dataset, xarray.DataArray): The input xarray data.
+    times_selected (list): The times of day, in the format "HH:MM:SS". List of str.
+    times_of_day (list): The times of day. List of datetime.time.
+
+    Returns:
+    data_xarray_out (xarray.Dataset): The values at each time with the dimensions ("time", "time_of_day").
+    """
+
+    daily_values = []
+    for time_of_day in times_of_day:
+        data_xarray_time = data_xarray.sel(time = time_of_day)
+        days = data_xarray_time["time"].values.astype("datetime64[D]").astype(data_xarray["time"].dtype)
+        daily_values.append(data_xarray_time.assign_coords(time = days))
+
+    # Only the variables with a time dimension are split by the time of day
+    if(isinstance(data_xarray, xr.DataArray)):
+        data_xarray_out = xr.concat(daily_values, dim = "time_of_day", join = "outer")
+    else:
+        time_keys = [key for key in data_xarray.data_vars if "time" in data_xarray[key].dims]
+        data_xarray_out = xr.concat(daily_values, dim = "time_of_day", join = "outer", data_vars = time_keys)
+
+    return data_xarray_out.assign_coords(time_of_day = times_selected).transpose("time", "time_of_day", ...)
+
+def _nanquantile_reduction(quantile):
+    """
+    Create a reduction function for the fixed time step method that calculates a quantile, skipping missing values.
+
+    Args:
+    quantile (float): The quantile to calculate.
+
+    Returns:
+    reduction (function): The reduction function, taking an array and an axis.
+    """
+
+    def reduction(values, axis):
+        return np.nanquantile(values, quantile, axis = axis)
+
+    return reduction
+
+def _to_daily_values_fixed_timestep(data_xarray, reductions, steps_per_day):
+    """
+    Reduce data on a fixed time step to daily values by reshaping the time axis to (days, steps per day).
+
+    The time axis is padded with missing values so that it starts and ends on a day boundary, so partial first
+    and last days are reduced over the time steps that are available, as in resample.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+    reductions (list): The functions used to reduce each day, taking an array and an axis.
+    steps_per_day (int): The number of time steps in each day.
+
+    Returns:
+    data_xarrays_out (list): The daily values for each of the reductions. List of xarray.Dataset.
+    """
+
+    # Dask backed data is read and reduced one chunk of whole days at a time
+    if(data_xarray.chunks):
+        return _to_daily_values_by_chunk(data_xarray, reductions, steps_per_day)
+
+    time_values = data_xarray["time"].values
+    timestep = np.timedelta64(1, "D").astype("timedelta64[ns]") // steps_per_day
+
+    # Find the padding needed to start and end the time axis on a day boundary
+    first_day = time_values[0].astype("datetime64[D]")
+    steps_before = int((time_values[0] - first_day) // timestep)
+    n_days = (steps_before + len(time_values) - 1) // steps_per_day + 1
+    steps_after = n_days * steps_per_day - steps_before - len(time_values)
+
+    # The start of each day
+    days = (first_day + np.arange(n_days)).astype(time_values.dtype)
+
+    # Variables without a time dimension are passed through unchanged
+    coords = {key: data_xarray.coords[key] for key in data_xarray.coords if "time" not in data_xarray.coords[key].dims}
+    coords["time"] = days
+
+    data_vars_out = [{} for reduction in reductions]
+
+    for key in data_xarray.data_vars:
+        data_array = data_xarray[key]
+
+        if("time" not in data_array.dims):
+            for data_vars in data_vars_out:
+                data_vars[key] = data_array
+            continue
+
+        time_axis = data_array.dims.index("time")
+
+        # Pad the time axis and split it into (days, steps per day)
+        values = data_array.values
+        if(steps_before > 0 or steps_after > 0):
+            padding = [(0, 0)] * values.ndim
+            padding[time_axis] = (steps_before, steps_after)
+            values = np.pad(values, padding, constant_values = np.nan)
+
+        values = values.reshape(values.shape[:time_axis] + (n_days, steps_per_day) + values.shape[time_axis + 1:])
+
+        # Reduce over the steps in each day. Days with no data give NaN, as in resample.
+        # As in resample, time is moved to the first dimension.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category = RuntimeWarning)
+            for i in range(len(reductions)):
+                data_vars_out[i][key] = xr.Variable(data_array.dims,
+                                                    reductions[i](values, axis = time_axis + 1),
+                                                    attrs = data_array.attrs).transpose("time", ...)
+
+    return [xr.Dataset(data_vars, coords = coords, attrs = data_xarray.attrs) for data_vars in data_vars_out]
+
+def _to_daily_values_by_chunk(data_xarray, reductions, steps_per_day):
+    """
+    Reduce dask backed data on a fixed time step to daily values, reading one time chunk into memory at a time.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset, chunked along time into whole days.
+    reductions (list): The functions used to reduce each day, taking an array and an axis.
+    steps_per_day (int): The number of time steps in each day.
+
+    Returns:
+    data_xarrays_out (list): The daily values for each of the reductions. List of xarray.Dataset.
+    """
+
+    chunk_data_xarrays_out = [[] for reduction in reductions]
+
+    start = 0
+    for chunk in data_xarray.chunksizes["time"]:
+        chunk_xarray = data_xarray.isel(time = slice(start, start + chunk)).compute()
+        for i, chunk_xarray_out in enumerate(_to_daily_values_fixed_timestep(chunk_xarray, reductions,
+                                                                             steps_per_day)):
+            chunk_data_xarrays_out[i].append(chunk_xarray_out)
+        start += chunk
+
+    # The chunks hold whole days, so their daily values follow on from each other
+    return [xr.concat(data_xarrays_out, dim = "time", data_vars = "minimal", coords = "minimal",
+                      compat = "override")
+            for data_xarrays_out in chunk_data_xarrays_out]
+
+def _has_daily_time_chunks(data_xarray):
+    """
+    Check every dask chunk of a dataset along the time dimension holds whole days.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+
+    Returns:
+    daily_chunks (bool): Whether each chunk starts on a different day to the end of the previous chunk.
+    """
+
+    chunk_starts = np.cumsum(data_xarray.chunksizes["time"])[:-1]
+    if(len(chunk_starts) == 0):
+        return True
+
+    days = data_xarray["time"].values.astype("datetime64[D]")
+
+    return bool((days[chunk_starts] != days[chunk_starts - 1]).all())
+
+def to_daily_value(data_xarray, statistic, quantile = None):
+    """
+    Convert the input xarray dataset into daily values of a single statistic.
+    Uses the fixed time step method where possible, otherwise resamples the data.
+    The to_daily_* functions call this with their statistic.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+    statistic (str): The daily statistic to calculate. One of the DAILY_STATISTICS keys or "quantile".
+    quantile (float): The quantile to calculate if statistic is "quantile".
+
+    Returns:
+    data_xarray_out (xarray.Dataset): The daily values.
+    """
+
+    with timed_stage("to_daily_" + statistic):
+        steps_per_day = _get_fixed_steps_per_day(data_xarray)
+
+        if(steps_per_day is not None):
+            if(statistic == "quantile"):
+                reduction = _nanquantile_reduction(quantile)
+            else:
+                reduction = FIXED_TIMESTEP_REDUCTIONS[statistic]
+
+            data_xarray_out = _to_daily_values_fixed_timestep(data_xarray, [reduction], steps_per_day)[0]
+
+            if(statistic == "quantile"):
+                data_xarray_out = data_xarray_out.assign_coords(quantile = quantile)
+
+            return data_xarray_out
+
+        if(statistic == "quantile"):
+            return data_xarray.resample(time="1D").quantile(quantile)
+
+        return getattr(data_xarray.resample(time="1D"), DAILY_STATISTICS[statistic])()
@@ -0,0 +1,85 @@
+"""
+Functions to convert the units of JULES output and observation variables.
+
+Unit conversions are declared by name with a scale factor. Conversions from a rate per second to an amount per
+time step are also multiplied by the length of the time step in seconds. The daily statistics are all linear
+in a positive scale factor, so the conversions are applied to the daily values rather than to every time step,
+and the input datasets are never modified.
+"""
+
+# The unit conversions, {name: (scale factor, multiply by the time step in seconds)}
+UNIT_CONVERSIONS = {
+    # kgC -> gC: * 1000
+    # s-1 -> timestep-1: * timestep
+    "kgC m-2 s-1 -> gC m-2 timestep-1": (1000., True),
+    # umol -> mol: * 1e-6
+    # molC -> gC: * 12.01
+    # s-1 -> timestep-1: * timestep
+    "umol m-2 s-1 -> gC m-2 timestep-1": (1e-6 * 12.01, True),
+}
+
+
+def get_timestep_seconds(data_xarray):
+    """
+    Get the time step of the input xarray dataset in seconds, from the first two time values.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+
+    Returns:
+    timestep (int): The time step in seconds.
+    """
+
+    timestep = data_xarray["time"].values[1] - data_xarray["time"].values[0]
+    timestep = timestep.astype("timedelta64[s]").astype(int)
+
+    return int(timestep)
+
+
+def get_unit_scale_factor(data_xarray, unit_conversion):
+    """
+    Get the scale factor that converts the units of a variable in the input xarray dataset.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset. Used for the time step.
+    unit_conversion (str): The name of the unit conversion, a key of UNIT_CONVERSIONS.
+
+    Returns:
+    scale_factor (float): The scale factor.
+    """
+
+    if(unit_conversion not in UNIT_CONVERSIONS):
+        raise ValueError("Unknown unit conversion '" + str(unit_conversion) + "'. Must be one of "
+                         + str(list(UNIT_CONVERSIONS.keys())) + ".")
+
+    scale_factor, per_timestep = UNIT_CONVERSIONS[unit_conversion]
+
+    if(per_timestep):
+        scale_factor = scale_factor * get_timestep_seconds(data_xarray)
+
+    return scale_factor
+
+
+def convert_daily_units(data_xarray_daily, col_key, unit_conversion, data_xarray):
+    """
+    Convert the units of daily values calculated from the input xarray dataset.
+
+    Args:
+    data_xarray_daily (xarray.Dataset): The daily values.
+    col_key (str): The key for the variable to convert.
+    unit_conversion (str): The name of the unit conversion, a key of UNIT_CONVERSIONS. If None the daily values
+                           are returned unchanged.
+    data_xarray (xarray.Dataset): The dataset the daily values were calculated from. Used for the time step.
+
+    Returns:
+    data_xarray_daily_out (xarray.Dataset): The daily values with the variable converted. The input daily values
+                                            are not modified.
+    """
+
+    if(unit_conversion is None):
+        return data_xarray_daily
+
+    data_xarray_daily_out = data_xarray_daily.copy()
+    data_xarray_daily_out[col_key] = data_xarray_daily[col_key] * get_unit_scale_factor(data_xarray, unit_conversion)
+
+    return data_xarray_daily_out
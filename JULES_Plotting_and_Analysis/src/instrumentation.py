@@ -0,0 +1,225 @@
+"""
+Opt-in timing and memory instrumentation of the loading, daily value, smoothing and plotting stages.
+
+Instrumentation is disabled by default. Each stage is wrapped in timed_stage, which returns a shared do nothing
+context manager while instrumentation is disabled, so the overhead is a single function call. When enabled each
+stage is timed and recorded with the current site and, optionally, the peak memory allocated during the stage.
+The records are kept in memory and, if an output file is given, appended to a CSV file as each stage finishes so
+that worker processes can write to the same file. Stages can be nested, the time of a stage includes the time
+of the stages inside it. Files are opened lazily, so the "open" stage only times reading the file's metadata and
+the time to read the data is included in the first stage that uses it.
+"""
+
+import csv
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from os import getpid
+from os.path import exists, getsize
+from threading import Lock, local
+from time import perf_counter, time
+
+# The columns of the CSV file
+RECORD_FIELDS = ["pid", "site", "stage", "detail", "start_time", "duration", "peak_memory"]
+
+# The instrumentation settings, None while disabled
+_settings = None
+
+# The recorded stages
+_records = []
+
+# The labels added to each record, such as the site being plotted
+_labels = {"site": ""}
+
+# Running peak memory of the open stages in each thread, innermost last
+_thread_state = local()
+
+_write_lock = Lock()
+
+_DISABLED_STAGE = nullcontext()
+
+
+def enable_instrumentation(output_file = None, track_memory = False):
+    """
+    Enable the instrumentation.
+
+    Args:
+    output_file (str): The CSV file the records are appended to. If None the records are only kept in memory.
+    track_memory (bool): Whether to record the peak memory allocated during each stage with tracemalloc. This
+                         slows down the instrumented code.
+
+    Returns:
+    None
+    """
+
+    global _settings
+
+    _settings = {"output_file": output_file, "track_memory": track_memory}
+
+    # Write the header before any records, so worker processes appending to the file never write it twice
+    if(output_file is not None and (not exists(output_file) or getsize(output_file) == 0)):
+        with open(output_file, "w", newline = "") as file:
+            csv.DictWriter(file, fieldnames = RECORD_FIELDS).writeheader()
+
+    if(track_memory and not tracemalloc.is_tracing()):
+        tracemalloc.start()
+
+    return None
+
+
+def disable_instrumentation():
+    """
+    Disable the instrumentation and clear the recorded stages.
+
+    Returns:
+    records (list): The stages recorded since the instrumentation was enabled. List of dict, see RECORD_FIELDS.
+    """
+
+    global _settings, _records
+
+    if(_settings is not None and _settings["track_memory"] and tracemalloc.is_tracing()):
+        tracemalloc.stop()
+
+    records = _records
+    _settings = None
+    _records = []
+
+    return records
+
+
+def get_instrumentation_settings():
+    """
+    Get the instrumentation settings, used to enable the same instrumentation in worker processes.
+
+    Returns:
+    settings (dict): The keyword arguments of enable_instrumentation. None if the instrumentation is disabled.
+    """
+
+    if(_settings is None):
+        return None
+
+    return dict(_settings)
+
+
+def get_instrumentation_records():
+    """
+    Get the stages recorded in this process since the instrumentation was enabled.
+
+    Returns:
+    records (list): The recorded stages. List of dict, see RECORD_FIELDS.
+    """
+
+    return list(_records)
+
+
+def set_instrumentation_site(site):
+    """
+    Label the stages recorded from now on with a site name.
+
+    Args:
+    site (str): The site name. An empty string to remove the label.
+
+    Returns:
+    None
+    """
+
+    _labels["site"] = site
+
+    return None
+
+
+def timed_stage(stage, detail = None):
+    """
+    Time a stage of the pipeline. Used as a context manager.
+
+    Args:
+    stage (str): The name of the stage, for example "open" or "to_daily_mean".
+    detail (str): Extra information about the stage, such as the file loaded.
+
+    Returns:
+    context (context manager): Records the stage when it exits. Does nothing if the instrumentation is disabled.
+    """
+
+    if(_settings is None):
+        return _DISABLED_STAGE
+
+    return _timed_stage(stage, detail)
+
+
+@contextmanager
+def _timed_stage(stage, detail):
+    """
+    Time a stage of the pipeline and record it. See timed_stage.
+    """
+
+    track_memory = _settings["track_memory"] and tracemalloc.is_tracing()
+
+    if(track_memory):
+        # Pass the peak so far to the enclosing stage before resetting it for this stage
+        peaks = _get_peak_stack()
+        if(len(peaks) > 0):
+            peaks[-1] = max(peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        peaks.append(0)
+
+    start_time = time()
+    start = perf_counter()
+
+    try:
+        yield
+
+    finally:
+        duration = perf_counter() - start
+
+        peak_memory = ""
+        if(track_memory):
+            peaks = _get_peak_stack()
+            peak_memory = max(peaks.pop(), tracemalloc.get_traced_memory()[1])
+            if(len(peaks) > 0):
+                peaks[-1] = max(peaks[-1], peak_memory)
+
+        _add_record({"pid": getpid(),
+                     "site": _labels["site"],
+                     "stage": stage,
+                     "detail": "" if detail is None else str(detail),
+                     "start_time": start_time,
+                     "duration": duration,
+                     "peak_memory": peak_memory})
+
+
+def _get_peak_stack():
+    """
+    Get the running peak memory of the open stages in the current thread.
+
+    Returns:
+    peaks (list): The peak memory of each open stage in bytes, innermost last.
+    """
+
+    if(not hasattr(_thread_state, "peaks")):
+        _thread_state.peaks = []
+
+    return _thread_state.peaks
+
+
+def _add_record(record):
+    """
+    Keep a record and append it to the output file, if there is one.
+
+    Args:
+    record (dict): The record, see RECORD_FIELDS.
+
+    Returns:
+    None
+    """
+
+    with _write_lock:
+        _records.append(record)
+
+        if(_settings is None or _settings["output_file"] is None):
+            return None
+
+        # The file is opened in append mode for each record, so records from different processes are
+        # appended whole
+        with open(_settings["output_file"], "a", newline = "") as file:
+            csv.DictWriter(file, fieldnames = RECORD_FIELDS).writerow(record)
+
+    return None
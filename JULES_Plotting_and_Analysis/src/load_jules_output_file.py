@@ -1,45 +1,206 @@
 """
-This file contains functions to load a JULES output file and convert it into a pandas dataframe.
+This file contains functions to load a JULES output file into an xarray dataset, or convert it into a pandas
+dataframe.
 """
 
-from xarray import open_dataset
+from datetime import date, datetime
 
+import numpy as np
+from pandas import Timedelta, Timestamp
+from xarray import DataArray, open_dataset
 
-def load_jules_output_file_pandas(file_path):
+from JULES_Plotting_and_Analysis.src.instrumentation import timed_stage
+
+
+def load_jules_output_file_pandas(file_path, variables = None, time_range = None, chunk_days = None):
     """
     Load a JULES output file and convert it into a pandas dataframe.
 
     Args:
     file_path (str): The file path to the JULES output file.
+    variables (list, str): The variables to load. If None all variables are loaded.
+    time_range (list): The range of times to load, in the form [start, end]. If None all times are loaded.
+    chunk_days (int): If given the file is converted lazily, one block of this many whole days at a time, and an
+                      iterator over the dataframes of the blocks is returned. Only the block being converted is
+                      read from disk. If None the whole file is converted at once.
 
     Returns:
-    df (pd.DataFrame): The JULES output file as a pandas dataframe.
+    df (pd.DataFrame): The JULES output file as a pandas dataframe. An iterator of pd.DataFrame if chunk_days is
+                       given.
     """
     # Load the JULES output file
-    file = open_dataset(file_path)
+    file = load_jules_output_file_xarray(file_path, variables = variables, time_range = time_range)
+
+    if(chunk_days is not None):
+        return _iter_dataframe_chunks(file, get_daily_time_chunks(file["time"].values, chunk_days))
 
     return file.to_dataframe()
 
 
-def load_jules_output_file_xarray(file_path):
+def _iter_dataframe_chunks(file, chunks):
+    """
+    Convert a lazily opened JULES output file into pandas dataframes one block of time steps at a time.
+
+    Args:
+    file (xarray.Dataset): The JULES output file.
+    chunks (tuple): The number of time steps in each block, see get_daily_time_chunks.
+
+    Returns:
+    df (iterator): The dataframe of each block. Iterator of pd.DataFrame.
+    """
+
+    start = 0
+    for chunk in chunks:
+        yield file.isel(time = slice(start, start + chunk)).to_dataframe()
+        start += chunk
+
+
+def load_jules_output_file_xarray(file_path, variables = None, time_range = None, chunk_days = None):
     """
     Load a JULES output file and convert it into an xarray dataset.
 
+    The file is opened lazily so the variable and time selections are applied before any data is read.
+    Only the requested variables and time steps are then read and decoded from the file.
+
     Args:
     file_path (str): The file path to the JULES output file.
+    variables (list, str): The variables to load. If None all variables are loaded.
+    time_range (list): The range of times to load, in the form [start, end]. The start and end can be
+                       datetime, date or "YYYY-MM-DD" strings and are inclusive. An end without a time of day,
+                       a date or "YYYY-MM-DD" string, includes the whole of that day. Either can be None to
+                       leave that side of the range open. If None all times are loaded.
+    chunk_days (int): If given the file is opened lazily as a dask backed dataset, split along the time
+                      dimension into chunks of this many whole days. The data is then only read from disk
+                      one chunk at a time when it is computed. Requires dask.
+                      If None the dataset is opened without dask.
 
     Returns:
     file (xarray.Dataset): The JULES output file as an xarray dataset.
     """
-    # Load the JULES output file
-    file = open_dataset(file_path)
+    # Open the JULES output file. The data is read lazily, when it is first used
+    with timed_stage("open", detail = file_path):
+        file = open_dataset(file_path)
+
+    # Select only the requested variables
+    if(variables is not None):
+        if(type(variables) == str):
+            variables = [variables]
+        elif(type(variables) != list):
+            raise ValueError("The input variables must be a string or list of variable names.")
+
+        file = file[variables]
+
+    # Select only the requested time steps
+    if(time_range is not None):
+        if(type(time_range) not in [list, tuple] or len(time_range) != 2):
+            raise ValueError("The input time_range must be a list of the form [start, end].")
+
+        file = file.sel(time = slice(*get_time_range_bounds(time_range)))
+
+    # Split the file into time chunks that line up with the day boundaries
+    if(chunk_days is not None):
+        file = chunk_by_days(file, chunk_days)
 
     return file
 
+
+def chunk_by_days(data_xarray, chunk_days):
+    """
+    Split a dataset into dask chunks along the time dimension that each hold whole days.
+    The data is then only read and reduced one chunk at a time when it is computed. Requires dask.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+    chunk_days (int): The number of days in each chunk.
+
+    Returns:
+    data_xarray_out (xarray.Dataset): The dask backed dataset.
+    """
+
+    return data_xarray.chunk({"time": get_daily_time_chunks(data_xarray["time"].values, chunk_days)})
+
+
+def get_time_range_bounds(time_range):
+    """
+    Convert a range of times into the inclusive bounds of the times to select.
+
+    Args:
+    time_range (list): The range of times, in the form [start, end]. The start and end can be datetime, date or
+                       "YYYY-MM-DD" strings, or None to leave that side of the range open. An end without a time of
+                       day includes the whole of that day.
+
+    Returns:
+    start (pd.Timestamp): The first time to select, or None.
+    end (pd.Timestamp): The last time to select, or None.
+    """
+
+    start = None if time_range[0] is None else Timestamp(time_range[0])
+
+    end = None
+    if(time_range[1] is not None):
+        end = Timestamp(time_range[1])
+
+        # Extend a date to the last time in that day
+        if(_is_date_only(time_range[1])):
+            end = end + Timedelta(days = 1) - Timedelta(1, "ns")
+
+    return start, end
+
+
+def _is_date_only(value):
+    """
+    Check if a time is given as a date, without a time of day.
+
+    Args:
+    value (datetime, date, str): The time.
+
+    Returns:
+    date_only (bool): True for dates and "YYYY-MM-DD" strings.
+    """
+
+    if(isinstance(value, str)):
+        return ":" not in value and "T" not in value.strip() and " " not in value.strip()
+
+    return isinstance(value, date) and not isinstance(value, datetime)
+
+
+def get_daily_time_chunks(time_values, chunk_days):
+    """
+    Calculate chunk sizes along the time dimension so that every chunk holds whole days.
+
+    Args:
+    time_values (numpy.ndarray): The time coordinate values, sorted in ascending order. numpy.datetime64, or
+                                 cftime datetimes for non-standard calendars such as "noleap".
+    chunk_days (int): The number of days in each chunk.
+
+    Returns:
+    chunks (tuple): The number of time steps in each chunk.
+    """
+
+    if(type(chunk_days) != int or chunk_days < 1):
+        raise ValueError("The input chunk_days must be a positive integer.")
+
+    if(len(time_values) == 0):
+        return ()
+
+    # Count the number of time steps in each day. Flooring to the day also works for cftime datetimes.
+    if(np.issubdtype(time_values.dtype, np.datetime64)):
+        days = time_values.astype("datetime64[D]")
+    else:
+        days = DataArray(time_values, dims = "time").dt.floor("D").values
+    day_starts = np.flatnonzero(np.concatenate([[True], days[1:] != days[:-1]]))
+    steps_per_day = np.diff(np.append(day_starts, len(days)))
+
+    # Add up the time steps for each block of chunk_days days
+    chunks = np.add.reduceat(steps_per_day, np.arange(0, len(steps_per_day), chunk_days))
+
+    return tuple(int(chunk) for chunk in chunks)
+
+
 if __name__ == "__main__":
     # Load the JULES output file
     file_path = "~/Desktop/Flux_data/Plumber2_cat/Met/AR-SLu_2010-2010_FLUXNET2015_Met.nc"
     file = load_jules_output_file_xarray(file_path)
 
     # Print the file
-    print(file)
\ No newline at end of file
+    print(file)
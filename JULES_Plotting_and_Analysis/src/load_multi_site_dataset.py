@@ -0,0 +1,181 @@
+"""
+This file contains functions to load JULES output or observation files for several sites into a single xarray
+dataset, stacked along a "site" dimension.
+
+The sites are aligned onto a shared time axis, with missing values where a site has no data, and a "time_mask"
+coordinate records which time steps each site has data for. Daily values, such as those from
+to_daily_value.to_daily_value, and averages over the plant functional types, such as those from
+average_pfts.mean_pfts, can then be calculated for all the sites at once.
+"""
+
+import numpy as np
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.load_jules_output_file import load_jules_output_file_xarray, get_daily_time_chunks
+from JULES_Plotting_and_Analysis.src.site_catalogue import index_site_files, normalise_site_name, JULES_FILE_PATTERN
+
+# The default number of whole days in each dask chunk of the stacked dataset
+DEFAULT_CHUNK_DAYS = 365
+
+
+def load_multi_site_dataset(file_paths, sites, variables = None, time_range = None, chunk_days = DEFAULT_CHUNK_DAYS):
+    """
+    Load a file for each site and stack them into a single xarray dataset along a "site" dimension.
+
+    If every site is on the same fixed time step, with the time steps at the same times of day, the shared time
+    axis runs on that time step from the first to the last time of any site, so the daily values can still be
+    calculated with the fixed time step method. Otherwise the shared time axis is the union of the sites' times.
+
+    Args:
+    file_paths (list): The file paths, one for each site. List of str.
+    sites (list): The site names. List of str.
+    variables (list, str): The variables to load. If None all variables are loaded.
+    time_range (list): The range of times to load, in the form [start, end], see load_jules_output_file_xarray.
+    chunk_days (int): The files are opened as dask backed datasets, split along the time dimension into chunks of
+                      this many whole days, so the data is only read from disk, one chunk at a time, when it is
+                      computed. Requires dask. If None every site is read into memory when the sites are aligned.
+
+    Returns:
+    data_xarray (xarray.Dataset): The sites stacked along the "site" dimension, with the boolean "time_mask"
+                                  coordinate (site, time) that is True where a site has data.
+    """
+
+    # Check the inputs
+    if(type(file_paths) != list or type(sites) != list):
+        raise ValueError("The input file_paths and sites must be lists.")
+
+    if(len(file_paths) != len(sites)):
+        raise ValueError("The input file_paths and sites must be the same length.")
+
+    if(len(sites) == 0):
+        raise ValueError("At least one site must be given.")
+
+    if(len(set(sites)) != len(sites)):
+        raise ValueError("The input sites must be unique.")
+
+    # Open each site's file
+    datasets = [load_jules_output_file_xarray(file_path, variables = variables, time_range = time_range,
+                                              chunk_days = chunk_days)
+                for file_path in file_paths]
+
+    # Align the sites onto the shared time axis
+    time_values = get_multi_site_time_values([data_xarray["time"].values for data_xarray in datasets])
+
+    aligned_datasets = []
+    time_masks = []
+    for data_xarray in datasets:
+        time_masks.append(np.isin(time_values, data_xarray["time"].values))
+        aligned_datasets.append(data_xarray.reindex(time = time_values))
+
+    # Variables without a time dimension, such as the latitude and longitude, are also stacked along the site
+    # dimension
+    data_xarray_out = xr.concat(aligned_datasets, dim = "site", data_vars = "all", join = "outer")
+    data_xarray_out = data_xarray_out.assign_coords(site = sites, time_mask = (("site", "time"), np.array(time_masks)))
+
+    # Keep the dask chunks aligned with the day boundaries on the shared time axis
+    if(chunk_days is not None):
+        data_xarray_out = data_xarray_out.chunk({"site": 1,
+                                                 "time": get_daily_time_chunks(time_values, chunk_days)})
+
+    return data_xarray_out
+
+
+def load_multi_site_dataset_from_folder(folder, file_pattern = JULES_FILE_PATTERN, sites = None, variables = None,
+                                        time_range = None, chunk_days = DEFAULT_CHUNK_DAYS, index_file = None):
+    """
+    Load the files for the sites in a folder, stacked along a "site" dimension. See load_multi_site_dataset.
+
+    Args:
+    folder (str): The folder holding one file for each site.
+    file_pattern (str): Regular expression for the file names, with a "site" group giving the site name. See
+                        site_catalogue.index_site_files.
+    sites (list): The sites to load. If None all the sites in the folder are loaded, sorted by name.
+    variables (list, str): The variables to load. If None all variables are loaded.
+    time_range (list): The range of times to load, in the form [start, end], see load_jules_output_file_xarray.
+    chunk_days (int): The number of whole days in each dask chunk, see load_multi_site_dataset.
+    index_file (str): JSON file the folder index is saved to, see site_catalogue.index_site_files.
+
+    Returns:
+    data_xarray (xarray.Dataset): The sites stacked along the "site" dimension.
+    """
+
+    site_files = index_site_files(folder, file_pattern, index_file)
+
+    if(sites is None):
+        sites = sorted(site_files)
+    else:
+        sites = [normalise_site_name(site) for site in sites]
+
+        missing_sites = [site for site in sites if site not in site_files]
+        if(len(missing_sites) > 0):
+            raise ValueError("No files found in " + str(folder) + " for the sites " + str(missing_sites) + ".")
+
+    return load_multi_site_dataset([site_files[site] for site in sites], sites, variables = variables,
+                                   time_range = time_range, chunk_days = chunk_days)
+
+
+def get_multi_site_time_values(time_values_list):
+    """
+    Get the shared time axis of several sites.
+
+    Args:
+    time_values_list (list): The time values of each site. List of np.ndarray.
+
+    Returns:
+    time_values (np.ndarray): The shared time values. A fixed time step from the first to the last time of any site
+                              if every site is on the same fixed time step at the same times of day, otherwise the
+                              sorted union of the sites' times.
+    """
+
+    non_empty_time_values = [time_values for time_values in time_values_list if len(time_values) > 0]
+
+    if(len(non_empty_time_values) == 0):
+        return np.array([], dtype = "datetime64[ns]")
+
+    union_time_values = np.unique(np.concatenate(non_empty_time_values))
+
+    # Check every site is on the same fixed time step
+    timestep = None
+    for time_values in non_empty_time_values:
+        if(len(time_values) < 2):
+            continue
+
+        time_steps = np.diff(time_values)
+        if(not (time_steps == time_steps[0]).all() or time_steps[0] <= np.timedelta64(0)):
+            return union_time_values
+
+        if(timestep is None):
+            timestep = time_steps[0]
+        elif(time_steps[0] != timestep):
+            return union_time_values
+
+    if(timestep is None):
+        return union_time_values
+
+    # Check the time steps of every site fall on the same grid
+    first_time = union_time_values[0]
+    for time_values in non_empty_time_values:
+        if((time_values[0] - first_time) % timestep != np.timedelta64(0)):
+            return union_time_values
+
+    return np.arange(first_time, union_time_values[-1] + timestep, timestep)
+
+
+def get_daily_site_mask(data_xarray):
+    """
+    Get which days each site has data for, used to mask the daily values of days added by the alignment.
+
+    Args:
+    data_xarray (xarray.Dataset): The sites stacked along the "site" dimension, see load_multi_site_dataset.
+
+    Returns:
+    daily_mask (xarray.DataArray): Boolean (site, time) mask of the days with at least one time step of data.
+                                   The time coordinate is the start of each day, as in the daily values.
+    """
+
+    if("time_mask" not in data_xarray.coords):
+        raise ValueError("The input data_xarray must have a time_mask coordinate, see load_multi_site_dataset.")
+
+    time_mask = data_xarray["time_mask"].reset_coords(drop = True)
+
+    return time_mask.resample(time = "1D").any()
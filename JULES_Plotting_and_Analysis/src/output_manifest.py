@@ -0,0 +1,148 @@
+"""
+Functions to record which inputs and settings the saved figures of a site were made from.
+
+A manifest is saved next to the figures of each site once they have all been saved. It holds a fingerprint of the
+input files (their path, size and modification time) and of the plotting settings, and the file names of the
+figures. If a later run has the same fingerprint and all the figures still exist, the site does not need to be
+plotted again.
+"""
+
+import json
+from datetime import date, datetime
+from os import getpid, replace, stat
+from os.path import abspath, dirname, exists, join
+
+# Increased when the figures change for the same inputs and settings, so the figures of older runs are replotted
+MANIFEST_VERSION = 1
+
+
+def get_file_fingerprint(file_path):
+    """
+    Get the fingerprint of an input file.
+
+    Args:
+    file_path (str): The file path.
+
+    Returns:
+    fingerprint (list): [absolute path, size in bytes, modification time in ns]
+    """
+
+    file_stat = stat(file_path)
+
+    return [abspath(file_path), file_stat.st_size, file_stat.st_mtime_ns]
+
+
+def get_output_fingerprint(input_files, settings):
+    """
+    Get the fingerprint of the inputs and settings the figures of a site are made from.
+
+    Args:
+    input_files (list): The input file paths. List of str.
+    settings (dict): The settings that change the figures, e.g. the plotting inputs. The values are stored as
+                     JSON, with dates as ISO format strings and tuples as lists.
+
+    Returns:
+    fingerprint (dict): The fingerprint, compared with the one saved in the manifest.
+    """
+
+    return {"version": MANIFEST_VERSION,
+            "inputs": [get_file_fingerprint(file_path) for file_path in input_files],
+            "settings": _json_value(settings)}
+
+
+def is_output_current(manifest_file, fingerprint):
+    """
+    Check if the figures recorded in a manifest were made from the same inputs and settings and still exist.
+
+    Args:
+    manifest_file (str): The manifest file. The figures are in the same folder.
+    fingerprint (dict): The current fingerprint, see get_output_fingerprint.
+
+    Returns:
+    current (bool): Whether the figures are up to date.
+    """
+
+    manifest = load_output_manifest(manifest_file)
+    if(manifest is None or manifest.get("fingerprint") != fingerprint):
+        return False
+
+    output_folder = dirname(abspath(manifest_file))
+
+    return all(exists(join(output_folder, file_name)) for file_name in manifest.get("outputs", []))
+
+
+def load_output_manifest(manifest_file):
+    """
+    Load a manifest.
+
+    Args:
+    manifest_file (str): The manifest file.
+
+    Returns:
+    manifest (dict): {"fingerprint": dict, "outputs": list of figure file names}. None if there is no valid
+                     manifest.
+    """
+
+    if(not exists(manifest_file)):
+        return None
+
+    try:
+        with open(manifest_file) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if(type(manifest) != dict):
+        return None
+
+    return manifest
+
+
+def save_output_manifest(manifest_file, fingerprint, output_files):
+    """
+    Save the manifest of a site's figures, once they have all been saved.
+
+    Args:
+    manifest_file (str): The manifest file, in the folder holding the figures.
+    fingerprint (dict): The fingerprint of the inputs and settings, see get_output_fingerprint.
+    output_files (list): The file names of the figures. List of str.
+
+    Returns:
+    None
+    """
+
+    manifest = {"fingerprint": fingerprint, "outputs": sorted(set(output_files))}
+
+    # Write to a temporary file first so a partly written manifest is never read
+    tmp_manifest_file = manifest_file + "." + str(getpid()) + ".tmp"
+    with open(tmp_manifest_file, "w") as file:
+        json.dump(manifest, file, indent = 1)
+    replace(tmp_manifest_file, manifest_file)
+
+    return None
+
+
+def _json_value(value):
+    """
+    Convert a setting to a value that is saved and compared as JSON.
+
+    Args:
+    value: The setting.
+
+    Returns:
+    value_out: The setting with tuples as lists, dates as ISO format strings and other unknown types as strings.
+    """
+
+    if(type(value) == dict):
+        return {str(key): _json_value(item) for key, item in value.items()}
+
+    if(type(value) in [list, tuple]):
+        return [_json_value(item) for item in value]
+
+    if(isinstance(value, (date, datetime))):
+        return value.isoformat()
+
+    if(value is None or type(value) in [str, int, float, bool]):
+        return value
+
+    return str(value)
@@ -0,0 +1,132 @@
+"""
+Plan and calculate the daily series drawn in a figure before any plotting is done.
+
+Each line in a figure is described by a DailySeriesRequest. The requests for a whole figure are collected up
+front, duplicates are removed, and each unique series is calculated once (optionally in parallel threads). The
+plotting code then draws the precomputed series.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from JULES_Plotting_and_Analysis.src.data_conversions.smoothed_daily_value import to_smoothed_daily_value
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import get_daily_values_at_time
+from JULES_Plotting_and_Analysis.src.data_conversions.unit_conversions import convert_daily_units
+from JULES_Plotting_and_Analysis.src.plotting.plot_time_series import smooth_time_series
+
+# A daily series to calculate
+# dataset: The index of the dataset in the list of datasets.
+# col_key: The key for the variable.
+# statistic: The daily statistic, see to_daily_value.DAILY_STATISTICS. None if time_of_day is given.
+# time_of_day: The time of day to take the daily values at, "HH:MM:SS". None if statistic is given.
+# pft_mean: Whether to average the variable over the plant functional types (PFTs) if it has a pft dimension.
+# unit_conversion: The unit conversion applied to the daily values, see unit_conversions.UNIT_CONVERSIONS.
+# smoothing, smoothing_type, percentiles: The smoothing applied to the daily values, see smooth_time_series.
+DailySeriesRequest = namedtuple("DailySeriesRequest",
+                                ["dataset", "col_key", "statistic", "time_of_day", "pft_mean", "unit_conversion",
+                                 "smoothing", "smoothing_type", "percentiles"],
+                                defaults = [None, None, False, None, None, "mean", None])
+
+
+def compute_daily_series_plan(datasets, requests, cache_folder = None, n_jobs = 1):
+    """
+    Calculate each unique daily series in a list of requests once.
+
+    Args:
+    datasets (list): The xarray datasets the requests refer to. List of xarray.Dataset.
+    requests (list): The daily series to calculate. List of DailySeriesRequest.
+    cache_folder (str): The folder holding the on-disk cache of daily values. If None the cache is not used.
+    n_jobs (int): The number of threads used to calculate the series.
+
+    Returns:
+    daily_series (list): The smoothed daily series for each request, in the same order as the requests.
+                         List of xarray.Dataset, see smooth_time_series. Duplicate requests share a dataset.
+    """
+
+    # The same dataset can be passed more than once, point the requests at its first occurrence
+    dataset_index = {}
+    for i in range(len(datasets)):
+        dataset_index.setdefault(id(datasets[i]), i)
+
+    # Remove the duplicate requests, keeping their order
+    normalised_requests = [_normalise_request(request, datasets, dataset_index) for request in requests]
+    unique_requests = list(dict.fromkeys(normalised_requests))
+
+    def compute(request):
+        return _compute_daily_series(datasets[request.dataset], request, cache_folder)
+
+    if(n_jobs == 1):
+        results = [compute(request) for request in unique_requests]
+    else:
+        with ThreadPoolExecutor(max_workers = n_jobs) as executor:
+            results = list(executor.map(compute, unique_requests))
+
+    results = dict(zip(unique_requests, results))
+
+    return [results[request] for request in normalised_requests]
+
+
+def _normalise_request(request, datasets, dataset_index):
+    """
+    Normalise a request so that requests for the same series compare equal.
+
+    Args:
+    request (DailySeriesRequest): The request.
+    datasets (list): The xarray datasets the requests refer to.
+    dataset_index (dict): {id of dataset: index of its first occurrence in datasets}
+
+    Returns:
+    request (DailySeriesRequest): The normalised request.
+    """
+
+    percentiles = request.percentiles
+    if(percentiles is not None):
+        percentiles = tuple(percentiles)
+
+    # Smoothing settings have no effect without smoothing
+    if(request.smoothing is None):
+        return request._replace(dataset = dataset_index[id(datasets[request.dataset])], smoothing_type = "mean",
+                                percentiles = None)
+
+    return request._replace(dataset = dataset_index[id(datasets[request.dataset])], percentiles = percentiles)
+
+
+def _compute_daily_series(data_xarray, request, cache_folder):
+    """
+    Calculate a single daily series.
+
+    Args:
+    data_xarray (xarray.Dataset): The dataset the request refers to.
+    request (DailySeriesRequest): The daily series to calculate.
+    cache_folder (str): The folder holding the on-disk cache of daily values. If None the cache is not used.
+
+    Returns:
+    data_xarray_out (xarray.Dataset): The smoothed daily series, see smooth_time_series.
+    """
+
+    col_key = request.col_key
+    pft_mean = request.pft_mean and "pft" in data_xarray[col_key].dims
+
+    if(request.time_of_day is not None):
+        # Select the time of day first, so the PFT mean is only taken over the selected values
+        data_xarray_daily = get_daily_values_at_time(data_xarray[[col_key]], request.time_of_day)
+
+        if(pft_mean):
+            data_xarray_daily = data_xarray_daily[[col_key]].mean(dim = "pft")
+
+    elif(request.statistic is not None):
+        if(pft_mean):
+            data_xarray = data_xarray[[col_key]].mean(dim = "pft")
+
+        # Calculate, convert and smooth the daily values together
+        return to_smoothed_daily_value(data_xarray, col_key, request.statistic, smoothing = request.smoothing,
+                                       smoothing_type = request.smoothing_type, percentiles = request.percentiles,
+                                       unit_conversion = request.unit_conversion, cache_folder = cache_folder)
+
+    else:
+        raise ValueError("A daily series request must give either a statistic or a time_of_day.")
+
+    data_xarray_daily = convert_daily_units(data_xarray_daily, col_key, request.unit_conversion, data_xarray)
+
+    return smooth_time_series(data_xarray_daily, col_key, smoothing = request.smoothing,
+                              smoothing_type = request.smoothing_type, percentiles = request.percentiles)
@@ -0,0 +1,296 @@
+"""
+Functions to decimate long time series before they are drawn.
+
+The time axis is split into bins about one pixel wide and only the first, last, minimum and maximum points of
+each bin are kept. The decimated line covers the same pixels as the full line, so the peaks are
+preserved, but the number of vertices drawn and saved depends on the width of the axis rather than the length
+of the record.
+
+Largest-triangle-three-buckets (LTTB) decimation is also available. It keeps one point per bin, chosen to
+preserve the visual shape of the line with fewer points, but unlike min/max decimation it may drop the peaks.
+"""
+
+import warnings
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+# The decimation methods
+DECIMATION_METHODS = ["min_max", "lttb"]
+
+
+def decimate_time_series(data_xarray, keys, axs, x_range = None, resolution_x_range = None, method = "min_max"):
+    """
+    Decimate the variables of a dataset along the time axis to the resolution of the axis they are drawn on.
+
+    Args:
+    data_xarray (xarray.Dataset): The dataset holding the lines to draw.
+    keys (list): The variables drawn, e.g. the median and the bounds of its percentile band. The time steps kept
+                 are shared by all of them, so the lines stay aligned.
+    axs (plt.axis): The axis the lines are drawn on.
+    x_range (list): The range of times the axis shows, [min, max] as np.datetime64. The times outside it are
+                    dropped, apart from the nearest time on each side so the lines reach the edges of the axis
+                    and the extremes of each side so the y axis is scaled the same.
+                    If None the axis shows all the times.
+    resolution_x_range (list): The range of times the decimation is resolved for, see get_decimation_bins. Set
+                               it to the narrowest range the axis will be zoomed to. If None x_range is used.
+    method (str): The decimation method, see DECIMATION_METHODS.
+
+    Returns:
+    data_xarray_out (xarray.Dataset): The dataset at the time steps kept.
+    """
+
+    if(method not in DECIMATION_METHODS):
+        raise ValueError("Unknown decimation method '" + str(method) + "'. Must be one of "
+                         + str(DECIMATION_METHODS) + ".")
+
+    time_values = data_xarray["time"].values
+
+    # Drop the times outside the range shown
+    start = 0
+    end = len(time_values)
+    if(x_range is not None):
+        start = max(int(np.searchsorted(time_values, x_range[0], side = "left")) - 1, 0)
+        end = min(int(np.searchsorted(time_values, x_range[1], side = "right")) + 1, len(time_values))
+
+    if(resolution_x_range is None):
+        resolution_x_range = x_range
+
+    n_bins = get_decimation_bins(axs, time_values[start:end], resolution_x_range)
+
+    line_values = [data_xarray[key].transpose("time", ...).values for key in keys]
+
+    get_positions = get_min_max_positions
+    if(method == "lttb"):
+        get_positions = get_lttb_positions
+
+    positions = [start + get_positions(time_values[start:end], [values[start:end] for values in line_values],
+                                       n_bins)]
+
+    # Keep the extremes of the times dropped on each side, so the y axis is scaled as it would be for all the times
+    for side_start, side_end in [(0, start), (end, len(time_values))]:
+        if(side_end > side_start):
+            positions.append(side_start + get_min_max_positions(time_values[side_start:side_end],
+                                                                [values[side_start:side_end]
+                                                                 for values in line_values], 1))
+
+    positions = np.unique(np.concatenate(positions))
+
+    if(len(positions) == len(time_values)):
+        return data_xarray
+
+    return data_xarray.isel(time = positions)
+
+
+def get_min_max_positions(x_values, y_values_list, n_bins):
+    """
+    Get the positions of the points kept by min/max decimation.
+
+    The first and last points of each bin are kept so the lines joining neighbouring bins are unchanged, along with
+    the minimum and maximum of each bin. Missing values are skipped when finding the minimum and maximum.
+
+    Args:
+    x_values (np.ndarray): The x values, sorted in ascending order. Numbers or datetime64.
+    y_values_list (list): The y values of each line drawn against the x values, e.g. a median and the bounds of
+                          its percentile band. List of np.ndarray with the x axis first. The positions keep the
+                          minimum and maximum of every line in every bin.
+    n_bins (int): The number of bins to split the range of the x values into.
+
+    Returns:
+    positions (np.ndarray): The sorted positions of the points to keep. All positions if the lines are too short
+                            to be reduced.
+    """
+
+    if(type(n_bins) != int or n_bins < 1):
+        raise ValueError("The input n_bins must be a positive integer.")
+
+    n_values = len(x_values)
+
+    # Each bin keeps at most four points, so there is nothing to gain on short lines
+    if(n_values <= 4 * n_bins):
+        return np.arange(n_values)
+
+    x_numeric = _to_numeric(x_values)
+
+    if(not (np.diff(x_numeric) >= 0).all()):
+        raise ValueError("The input x_values must be sorted in ascending order.")
+
+    # The bins are contiguous runs of points as the x values are sorted
+    bin_edges = np.linspace(x_numeric[0], x_numeric[-1], n_bins + 1)
+    bin_index = np.clip(np.searchsorted(bin_edges, x_numeric, side = "right") - 1, 0, n_bins - 1)
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(bin_index)) + 1])
+    counts = np.diff(np.concatenate([starts, [n_values]]))
+
+    point_positions = np.arange(n_values)[:, np.newaxis]
+
+    positions = [starts, starts + counts - 1]
+    for y_values in y_values_list:
+        y_values = np.asarray(y_values, dtype = float).reshape(n_values, -1)
+
+        with np.errstate(invalid = "ignore"):
+            for reduce in [np.fmin, np.fmax]:
+                # The extreme value of each bin, then the first point in the bin that has it
+                bin_values = reduce.reduceat(y_values, starts, axis = 0)
+                is_extreme = y_values == np.repeat(bin_values, counts, axis = 0)
+
+                bin_positions = np.minimum.reduceat(np.where(is_extreme, point_positions, n_values), starts,
+                                                    axis = 0)
+
+                # Bins without any values only keep their first and last points
+                bin_positions = np.where(bin_positions == n_values, starts[:, np.newaxis], bin_positions)
+
+                positions.append(bin_positions.ravel())
+
+    return np.unique(np.concatenate(positions))
+
+
+def get_lttb_positions(x_values, y_values_list, n_bins):
+    """
+    Get the positions of the points kept by largest-triangle-three-buckets (LTTB) decimation.
+
+    The first and last points are kept and the points between them are split into buckets of equal numbers of
+    points. From each bucket the point forming the largest triangle with the point kept from the previous bucket and
+    the average of the next bucket is kept. Missing values are skipped.
+
+    Args:
+    x_values (np.ndarray): The x values, sorted in ascending order. Numbers or datetime64.
+    y_values_list (list): The y values of each line drawn against the x values, e.g. a median and the bounds of
+                          its percentile band. List of np.ndarray with the x axis first. The positions are the union
+                          of those kept for every line.
+    n_bins (int): The number of buckets to split the points between the first and last into.
+
+    Returns:
+    positions (np.ndarray): The sorted positions of the points to keep. All positions if the lines are too short
+                            to be reduced.
+    """
+
+    if(type(n_bins) != int or n_bins < 1):
+        raise ValueError("The input n_bins must be a positive integer.")
+
+    n_values = len(x_values)
+
+    # Each bucket keeps one point, along with the first and last points
+    if(n_values <= n_bins + 2):
+        return np.arange(n_values)
+
+    x_numeric = _to_numeric(x_values)
+
+    if(not (np.diff(x_numeric) >= 0).all()):
+        raise ValueError("The input x_values must be sorted in ascending order.")
+
+    # Offset the x values so the areas are not calculated with large numbers, e.g. times in nanoseconds
+    x_numeric = x_numeric - x_numeric[0]
+
+    bucket_edges = np.linspace(1, n_values - 1, n_bins + 1).astype(int)
+
+    positions = [np.array([0, n_values - 1])]
+    for y_values in y_values_list:
+        y_values = np.asarray(y_values, dtype = float).reshape(n_values, -1)
+
+        for i in range(y_values.shape[1]):
+            positions.append(_get_lttb_line_positions(x_numeric, y_values[:, i], bucket_edges))
+
+    return np.unique(np.concatenate(positions))
+
+
+def _get_lttb_line_positions(x_values, y_values, bucket_edges):
+    """
+    Get the position of the point kept from each bucket of a single line by LTTB decimation.
+
+    Args:
+    x_values (np.ndarray): The x values as floats, sorted in ascending order.
+    y_values (np.ndarray): The y values of the line. 1D.
+    bucket_edges (np.ndarray): The positions the buckets start at, followed by the position the last one ends at.
+
+    Returns:
+    positions (np.ndarray): The position of the point kept from each bucket.
+    """
+
+    n_values = len(x_values)
+    n_buckets = len(bucket_edges) - 1
+
+    positions = np.empty(n_buckets, dtype = int)
+    selected = 0
+    for i in range(n_buckets):
+        start, end = bucket_edges[i], bucket_edges[i + 1]
+
+        # The average of the next bucket, or the last point for the last bucket
+        next_start, next_end = n_values - 1, n_values
+        if(i < n_buckets - 1):
+            next_start, next_end = bucket_edges[i + 1], bucket_edges[i + 2]
+
+        with np.errstate(invalid = "ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", category = RuntimeWarning)
+            next_x = x_values[next_start:next_end].mean()
+            next_y = np.nanmean(y_values[next_start:next_end])
+
+            # Twice the area of the triangle each point forms with the previous point kept and the next average
+            areas = np.abs((x_values[selected] - next_x) * (y_values[start:end] - y_values[selected])
+                           - (x_values[selected] - x_values[start:end]) * (next_y - y_values[selected]))
+
+        # Buckets without any areas keep their first point
+        selected = start
+        if(not np.isnan(areas).all()):
+            selected = start + int(np.nanargmax(areas))
+
+        positions[i] = selected
+
+    return positions
+
+
+def get_decimation_bins(axs, x_values, x_range = None):
+    """
+    Get the number of bins needed to decimate a line to the resolution of an axis.
+
+    Args:
+    axs (plt.axis): The axis the line is drawn on.
+    x_values (np.ndarray): The x values of the line, sorted in ascending order. Numbers or datetime64.
+    x_range (list): The range of x values the axis shows, [min, max], in the same type as the x values. The
+                    resolution is one bin per pixel over this range and the same bin width is used for the values
+                    outside it. If None the axis shows the full range of the x values.
+
+    Returns:
+    n_bins (int): The number of bins.
+    """
+
+    # The width of the axis in pixels, at the resolution the figure is saved at if that is higher
+    fig = axs.get_figure()
+    pixel_width = axs.get_window_extent().width
+
+    savefig_dpi = plt.rcParams["savefig.dpi"]
+    if(savefig_dpi != "figure" and savefig_dpi > fig.dpi):
+        pixel_width = pixel_width * savefig_dpi / fig.dpi
+
+    pixel_width = max(int(np.ceil(pixel_width)), 1)
+
+    if(x_range is None or len(x_values) < 2):
+        return pixel_width
+
+    x_numeric = _to_numeric(x_values)
+    x_range_numeric = _to_numeric(x_range)
+
+    data_span = x_numeric[-1] - x_numeric[0]
+    view_span = x_range_numeric[1] - x_range_numeric[0]
+
+    if(view_span <= 0 or data_span <= view_span):
+        return pixel_width
+
+    return int(np.ceil(pixel_width * data_span / view_span))
+
+
+def _to_numeric(values):
+    """
+    Convert x values to floats, so the bins can be calculated for numbers and times alike.
+
+    Args:
+    values (np.ndarray, list): The values. Numbers or datetime64.
+
+    Returns:
+    values_numeric (np.ndarray): The values as floats. Times are in nanoseconds.
+    """
+
+    values = np.asarray(values)
+    if(values.dtype.kind == "M"):
+        values = values.astype("datetime64[ns]").astype(np.int64)
+
+    return values.astype(float)
@@ -17,7 +17,8 @@ def plot_col_at_daily_time(data_xarray,
                            label = None,
                            axis = None,
                            title = None,
-                           linestyle = '-'):
+                           linestyle = '-',
+                           decimation = None):
 
     """
     Plot the value of some input column at a given time of each day.
@@ -34,6 +35,8 @@ def plot_col_at_daily_time(data_xarray,
     label (str): The label for the date in the plot's legend.
     axis (plt.axis): The axis to plot the data on.
     title (str): The title of the plot.
+    decimation (str): Decimate the line to the pixel width of the axis before drawing it, see plot_time_series.
+                      If None every point is drawn.
 
     Returns:
     None
@@ -45,6 +48,7 @@ def plot_col_at_daily_time(data_xarray,
     # Plot the daily values
     plot_time_series(data_xarray_daily, variable_key,
                      smoothing = smoothing, smoothing_type = smoothing_type, percentiles = percentiles,
-                     x_range = x_range, c = c, label = label, axs = axis, title = title, linestyle = linestyle)
+                     x_range = x_range, c = c, label = label, axs = axis, title = title, linestyle = linestyle,
+                     decimation = decimation)
 
     return None
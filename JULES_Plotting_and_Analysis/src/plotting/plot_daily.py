@@ -9,11 +9,13 @@ Plot timeseries data for different daily atributes:
 """
 
 from JULES_Plotting_and_Analysis.src.plotting.plot_time_series import plot_time_series
+from JULES_Plotting_and_Analysis.src.data_conversions.smoothed_daily_value import to_smoothed_daily_value
 
 
 def plot_daily_total(data_xarray, col_key,
                      smoothing = None, smoothing_type = 'mean', percentiles = None, x_range = None, c ='blue',
-                     label = None, axs = None, title = None, linestyle = '-', linewidth = 1.):
+                     label = None, axs = None, title = None, linestyle = '-', linewidth = 1.,
+                     cache_folder = None, unit_conversion = None, decimation = None):
     """
     Plot the daily total for a given variable.
 
@@ -29,26 +31,35 @@ def plot_daily_total(data_xarray, col_key,
     title (str): The title of the plot.
     linestyle (str): The linestyle of the plot.
     linewidth (float): The width of the line.
+    cache_folder (str): The folder holding the on-disk cache of daily values. If None the cache is not used.
+    unit_conversion (str): The unit conversion applied to the daily values, see unit_conversions.UNIT_CONVERSIONS.
+                           If None the units are not converted.
+    decimation (str): Decimate the line to the pixel width of the axis before drawing it, see plot_time_series.
+                      If None every point is drawn.
 
     Returns:
     None
     """
 
-    # Calculate the daily total GPP
-    data_xarray_daily_total = data_xarray[[col_key]].resample(time="1D").sum()
+    # Calculate the daily total GPP and smooth it
+    data_xarray_daily_total = to_smoothed_daily_value(data_xarray, col_key, "total",
+                                                      smoothing = smoothing, smoothing_type = smoothing_type,
+                                                      percentiles = percentiles, unit_conversion = unit_conversion,
+                                                      cache_folder = cache_folder)
 
     # Plot the daily total GPP
     plot_time_series(data_xarray_daily_total, col_key,
                      smoothing = smoothing, smoothing_type = smoothing_type, percentiles = percentiles,
                      x_range = x_range, c = c, label = label, axs = axs, title = title, linestyle = linestyle,
-                     linewidth = linewidth)
+                     linewidth = linewidth, smoothed = True, decimation = decimation)
 
     return None
 
 
 def plot_daily_mean(data_xarray, col_key,
                     smoothing = None, smoothing_type = 'mean', percentiles = None, x_range = None, c ='blue', label = None,
-                    axs = None, title = None, linestyle = '-', linewidth = 1.):
+                    axs = None, title = None, linestyle = '-', linewidth = 1.,
+                    cache_folder = None, unit_conversion = None, decimation = None):
     """
     Plot the daily mean for a given variable.
 
@@ -64,26 +75,35 @@ def plot_daily_mean(data_xarray, col_key,
     title (str): The title of the plot.
     linestyle (str): The linestyle of the plot.
     linewidth (float): The width of the line.
+    cache_folder (str): The folder holding the on-disk cache of daily values. If None the cache is not used.
+    unit_conversion (str): The unit conversion applied to the daily values, see unit_conversions.UNIT_CONVERSIONS.
+                           If None the units are not converted.
+    decimation (str): Decimate the line to the pixel width of the axis before drawing it, see plot_time_series.
+                      If None every point is drawn.
 
     Returns:
     None
     """
 
-    # Calculate the daily mean
-    data_xarray_daily_total = data_xarray[[col_key]].resample(time="1D").mean()
+    # Calculate the daily mean and smooth it
+    data_xarray_daily_total = to_smoothed_daily_value(data_xarray, col_key, "mean",
+                                                      smoothing = smoothing, smoothing_type = smoothing_type,
+                                                      percentiles = percentiles, unit_conversion = unit_conversion,
+                                                      cache_folder = cache_folder)
 
     # Plot the daily mean
     plot_time_series(data_xarray_daily_total, col_key,
                      smoothing = smoothing, smoothing_type = smoothing_type, percentiles = percentiles,
                      x_range = x_range, c = c, label = label, axs = axs, title = title, linestyle = linestyle,
-                     linewidth = linewidth)
+                     linewidth = linewidth, smoothed = True, decimation = decimation)
 
     return None
 
 
 def plot_daily_median(data_xarray, col_key,
                       smoothing = None, smoothing_type = 'mean', percentiles = None, x_range = None, c ='blue', label = None,
-                      axs = None, title = None, linestyle = '-', linewidth = 1.):
+                      axs = None, title = None, linestyle = '-', linewidth = 1.,
+                      cache_folder = None, unit_conversion = None, decimation = None):
     """
     Plot the daily median for a given variable.
 
@@ -99,26 +119,35 @@ def plot_daily_median(data_xarray, col_key,
     title (str): The title of the plot.
     linestyle (str): The linestyle of the plot.
     linewidth (float): The width of the line.
+    cache_folder (str): The folder holding the on-disk cache of daily values. If None the cache is not used.
+    unit_conversion (str): The unit conversion applied to the daily values, see unit_conversions.UNIT_CONVERSIONS.
+                           If None the units are not converted.
+    decimation (str): Decimate the line to the pixel width of the axis before drawing it, see plot_time_series.
+                      If None every point is drawn.
 
     Returns:
     None
     """
 
-    # Calculate the daily total GPP
-    data_xarray_daily_total = data_xarray[[col_key]].resample(time="1D").median()
+    # Calculate the daily total GPP and smooth it
+    data_xarray_daily_total = to_smoothed_daily_value(data_xarray, col_key, "median",
+                                                      smoothing = smoothing, smoothing_type = smoothing_type,
+                                                      percentiles = percentiles, unit_conversion = unit_conversion,
+                                                      cache_folder = cache_folder)
 
     # Plot the daily total GPP
     plot_time_series(data_xarray_daily_total, col_key,
                      smoothing = smoothing, smoothing_type = smoothing_type, percentiles = percentiles,
                      x_range = x_range, c = c, label = label, axs = axs, title = title, linestyle = linestyle,
-                     linewidth = linewidth)
+                     linewidth = linewidth, smoothed = True, decimation = decimation)
 
     return None
 
 
 def plot_daily_max(data_xarray, col_key,
                    smoothing = None, smoothing_type = 'mean', percentiles = None, x_range = None, c ='blue', label = None,
-                   axs = None, title = None, linestyle = '-', linewidth = 1.):
+                   axs = None, title = None, linestyle = '-', linewidth = 1.,
+                   cache_folder = None, unit_conversion = None, decimation = None):
     """
     Plot the daily maximum for a given variable.
 
@@ -134,26 +163,35 @@ def plot_daily_max(data_xarray, col_key,
     title (str): The title of the plot.
     linestyle (str): The linestyle of the plot.
     linewidth (float): The width of the line.
+    cache_folder (str): The folder holding the on-disk cache of daily values. If None the cache is not used.
+    unit_conversion (str): The unit conversion applied to the daily values, see unit_conversions.UNIT_CONVERSIONS.
+                           If None the units are not converted.
+    decimation (str): Decimate the line to the pixel width of the axis before drawing it, see plot_time_series.
+                      If None every point is drawn.
 
     Returns:
     None
     """
 
-    # Calculate the daily total GPP
-    data_xarray_daily_total = data_xarray[[col_key]].resample(time="1D").max()
+    # Calculate the daily total GPP and smooth it
+    data_xarray_daily_total = to_smoothed_daily_value(data_xarray, col_key, "max",
+                                                      smoothing = smoothing, smoothing_type = smoothing_type,
+                                                      percentiles = percentiles, unit_conversion = unit_conversion,
+                                                      cache_folder = cache_folder)
 
     # Plot the daily total GPP
     plot_time_series(data_xarray_daily_total, col_key,
                      smoothing = smoothing, smoothing_type = smoothing_type, percentiles = percentiles,
                      x_range = x_range, c = c, label = label, axs = axs, title = title, linestyle = linestyle,
-                     linewidth = linewidth)
+                     linewidth = linewidth, smoothed = True, decimation = decimation)
 
     return None
 
 
 def plot_daily_min(data_xarray, col_key,
                    smoothing = None, smoothing_type = 'mean', percentiles = None, x_range = None, c ='blue', label = None,
-                   axs = None, title = None, linestyle = '-', linewidth = 1.):
+                   axs = None, title = None, linestyle = '-', linewidth = 1.,
+                   cache_folder = None, unit_conversion = None, decimation = None):
     """
     Plot the daily minimum for a given variable.
 
@@ -169,26 +207,35 @@ def plot_daily_min(data_xarray, col_key,
     title (str): The title of the plot.
     linestyle (str): The linestyle of the plot.
     linewidth (float): The width of the line.
+    cache_folder (str): The folder holding the on-disk cache of daily values. If None the cache is not used.
+    unit_conversion (str): The unit conversion applied to the daily values, see unit_conversions.UNIT_CONVERSIONS.
+                           If None the units are not converted.
+    decimation (str): Decimate the line to the pixel width of the axis before drawing it, see plot_time_series.
+                      If None every point is drawn.
 
     Returns:
     None
     """
 
-    # Calculate the daily total GPP
-    data_xarray_daily_total = data_xarray[[col_key]].resample(time="1D").min()
+    # Calculate the daily total GPP and smooth it
+    data_xarray_daily_total = to_smoothed_daily_value(data_xarray, col_key, "min",
+                                                      smoothing = smoothing, smoothing_type = smoothing_type,
+                                                      percentiles = percentiles, unit_conversion = unit_conversion,
+                                                      cache_folder = cache_folder)
 
     # Plot the daily total GPP
     plot_time_series(data_xarray_daily_total, col_key,
                      smoothing = smoothing, smoothing_type = smoothing_type, percentiles = percentiles,
                      x_range = x_range, c = c, label = label, axs = axs, title = title, linestyle = linestyle,
-                     linewidth = linewidth)
+                     linewidth = linewidth, smoothed = True, decimation = decimation)
 
     return None
 
 
 def plot_daily_std(data_xarray, col_key,
                    smoothing = None, smoothing_type = 'mean', percentiles = None, x_range = None, c ='blue', label = None,
-                   axs = None, title = None, linestyle = '-', linewidth = 1.):
+                   axs = None, title = None, linestyle = '-', linewidth = 1.,
+                   cache_folder = None, unit_conversion = None, decimation = None):
     """
     Plot the daily standard deviation for a given variable.
 
@@ -204,18 +251,26 @@ def plot_daily_std(data_xarray, col_key,
     title (str): The title of the plot.
     linestyle (str): The linestyle of the plot.
     linewidth (float): The width of the line.
+    cache_folder (str): The folder holding the on-disk cache of daily values. If None the cache is not used.
+    unit_conversion (str): The unit conversion applied to the daily values, see unit_conversions.UNIT_CONVERSIONS.
+                           If None the units are not converted.
+    decimation (str): Decimate the line to the pixel width of the axis before drawing it, see plot_time_series.
+                      If None every point is drawn.
 
     Returns:
     None
     """
 
-    # Calculate the daily total GPP
-    data_xarray_daily_total = data_xarray[[col_key]].resample(time="1D").std()
+    # Calculate the daily total GPP and smooth it
+    data_xarray_daily_total = to_smoothed_daily_value(data_xarray, col_key, "std",
+                                                      smoothing = smoothing, smoothing_type = smoothing_type,
+                                                      percentiles = percentiles, unit_conversion = unit_conversion,
+                                                      cache_folder = cache_folder)
 
     # Plot the daily total GPP
     plot_time_series(data_xarray_daily_total, col_key,
                      smoothing = smoothing, smoothing_type = smoothing_type, percentiles = percentiles,
                      x_range = x_range, c = c, label = label, axs = axs, title = title, linestyle = linestyle,
-                     linewidth = linewidth)
+                     linewidth = linewidth, smoothed = True, decimation = decimation)
 
     return None
@@ -4,9 +4,10 @@ Plot the flux data from a set of jules outputs.
 
 import xarray
 import matplotlib.pyplot as plt
-from JULES_Plotting_and_Analysis.src.plotting.plot_daily import plot_daily_total, plot_daily_mean
-from JULES_Plotting_and_Analysis.src.plotting.plot_col_at_daily_time import plot_col_at_daily_time
-from JULES_Plotting_and_Analysis.src.load_jules_output_file import open_dataset
+from JULES_Plotting_and_Analysis.src.plotting.plot_time_series import plot_time_series
+from JULES_Plotting_and_Analysis.src.plotting.daily_series_plan import DailySeriesRequest, compute_daily_series_plan
+from JULES_Plotting_and_Analysis.src.data_conversions.time_alignment import colocate_observations
+from JULES_Plotting_and_Analysis.src.load_jules_output_file import load_jules_output_file_xarray, chunk_by_days
 
 
 def plot_flux_data(data_xarrays,
@@ -34,7 +35,17 @@ def plot_flux_data(data_xarrays,
                    observation_line_width = 2,
                    additional_sub_plots = 0,
                    legend = True,
-                   axs_beta_range = (-0.05, 1.05)):
+                   axs_beta_range = (-0.05, 1.05),
+                   cache_folder = None,
+                   gpp_unit_conversion = "kgC m-2 s-1 -> gC m-2 timestep-1",
+                   observation_gpp_unit_conversion = "umol m-2 s-1 -> gC m-2 timestep-1",
+                   n_jobs = 1,
+                   decimation = None,
+                   decimation_x_range = None,
+                   align_observations = False,
+                   model_time_offset = None,
+                   observation_time_offset = None,
+                   chunk_days = None):
 
     """
     Plot the flux data from a set of jules outputs.
@@ -65,6 +76,33 @@ def plot_flux_data(data_xarrays,
     :param additional_sub_plots: The number of additional plots to add to the bottom of the figure. Integer.
     :param legend: Whether to add a legend to the plot. Boolean.
     :param axs_beta_range: The range of the y-axis for the fractional soil moisture content plot. Tuple of floats.
+    :param cache_folder: The folder holding the on-disk cache of daily values. None to not use the cache. String.
+    :param gpp_unit_conversion: The unit conversion applied to the JULES GPP, see unit_conversions.UNIT_CONVERSIONS.
+                                None to not convert the units. String.
+    :param observation_gpp_unit_conversion: The unit conversion applied to the observational GPP. None to not
+                                            convert the units. String.
+    :param n_jobs: The number of threads used to calculate the daily series before plotting. Integer.
+    :param decimation: Decimate each line to the pixel width of its axis before drawing it, see
+                       plot_time_series. 'min_max' keeps the minimum and maximum of each pixel and 'lttb' one point
+                       per pixel by largest-triangle-three-buckets. None to draw every point. String.
+    :param decimation_x_range: The narrowest range of dates the figure will be zoomed to, so the decimation is
+                               resolved for it. None to use x_range. List of datetime objects.
+    :param align_observations: Whether to co-locate the GPP and latent heat of each JULES output with the
+                               observations before plotting, see time_alignment.colocate_observations. Each pair is
+                               averaged onto the coarser of the two time steps over the period both cover, after
+                               shifting their times by the offsets below. The observations are drawn once, as
+                               co-located with the first JULES output. The stress indicators are not co-located.
+                               Boolean.
+    :param model_time_offset: The offset added to the JULES output times when aligning, in hours or a timedelta.
+                              E.g. -0.5 for half hourly times labelling the end of each time step. None for no
+                              offset. Float.
+    :param observation_time_offset: The offset added to the observation times when aligning, in hours or a
+                                    timedelta. E.g. minus the site's UTC offset for observations in local standard
+                                    time. None for no offset. Float.
+    :param chunk_days: If given the input datasets are split into dask chunks of this many whole days, so the
+                       daily values are read and calculated one chunk at a time rather than from whole files held
+                       in memory, see load_jules_output_file.chunk_by_days. Best used with lazily opened files.
+                       None to use the inputs as they are. Integer.
     :return: fig, axs
     """
 
@@ -85,6 +123,30 @@ def plot_flux_data(data_xarrays,
     elif(type(data_colours) != list):
         raise ValueError("The input data_colours must be a string or list of strings.")
 
+    # Split the inputs into chunks of whole days, so the daily values are calculated one chunk at a time
+    if(chunk_days is not None):
+        data_xarrays = [chunk_by_days(data_xarray, chunk_days) for data_xarray in data_xarrays]
+        if(observation_xarray is not None):
+            observation_xarray = chunk_by_days(observation_xarray, chunk_days)
+
+    # Co-locate the fluxes of each JULES output with the observations, so both are on the same time steps.
+    # The observations are drawn as co-located with the first JULES output.
+    flux_xarrays = data_xarrays
+    if(align_observations and observation_xarray is not None):
+        model_keys = [key for key in [gpp_key, latent_heat_key] if key is not None]
+        observation_keys = [key for key in [observation_gpp_key, observation_latent_heat_key] if key is not None]
+
+        flux_xarrays = []
+        observation_xarrays = []
+        for data_xarray in data_xarrays:
+            flux_xarray, aligned_observation_xarray = colocate_observations(
+                data_xarray, observation_xarray, model_keys = model_keys, observation_keys = observation_keys,
+                model_time_offset = model_time_offset, observation_time_offset = observation_time_offset)
+            flux_xarrays.append(flux_xarray)
+            observation_xarrays.append(aligned_observation_xarray)
+
+        observation_xarray = observation_xarrays[0]
+
     # -- Check if water potential and/or fsmc value is being plotted. --
     if("beta" in stress_indicator or "beta&wp" in stress_indicator):
         plot_beta = True
@@ -96,27 +158,6 @@ def plot_flux_data(data_xarrays,
     else:
         plot_wp = False
 
-    # --- Data processing. ---
-
-    # First we need to convert the units of the GPP data from both the JULES output files and the observation file.
-
-    # Convert GPP data units from kgC m-2 s-1 to gC m-2 timestep-1
-    # kgC -> gC: * 1000
-    # s-1 -> timestep-1: * timestep
-    for i in range(len(data_xarrays)):
-        timestep = data_xarrays[i]["time"].values[1] - data_xarrays[i]["time"].values[0]
-        timestep = timestep.astype("timedelta64[s]").astype(int)
-        data_xarrays[i][gpp_key] = data_xarrays[i][gpp_key] * 1000 * timestep
-
-    # Convert GPP data units from umol m-2 s-1 to gC m-2 timestep-1
-    # umol -> mol: * 1e-6
-    # molC -> gC: * 12.01
-    # s-1 -> timestep-1: * timestep
-    if(observation_xarray is not None and observation_gpp_key is not None):
-        timestep = observation_xarray["time"].values[1] - observation_xarray["time"].values[0]
-        timestep = timestep.astype("timedelta64[s]").astype(int)
-        observation_xarray[observation_gpp_key] = observation_xarray[observation_gpp_key] * 1e-6 * 12.01 * timestep
-
     # --- Figure setup ---
     # Create figure with multiple subplots.
     fig, axs = plt.subplots(3 + additional_sub_plots, 1, figsize=fig_size, sharex=True)
@@ -148,96 +189,106 @@ def plot_flux_data(data_xarrays,
     # Label the x-axis
     axs[2].set_xlabel('Date')
 
-    # ---- Plot the GPP data ----
-    for i in range(len(data_xarrays)):
-        plot_daily_total(data_xarrays[i], gpp_key, c = data_colours[i], label = labels[i], axs = axs[0],
-                         title = "", smoothing = smoothing, smoothing_type = smoothing_type, percentiles = percentiles,
-                         x_range = x_range, linestyle = data_line_style, linewidth = data_line_width)
+    # --- Data processing. ---
 
-    # Plot the observational data
-    if(observation_xarray is not None and observation_gpp_key is not None):
-        plot_daily_total(observation_xarray, observation_gpp_key, c=observation_colours, label="Observation",
-                         axs=axs[0], title="", smoothing=smoothing, smoothing_type = smoothing_type,
-                         percentiles = percentiles, x_range=x_range, linestyle = observation_line_style,
-                         linewidth = observation_line_width)
+    # Every line in the figure is described by a daily series request and the axis to draw it on.
+    # All the requests are collected first, so each unique daily series is only calculated once.
+    # The units of the GPP data from both the JULES output files and the observation file are converted to
+    # gC m-2 timestep-1. The conversion is applied to the daily totals, so the input datasets are not modified.
+    # The GPP and latent heat are read from the co-located JULES outputs when the observations are aligned
+    datasets = list(data_xarrays)
+    flux_offset = 0
+    if(flux_xarrays is not data_xarrays):
+        flux_offset = len(datasets)
+        datasets.extend(flux_xarrays)
 
-    # set the y-axis label
-    axs[0].set_ylabel("GPP (gC m-2 day-1)")
+    observation_index = None
+    if(observation_xarray is not None):
+        observation_index = len(datasets)
+        datasets.append(observation_xarray)
 
-    # ---- Plot the latent heat data ----
-    for i in range(len(data_xarrays)):
-        plot_daily_mean(data_xarrays[i], latent_heat_key, c = data_colours[i], label = labels[i], axs = axs[1],
-                        title = "", smoothing = smoothing, smoothing_type = smoothing_type, percentiles = percentiles,
-                        x_range = x_range, linestyle = data_line_style, linewidth = data_line_width)
+    if(percentiles is not None):
+        percentiles = tuple(percentiles)
 
-    # Plot the observational data
-    if (observation_xarray is not None and observation_latent_heat_key is not None):
-        plot_daily_mean(observation_xarray, observation_latent_heat_key, c=observation_colours, label="Observation",
-                        axs=axs[1], title="", smoothing=smoothing, smoothing_type = smoothing_type,
-                        percentiles = percentiles, x_range=x_range, linestyle = observation_line_style,
-                        linewidth = observation_line_width)
+    smoothing_settings = {"smoothing": smoothing, "smoothing_type": smoothing_type, "percentiles": percentiles}
 
-    # set the y-axis label
-    axs[1].set_ylabel("Latent Heat (W m-2)")
+    # List of [request, axis name, colour, label, linestyle, linewidth, x_range]
+    planned_lines = []
+
+    # -- GPP --
+    for i in range(len(data_xarrays)):
+        planned_lines.append([DailySeriesRequest(flux_offset + i, gpp_key, statistic = "total",
+                                                 unit_conversion = gpp_unit_conversion, **smoothing_settings),
+                              "gpp", data_colours[i], labels[i], data_line_style, data_line_width, x_range])
+
+    if(observation_xarray is not None and observation_gpp_key is not None):
+        planned_lines.append([DailySeriesRequest(observation_index, observation_gpp_key, statistic = "total",
+                                                 unit_conversion = observation_gpp_unit_conversion,
+                                                 **smoothing_settings),
+                              "gpp", observation_colours, "Observation", observation_line_style,
+                              observation_line_width, x_range])
 
-    # ---- Plot the stress indicator ----
+    # -- Latent heat --
     for i in range(len(data_xarrays)):
+        planned_lines.append([DailySeriesRequest(flux_offset + i, latent_heat_key, statistic = "mean",
+                                                 **smoothing_settings),
+                              "latent_heat", data_colours[i], labels[i], data_line_style, data_line_width, x_range])
+
+    if(observation_xarray is not None and observation_latent_heat_key is not None):
+        planned_lines.append([DailySeriesRequest(observation_index, observation_latent_heat_key, statistic = "mean",
+                                                 **smoothing_settings),
+                              "latent_heat", observation_colours, "Observation", observation_line_style,
+                              observation_line_width, x_range])
+
+    # -- Stress indicator --
+    # The leaf and root zone water potentials are averaged over the plant functional types (PFTs).
+    for i in range(len(data_xarrays)):
+        psi_root_request = DailySeriesRequest(i, psi_root_key, time_of_day = "06:00:00", pft_mean = True,
+                                              **smoothing_settings)
+        psi_leaf_request = DailySeriesRequest(i, psi_leaf_key, time_of_day = "12:00:00", pft_mean = True,
+                                              **smoothing_settings)
+        beta_request = DailySeriesRequest(i, beta_key, time_of_day = "12:00:00", **smoothing_settings)
+
         if(stress_indicator[i] == "wp"):
-            # Calculate the mean leaf and root zone water potential over plant functional types
-            if("pft" in list(data_xarrays[i].keys())):
-                data_xarrays[i]["psi_root_zone_mean"] = data_xarrays[i][psi_root_key].mean(dim= "pft")
-                data_xarrays[i]["psi_leaf_mean"] = data_xarrays[i][psi_leaf_key].mean(dim= "pft")
-
-                tmp_psi_leaf_key = "psi_leaf_mean"
-                tmp_psi_root_key = "psi_root_zone_mean"
-            else:
-                tmp_psi_leaf_key = psi_leaf_key
-                tmp_psi_root_key = psi_root_key
-
-            plot_col_at_daily_time(data_xarrays[i], tmp_psi_root_key, "06:00:00",
-                                   c=data_colours[i], label=labels[i], title="", axis=axs[2], smoothing=smoothing,
-                                   smoothing_type = smoothing_type, percentiles = percentiles, linestyle = ":")
-            plot_col_at_daily_time(data_xarrays[i], tmp_psi_leaf_key, "12:00:00",
-                                   c = data_colours[i], label = labels[i], title = "", axis = axs[2],
-                                   smoothing = smoothing, smoothing_type = smoothing_type, percentiles = percentiles,
-                                   linestyle = "-")
+            planned_lines.append([psi_root_request, "wp", data_colours[i], labels[i], ":", 1, None])
+            planned_lines.append([psi_leaf_request, "wp", data_colours[i], labels[i], "-", 1, None])
 
         elif(stress_indicator[i] == "beta"):
-            # Calculate the mean leaf and root zone fsmc value (beta) over plant functional types
-            plot_col_at_daily_time(data_xarrays[i], beta_key, "12:00:00",
-                                   c=data_colours[i], label=labels[i], title="", axis=axs_beta, smoothing=smoothing,
-                                   smoothing_type=smoothing_type, percentiles=percentiles, linestyle="--")
+            planned_lines.append([beta_request, "beta", data_colours[i], labels[i], "--", 1, None])
 
         elif(stress_indicator[i] == "beta&wp"):
-            # Calculate the mean leaf and root zone fsmc value (beta) over plant functional types
-            plot_col_at_daily_time(data_xarrays[i], beta_key, "12:00:00",
-                                   c=data_colours[i], label=labels[i], title="", axis=axs[2], smoothing=smoothing,
-                                   smoothing_type=smoothing_type, percentiles=percentiles, linestyle="--")
-
-            # Calculate the mean leaf and root zone water potential over plant functional types
-            if ("pft" in list(data_xarrays[i].keys())):
-                data_xarrays[i]["psi_root_zone_mean"] = data_xarrays[i][psi_root_key].mean(dim= "pft")
-                data_xarrays[i]["psi_leaf_mean"] = data_xarrays[i][psi_leaf_key].mean(dim= "pft")
-
-                tmp_psi_leaf_key = "psi_leaf_mean"
-                tmp_psi_root_key = "psi_root_zone_mean"
-            else:
-                tmp_psi_leaf_key = psi_leaf_key
-                tmp_psi_root_key = psi_root_key
-
-            # Plot the water potential data
-            plot_col_at_daily_time(data_xarrays[i], tmp_psi_root_key, "06:00:00",
-                                   c=data_colours[i], label=labels[i], title="", axis=axs[2], smoothing=smoothing,
-                                   smoothing_type = smoothing_type, percentiles = percentiles, linestyle = ":")
-
-            # Plot the fractional soil moisture content data
-            plot_col_at_daily_time(data_xarrays[i], tmp_psi_leaf_key, "12:00:00",
-                                   c = data_colours[i], label = labels[i], title = "", axis = axs_beta,
-                                   smoothing = smoothing, smoothing_type = smoothing_type, percentiles = percentiles,
-                                   linestyle = "-")
+            planned_lines.append([beta_request, "wp", data_colours[i], labels[i], "--", 1, None])
+            planned_lines.append([psi_root_request, "wp", data_colours[i], labels[i], ":", 1, None])
+            planned_lines.append([psi_leaf_request, "beta", data_colours[i], labels[i], "-", 1, None])
+
         else:
             raise ValueError("The input stress_indicator must be either 'wp', 'beta' or 'beta&wp'.")
 
+    # Calculate each unique daily series once
+    daily_series = compute_daily_series_plan(datasets, [line[0] for line in planned_lines],
+                                             cache_folder = cache_folder, n_jobs = n_jobs)
+
+    # ---- Plot the data ----
+    # The stress indicator lines are drawn without an x_range, but share the x-axis with the other lines, so all
+    # the lines are decimated for the range of dates shown
+    if(decimation_x_range is None):
+        decimation_x_range = x_range
+
+    axes = {"gpp": axs[0], "latent_heat": axs[1], "wp": axs[2], "beta": axs_beta}
+
+    for i in range(len(planned_lines)):
+        request, axis_name, colour, label, linestyle, linewidth, line_x_range = planned_lines[i]
+
+        plot_time_series(daily_series[i], request.col_key,
+                         smoothing = request.smoothing, smoothing_type = request.smoothing_type,
+                         percentiles = request.percentiles, x_range = line_x_range, c = colour, label = label,
+                         axs = axes[axis_name], title = "", linestyle = linestyle, linewidth = linewidth,
+                         smoothed = True, decimation = decimation, decimation_x_range = decimation_x_range)
+
+    # set the y-axis labels
+    axs[0].set_ylabel("GPP (gC m-2 day-1)")
+    axs[1].set_ylabel("Latent Heat (W m-2)")
+
     # set the y-axis label
     # First we set up the y-axis label for the water potential plot
     # Note: this maths is used to align zero water potential with a fractional soil moisture content of 1
@@ -293,6 +344,36 @@ def plot_flux_data(data_xarrays,
     return fig, axs
 
 
+def get_flux_data_variables(stress_indicator,
+                            gpp_key = "gpp_gb",
+                            latent_heat_key = "latent_heat",
+                            psi_root_key = "psi_root_zone_pft",
+                            psi_leaf_key = "psi_leaf_pft",
+                            beta_key = "fsmc_gb"):
+    """
+    Get the JULES output variables that plot_flux_data reads for a single JULES run.
+    Used to load only these variables from the JULES output files.
+    :param stress_indicator: The stress indicator plotted for the run. 'wp', 'beta' or 'beta&wp'. String.
+    :param gpp_key: The key for the GPP variable. String.
+    :param latent_heat_key: The key for the latent heat variable. String.
+    :param psi_root_key: The key for the root zone water potential variable. String.
+    :param psi_leaf_key: The key for the leaf water potential variable. String.
+    :param beta_key: The key for the fsmc value variable. String.
+    :return: The variable keys. List of strings.
+    """
+
+    variables = [gpp_key, latent_heat_key]
+
+    if(stress_indicator == "beta" or stress_indicator == "beta&wp"):
+        variables.append(beta_key)
+
+    if(stress_indicator == "wp" or stress_indicator == "beta&wp"):
+        variables.append(psi_root_key)
+        variables.append(psi_leaf_key)
+
+    return variables
+
+
 if __name__ == "__main__":
 
     from datetime import datetime
@@ -301,14 +382,20 @@ if __name__ == "__main__":
     data_file_paths = ["../../../data/data_runs/stomatal_optimisation_runs/plumber2_runs/JULES_PMax_run/AT_Neu-JULES_vn7.4-presc0.Stom_opt.nc",
                        "../../../data/data_runs/stomatal_optimisation_runs/plumber2_runs/JULES_SOX_run/AT_Neu-JULES_vn7.4-presc0.Stom_opt.nc"]
 
+    time_range = [datetime(2007,1,1), datetime(2013,1,1)]
+
     data_files = []
     for path in data_file_paths:
-        data_files.append(open_dataset(path))
+        data_files.append(load_jules_output_file_xarray(path,
+                                                        variables = get_flux_data_variables("wp"),
+                                                        time_range = time_range))
 
     # Load the observational data
     observation_file_path = "~/Desktop/Flux_data/Plumber2_catalogue_data/Flux/AT-Neu_2002-2012_FLUXNET2015_FLUX.nc"
 
-    observation_file = open_dataset(observation_file_path)
+    observation_file = load_jules_output_file_xarray(observation_file_path,
+                                                     variables = ["GPP", "Qle"],
+                                                     time_range = time_range)
 
     # Plot the flux data
     plot_flux_data(data_files,
@@ -320,5 +407,5 @@ if __name__ == "__main__":
                    title = "AT-Neu",
                    smoothing = 5,
                    smoothing_type = 'mean',
-                   x_range = [datetime(2007,1,1), datetime(2013,1,1)])
+                   x_range = time_range)
     plt.show()
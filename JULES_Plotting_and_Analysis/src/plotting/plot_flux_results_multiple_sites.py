@@ -2,17 +2,35 @@
 Plotting script to plot the results of the flux analysis for multiple sites.
 """
 
-from JULES_Plotting_and_Analysis.src.plotting.plot_flux_results import plot_flux_data
-from JULES_Plotting_and_Analysis.src.load_jules_output_file import open_dataset
+from JULES_Plotting_and_Analysis.src.plotting.plot_flux_results import plot_flux_data, get_flux_data_variables
+from JULES_Plotting_and_Analysis.src.load_jules_output_file import load_jules_output_file_xarray
+from JULES_Plotting_and_Analysis.src.site_catalogue import (get_site_catalogue, filter_site_catalogue,
+                                                            normalise_site_name, OBSERVATION_FILE_PATTERN,
+                                                            JULES_FILE_PATTERN)
+from JULES_Plotting_and_Analysis.src.output_manifest import (get_output_fingerprint, is_output_current,
+                                                             save_output_manifest)
+from JULES_Plotting_and_Analysis.src.instrumentation import (timed_stage, enable_instrumentation,
+                                                             disable_instrumentation, get_instrumentation_settings,
+                                                             set_instrumentation_site)
 
 from matplotlib import pyplot as plt
-from os import listdir, makedirs
-from os.path import exists
-from datetime import date
+from pandas import Timestamp
+from os import makedirs, cpu_count
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from traceback import format_exc
 
 def plot_multi_site_flux_data(observation_folder, JULES_run_folders, JULES_labels, output_folder, stress_indicator,
                               smoothing = 30, smoothing_type = 'mean', data_colours = None,
-                              observation_colour = None, percentiles = None):
+                              observation_colour = None, percentiles = None, n_jobs = 1,
+                              cache_folder = None, window_export = "rescale", instrumentation_file = None,
+                              instrumentation_memory = False, observation_file_pattern = OBSERVATION_FILE_PATTERN,
+                              JULES_file_pattern = JULES_FILE_PATTERN, catalogue_index_file = None,
+                              decimation = None, sites = None, skip_unchanged = False, exclude_sites = None,
+                              time_range = None, site_time_ranges = None, align_observations = False,
+                              model_time_offset = None, observation_time_offset = None,
+                              site_observation_time_offsets = None, chunk_days = None):
 
     """
     Plot the flux data from a set of JULES outputs for multiple sites.
@@ -27,119 +45,534 @@ def plot_multi_site_flux_data(observation_folder, JULES_run_folders, JULES_label
     :param data_colours: Colours to plot the JULES output files in. List of strings.
     :param observation_colour: Colour to plot the observational data in. String.
     :param percentiles: Percentiles to plot the data with. List of floats.
-    :return:
+    :param n_jobs: Number of worker processes used to plot the sites in parallel. Each worker uses the
+                   non-interactive Agg backend. None uses all available cores. Integer.
+    :param cache_folder: Folder holding the on-disk cache of daily values, so daily values are only recalculated
+                         for files that have changed. None to not use the cache. String.
+    :param window_export: How the three year windows of sites with more than three years of data are saved.
+                          'rescale' changes the x-axis range of the full figure and saves it again.
+                          'slice' plots each window as a separate task, loading and drawing only the data in the
+                          window (plus a margin for the smoothing). The windows are then plotted in parallel
+                          when n_jobs > 1, and each costs in proportion to the data in the window. String.
+    :param instrumentation_file: CSV file to append the time (and optionally peak memory) of each stage of each
+                                 site to: loading, daily values, smoothing, drawing and saving. Worker processes
+                                 append to the same file. None to leave the instrumentation as it is, so it is
+                                 only recorded if enabled with instrumentation.enable_instrumentation. String.
+    :param instrumentation_memory: Whether to record the peak memory of each stage with tracemalloc when
+                                   instrumentation_file is given. Slows down the plotting. Boolean.
+    :param observation_file_pattern: Regular expression for the observation file names, with a 'site' group giving
+                                     the site name. See site_catalogue.index_site_files. String.
+    :param JULES_file_pattern: Regular expression for the JULES output file names, with a 'site' group. String.
+    :param catalogue_index_file: JSON file the index of each folder's site files is saved to and reused from
+                                 until the folder is modified. None to always scan the folders. String.
+    :param decimation: Decimate each line to the pixel width of its axis before drawing it, so drawing and saving
+                       the figures does not depend on the length of the records. 'min_max' keeps the minimum and
+                       maximum of each pixel and 'lttb' one point per pixel, see plot_time_series. With window_export
+                       'rescale' the lines are resolved for the three year windows. None to draw every point. String.
+    :param sites: The sites to plot, e.g. ["AT-Neu", "US-Ha1"]. Each must be available in all the folders. None to
+                  plot every site available in all the folders. List of strings.
+    :param skip_unchanged: Whether to skip the sites whose figures were saved from the same input files (same
+                           path, size and modification time) and settings and still exist. A manifest recording
+                           the inputs, settings and figures of each site is saved next to its figures after every
+                           run. Boolean.
+    :param exclude_sites: The sites not to plot, e.g. ["US-Ha1"]. None to not exclude any sites. List of strings.
+    :param time_range: The range of times to plot for every site, in the form [start, end]. The start and end can be
+                       datetime, date or "YYYY-MM-DD" strings and are inclusive, an end date includes the whole of
+                       that day. Either can be None to leave that side open. The plotted period is found from the
+                       files' time coordinates and only the data in it (plus a margin for the smoothing) is read.
+                       None to plot all the times. List.
+    :param site_time_ranges: The range of times to plot for individual sites, replacing time_range for those
+                             sites. Sites that are not plotted are ignored. Dictionary, {site name: [start, end]}.
+    :param align_observations: Whether to co-locate the GPP and latent heat of each JULES output with the
+                               observations of each site on their shared time steps before plotting, see
+                               plot_flux_data. Boolean.
+    :param model_time_offset: The offset added to the JULES output times when aligning, in hours. E.g. -0.5 for
+                              half hourly times labelling the end of each time step. None for no offset. Float.
+    :param observation_time_offset: The offset added to the observation times of every site when aligning, in
+                                    hours. E.g. minus the UTC offset for observations in local standard time. None
+                                    for no offset. Float.
+    :param site_observation_time_offsets: The observation time offsets of individual sites, replacing
+                                          observation_time_offset for those sites, e.g. their time zones. Sites
+                                          that are not plotted are ignored. Dictionary, {site name: hours}.
+    :param chunk_days: If given each site's files are read and reduced to daily values in dask chunks of this many
+                       whole days, so a site never needs its whole files in memory, see plot_flux_data. None to
+                       read the files whole. Integer.
+    :return: Summary of the run, {"plotted": list of site names, "skipped": list of site names of unchanged sites,
+             "failed": {site name: error traceback}}
     """
 
     # -- Identify which site files are available --
-    # get a list of all available site files
-    observation_files = listdir(observation_folder)
-    JULES_run_files = []
-    for folder in JULES_run_folders:
-        JULES_run_files.append(listdir(folder))
-
-    # remove non-nc files
-    observation_files = [file for file in observation_files if file.endswith(".nc")]
-    for file_list in JULES_run_files:
-        file_list = [file for file in file_list if file.endswith(".nc")]
-
-    # get a list available sites in each folder
-    # Note the site names are the first part of the file name but the observation files
-    # have a different naming convention.
-    observation_sites = [file.split("_")[0] for file in observation_files]
-    JULES_run_sites = []
-    for file_list in JULES_run_files:
-        JULES_run_sites.append([file.split("-")[0] for file in file_list])
-
-    # change the - to a _ in the observation sites to match the JULES sites
-    observation_sites = [site.replace("-", "_") for site in observation_sites]
-
-    # collate the sites that are available in all the folders and their associated file addresses
-    collated_sites_files = []
-    for i in range(len(observation_sites)):
-        tmp_site_files = []
-
-        # Add the name of the site and the observation file address
-        tmp_site_files.append(observation_sites[i])
-        tmp_site_files.append(observation_folder + observation_files[i])
-
-        # Add the JULES file addresses
-        for j in range(len(JULES_run_sites)):
-            if observation_sites[i] in JULES_run_sites[j]:
-                # Add the JULES file address
-                tmp_site_files.append(JULES_run_folders[j]
-                                      + JULES_run_files[j][JULES_run_sites[j].index(observation_sites[i])])
-
-        # Add the site to the collated list if it is available in all the folders
-        if len(tmp_site_files) == len(JULES_run_folders) + 2:
-            collated_sites_files.append(tmp_site_files)
+    # Each folder is scanned once and the sites available in all the folders are collated with their file
+    # addresses, [site, observation file, JULES files...]
+    collated_sites_files = get_site_catalogue(observation_folder, JULES_run_folders,
+                                              observation_file_pattern = observation_file_pattern,
+                                              JULES_file_pattern = JULES_file_pattern,
+                                              index_file = catalogue_index_file)
+    collated_sites_files = filter_site_catalogue(collated_sites_files, sites, exclude_sites)
+
+    # The range of times plotted for each site, {site name: [start, end] or None}
+    site_time_ranges = _get_site_time_ranges(collated_sites_files, time_range, site_time_ranges)
+
+    # The offset added to the observation times of each site when aligning them, {site name: hours or None}
+    site_observation_time_offsets = _get_site_observation_time_offsets(collated_sites_files,
+                                                                       observation_time_offset,
+                                                                       site_observation_time_offsets)
 
     # -- Plot the flux data --
-    # Loop through the sites and plot the flux data
-    itter = 1
+    plot_kwargs = {"smoothing": smoothing,
+                   "smoothing_type": smoothing_type,
+                   "data_colours": data_colours,
+                   "observation_colours": observation_colour,
+                   "stress_indicator": stress_indicator,
+                   "percentiles": percentiles,
+                   "cache_folder": cache_folder,
+                   "decimation": decimation,
+                   "align_observations": align_observations,
+                   "model_time_offset": model_time_offset,
+                   "chunk_days": chunk_days}
+
+    if(n_jobs is None):
+        n_jobs = cpu_count()
+    elif(type(n_jobs) != int or n_jobs < 1):
+        raise ValueError("The input n_jobs must be a positive integer or None.")
+
+    if(window_export not in ["rescale", "slice"]):
+        raise ValueError("The input window_export must be either 'rescale' or 'slice'.")
+
+    # Record the time of each stage. The settings are passed on to the worker processes.
+    if(instrumentation_file is not None):
+        previous_instrumentation_settings = get_instrumentation_settings()
+        enable_instrumentation(instrumentation_file, track_memory = instrumentation_memory)
+
+    instrumentation_settings = get_instrumentation_settings()
+
+    failed_sites = {}
+
+    # -- Check which sites have changed --
+    # The figures of each site are recorded with the input files and the settings that change them, so sites
+    # whose inputs and settings are unchanged can be skipped without reading their files
+    output_settings = {key: value for key, value in plot_kwargs.items() if key not in ["cache_folder", "chunk_days"]}
+    output_settings.update({"JULES_labels": JULES_labels, "window_export": window_export})
+
+    output_fingerprints = {}
+    skipped_sites = []
     for site_files in collated_sites_files:
+        site_output_settings = dict(output_settings, time_range = site_time_ranges[site_files[0]],
+                                    observation_time_offset = site_observation_time_offsets[site_files[0]])
+        output_fingerprints[site_files[0]] = get_output_fingerprint(site_files[1:], site_output_settings)
+
+        if(skip_unchanged and is_output_current(_get_manifest_file(output_folder, site_files[0]),
+                                                output_fingerprints[site_files[0]])):
+            skipped_sites.append(site_files[0])
+
+    # -- Collate the plotting tasks --
+    # Each task plots the full time series for a site (window None) or, when exporting sliced windows,
+    # a single three year window for a site.
+    tasks = []
+    for site_files in collated_sites_files:
+        if(site_files[0] in skipped_sites):
+            continue
+
+        tasks.append((site_files, None))
+
+        if(window_export == "slice"):
+            try:
+                start_date, end_date = _get_site_date_range(site_files, site_time_ranges[site_files[0]])
+            except Exception:
+                failed_sites[site_files[0]] = format_exc()
+                tasks.pop()
+                continue
+
+            for window in _get_plot_windows(start_date, end_date):
+                tasks.append((site_files, window))
+
+    # The figures saved for each site, {site name: list of file names}
+    site_saved_files = {}
+
+    if(n_jobs == 1):
+        # Loop through the tasks and plot the flux data
+        itter = 1
+        for site_files, window in tasks:
+
+            print("Plotting flux data for site: " + site_files[0] + _window_label(window)
+                  + " (" + str(itter) + "/" + str(len(tasks)) + ")")
+
+            site, error, saved_files = _plot_site_flux_data(site_files, JULES_labels, output_folder,
+                                                            dict(plot_kwargs, observation_time_offset =
+                                                                 site_observation_time_offsets[site_files[0]]),
+                                                            window = window, window_export = window_export,
+                                                            time_range = site_time_ranges[site_files[0]])
+            if(error is not None):
+                failed_sites[site] = failed_sites.get(site, "") + error
+
+            site_saved_files.setdefault(site, []).extend(saved_files)
+
+            itter += 1
+
+    else:
+        # Plot the tasks in a pool of worker processes. The spawn start method gives each worker a clean
+        # interpreter so no GUI backend state is inherited from the parent process.
+        with ProcessPoolExecutor(max_workers = n_jobs,
+                                 mp_context = get_context("spawn"),
+                                 initializer = _init_plotting_worker,
+                                 initargs = (instrumentation_settings,)) as executor:
+
+            futures = {executor.submit(_plot_site_flux_data, site_files, JULES_labels, output_folder,
+                                       dict(plot_kwargs, observation_time_offset =
+                                            site_observation_time_offsets[site_files[0]]),
+                                       window = window, window_export = window_export,
+                                       time_range = site_time_ranges[site_files[0]]): (site_files[0], window)
+                       for site_files, window in tasks}
+
+            itter = 1
+            for future in as_completed(futures):
+                site, window = futures[future]
+
+                # Errors while plotting are returned by the task. The task itself fails if its worker process
+                # dies, e.g. when it is killed for running out of memory, which also fails the remaining tasks.
+                try:
+                    site, error, saved_files = future.result()
+                except Exception:
+                    error, saved_files = format_exc(), []
+
+                if(error is not None):
+                    failed_sites[site] = failed_sites.get(site, "") + error
+
+                site_saved_files.setdefault(site, []).extend(saved_files)
+
+                print("Plotted flux data for site: " + site + _window_label(window)
+                      + " (" + str(itter) + "/" + str(len(tasks)) + ")")
+
+                itter += 1
+
+    # Restore the instrumentation settings
+    if(instrumentation_file is not None):
+        disable_instrumentation()
+        if(previous_instrumentation_settings is not None):
+            enable_instrumentation(**previous_instrumentation_settings)
+
+    # -- Summary report --
+    plotted_sites = [site_files[0] for site_files in collated_sites_files
+                     if site_files[0] not in failed_sites and site_files[0] not in skipped_sites]
+
+    # Record the inputs and settings of the sites whose figures were all saved
+    for site in plotted_sites:
+        save_output_manifest(_get_manifest_file(output_folder, site), output_fingerprints[site],
+                             site_saved_files.get(site, []))
+
+    print("Plotted " + str(len(plotted_sites)) + "/" + str(len(collated_sites_files)) + " sites.")
+    if(len(skipped_sites) > 0):
+        print("Skipped " + str(len(skipped_sites)) + " unchanged sites.")
+    for site in failed_sites:
+        print("Failed to plot site: " + site + "\n" + failed_sites[site])
+
+    return {"plotted": plotted_sites, "skipped": skipped_sites, "failed": failed_sites}
+
+
+def _init_plotting_worker(instrumentation_settings = None):
+    """
+    Initialise a worker process for plotting. Forces the non-interactive Agg backend.
+    :param instrumentation_settings: The instrumentation settings of the parent process, see
+                                     instrumentation.get_instrumentation_settings. None if disabled.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+
+    if(instrumentation_settings is not None):
+        enable_instrumentation(**instrumentation_settings)
+
+
+def _load_site_data(site_files, stress_indicator, time_range = None):
+    """
+    Load the observation and JULES data for a site. Only the variables used in the plots are read from the files.
+    :param site_files: Site name followed by the observation file and JULES output file addresses. List of strings.
+    :param stress_indicator: Type of stress indicator plotted for each JULES run. List of strings.
+    :param time_range: The range of times to load, in the form [start, end]. None to load all times.
+    :return: observation_data, JULES_data
+    """
+
+    observation_data = load_jules_output_file_xarray(site_files[1], variables = ["GPP", "Qle"],
+                                                     time_range = time_range)
+    JULES_data = []
+    for i in range(2, len(site_files)):
+        JULES_data.append(load_jules_output_file_xarray(site_files[i],
+                                                        variables = get_flux_data_variables(stress_indicator[i - 2]),
+                                                        time_range = time_range))
+
+    return observation_data, JULES_data
+
+
+def _get_date_range(observation_data, JULES_data):
+    """
+    Find the whole years covered by the overlapping time period of the observation and JULES data.
+    :param observation_data: The observational data. Xarray.Dataset.
+    :param JULES_data: The JULES output data. List of Xarray.Dataset.
+    :return: start_date, end_date
+    """
+
+    # Find the start and end dates for the data
+    start_dates = [data.time.values[0] for data in JULES_data]
+    start_dates.append(observation_data.time.values[0])
+
+    end_dates = [data.time.values[-1] for data in JULES_data]
+    end_dates.append(observation_data.time.values[-1])
+
+    # Find the latest start date and the earliest end date
+    start_date = max(start_dates)
+    end_date = min(end_dates)
+
+    # Convert the start and end dates to datetime objects
+    start_date = date.fromisoformat(str(start_date)[:10])
+    end_date = date.fromisoformat(str(end_date)[:10])
+
+    # Round the start_date down to the nearest year and the end_date up to the nearest year
+    start_date = date(start_date.year, 1, 1)
+    end_date = date(end_date.year + 1, 1, 1)
+
+    return start_date, end_date
+
+
+def _get_site_date_range(site_files, time_range = None):
+    """
+    Find the whole years covered by the overlapping time period of a site's files.
+    The files are opened lazily, so only the time coordinates are read.
+    :param site_files: Site name followed by the observation file and JULES output file addresses. List of strings.
+    :param time_range: The range of times plotted, [start, end], see plot_multi_site_flux_data. The period is cut
+                       to the range. None to use all the times.
+    :return: start_date, end_date
+    """
+
+    observation_data = load_jules_output_file_xarray(site_files[1], time_range = time_range)
+    JULES_data = [load_jules_output_file_xarray(file, time_range = time_range) for file in site_files[2:]]
+
+    if(any(len(data.time) == 0 for data in [observation_data] + JULES_data)):
+        raise ValueError("The files of site " + site_files[0] + " have no data in the time range "
+                         + str(time_range) + ".")
+
+    start_date, end_date = _get_date_range(observation_data, JULES_data)
+
+    # Cut the whole years to the time range. The end of the range is inclusive, so the plot runs to the end of
+    # its day.
+    if(time_range is not None):
+        if(time_range[0] is not None):
+            start_date = max(start_date, Timestamp(time_range[0]).date())
+        if(time_range[1] is not None):
+            end_date = min(end_date, Timestamp(time_range[1]).date() + timedelta(days = 1))
+
+    return start_date, end_date
+
+
+def _get_site_time_ranges(collated_sites_files, time_range = None, site_time_ranges = None):
+    """
+    Get the range of times plotted for each site.
+    :param collated_sites_files: The sites plotted, see site_catalogue.get_site_catalogue. List.
+    :param time_range: The range of times plotted for every site, [start, end]. None to plot all the times.
+    :param site_time_ranges: The ranges of times plotted for individual sites. Dictionary, {site name: [start, end]}.
+    :return: The range of times for each site, [start, end] or None. Dictionary, {site name: list}.
+    """
+
+    if(site_time_ranges is None):
+        site_time_ranges = {}
+    elif(type(site_time_ranges) != dict):
+        raise ValueError("The input site_time_ranges must be a dictionary of {site name: [start, end]}.")
+
+    site_time_ranges = {normalise_site_name(site): site_time_range
+                        for site, site_time_range in site_time_ranges.items()}
+
+    time_ranges = {}
+    for site_files in collated_sites_files:
+        site_time_range = site_time_ranges.get(site_files[0], time_range)
+
+        if(site_time_range is not None and (type(site_time_range) not in [list, tuple] or len(site_time_range) != 2)):
+            raise ValueError("The time range of site " + site_files[0] + " must be a list of the form [start, end].")
+
+        time_ranges[site_files[0]] = None if site_time_range is None else list(site_time_range)
+
+    return time_ranges
+
 
-        print("Plotting flux data for site: " + site_files[0] + " (" + str(itter) + "/" + str(len(collated_sites_files)) + ")")
+def _get_site_observation_time_offsets(collated_sites_files, observation_time_offset = None,
+                                       site_observation_time_offsets = None, chunk_days = None):
+    """
+    Get the offset added to the observation times of each site when aligning them with the JULES outputs.
+    :param collated_sites_files: The sites plotted, see site_catalogue.get_site_catalogue. List.
+    :param observation_time_offset: The offset for every site, in hours. None for no offset.
+    :param site_observation_time_offsets: The offsets of individual sites. Dictionary, {site name: hours}.
+    :return: The offset of each site, hours or None. Dictionary, {site name: float}.
+    """
+
+    if(site_observation_time_offsets is None):
+        site_observation_time_offsets = {}
+    elif(type(site_observation_time_offsets) != dict):
+        raise ValueError("The input site_observation_time_offsets must be a dictionary of {site name: hours}.")
 
-        # Load the data
-        observation_data = open_dataset(site_files[1])
-        JULES_data = []
-        for i in range(2, len(site_files)):
-            JULES_data.append(open_dataset(site_files[i]))
+    site_observation_time_offsets = {normalise_site_name(site): offset
+                                     for site, offset in site_observation_time_offsets.items()}
 
-        # -- identify overlapping time periods --
-        # Find the start and end dates for the data
-        start_dates = [data.time.values[0] for data in JULES_data]
-        start_dates.append(observation_data.time.values[0])
+    return {site_files[0]: site_observation_time_offsets.get(site_files[0], observation_time_offset)
+            for site_files in collated_sites_files}
 
-        end_dates = [data.time.values[-1] for data in JULES_data]
-        end_dates.append(observation_data.time.values[-1])
 
-        # Find the latest start date and the earliest end date
-        start_date = max(start_dates)
-        end_date = min(end_dates)
+def _get_plot_windows(start_date, end_date):
+    """
+    Get the three year windows plotted separately when there are more than three years of data.
+    :param start_date: The start of the plotted period, the first of January unless cut to a time range. Date.
+    :param end_date: The end of the plotted period, the first of January unless cut to a time range. Date.
+    :return: The windows, cut to the plotted period. List of [start date, end date].
+    """
+
+    # The whole years covering the plotted period
+    first_year = start_date.year
+    last_year = end_date.year
+    if((end_date.month, end_date.day) != (1, 1)):
+        last_year += 1
 
-        # Convert the start and end dates to datetime objects
-        start_date = date.fromisoformat(str(start_date)[:10])
-        end_date = date.fromisoformat(str(end_date)[:10])
+    num_years = last_year - first_year
 
-        # Round the start_date down to the nearest year and the end_date up to the nearest year
-        start_date = date(start_date.year, 1, 1)
-        end_date = date(end_date.year + 1, 1, 1)
+    windows = []
+    if(num_years > 3):
+        for i in range(0, num_years-2):
+            windows.append([max(date(first_year + i, 1, 1), start_date),
+                            min(date(first_year + i + 3, 1, 1), end_date)])
+
+    return windows
+
+
+def _get_window_file_name(site, window):
+    """
+    Get the file name of the plot for a site.
+    :param site: The site name. String.
+    :param window: The plotted window [start date, end date], or None for the full time series.
+    :return: The file name. String.
+    """
 
-        # Calculate the number of years between the start and end dates
-        num_years = end_date.year - start_date.year
+    if(window is None):
+        return site + "_flux_data.png"
+
+    # The windows are named by their whole years, the end year is exclusive
+    end_year = window[1].year
+    if((window[1].month, window[1].day) != (1, 1)):
+        end_year += 1
+
+    return site + "_flux_data_" + str(window[0].year) + "_" + str(end_year) + ".png"
+
+
+def _get_manifest_file(output_folder, site):
+    """
+    Get the manifest file recording the inputs, settings and figures of a site, see output_manifest.
+    :param output_folder: Folder the plots are saved in. String.
+    :param site: The site name. String.
+    :return: The manifest file path. String.
+    """
+
+    return output_folder + site + "/" + site + "_flux_data.manifest.json"
+
+
+def _window_label(window):
+    """
+    Get the label of a plotted window for progress messages.
+    :param window: The plotted window [start date, end date], or None for the full time series.
+    :return: The label. String.
+    """
+
+    if(window is None):
+        return ""
+
+    return " " + str(window[0].year) + "-" + str(window[1].year)
+
+
+def _plot_site_flux_data(site_files, JULES_labels, output_folder, plot_kwargs, window = None,
+                         window_export = "rescale", time_range = None):
+    """
+    Plot and save the flux data figures for a single site.
+    Any error raised while plotting is caught so that one failing site does not stop the others.
+    :param site_files: Site name followed by the observation file and JULES output file addresses. List of strings.
+    :param JULES_labels: Labels for the JULES output files. List of strings.
+    :param output_folder: Folder to save the output plots in. String.
+    :param plot_kwargs: Keyword arguments passed to plot_flux_data. Dictionary.
+    :param window: The three year window to plot, [start date, end date]. Only the data in the window, plus a
+                   margin for the smoothing, is loaded and plotted. None to plot the full time series.
+    :param window_export: How the three year windows are saved with the full time series. 'rescale' saves them
+                          from the full figure by changing the x-axis range. 'slice' does not save them, they are
+                          plotted as separate tasks. String.
+    :param time_range: The range of times plotted for the site, [start, end]. Only the data in the range, plus a
+                       margin for the smoothing, is loaded. None to plot all the times.
+    :return: site name, error traceback (None if the site was plotted successfully), file names of the saved figures
+    """
+
+    # Label the recorded stages with the site
+    set_instrumentation_site(site_files[0] + _window_label(window))
+
+    saved_files = []
+
+    try:
+        # The margin of data loaded either side of a plotted period keeps the smoothing at its edges the same as
+        # in the full time series
+        margin = timedelta(days = (plot_kwargs["smoothing"] or 0) + 1)
+
+        if(window is not None):
+            # Load only the data in the window
+            x_range = window
+            observation_data, JULES_data = _load_site_data(site_files, plot_kwargs["stress_indicator"],
+                                                           time_range = [window[0] - margin, window[1] + margin])
+
+        elif(time_range is not None):
+            # Find the plotted period from the time coordinates, then load only the data in it
+            x_range = list(_get_site_date_range(site_files, time_range))
+            observation_data, JULES_data = _load_site_data(site_files, plot_kwargs["stress_indicator"],
+                                                           time_range = [x_range[0] - margin, x_range[1] + margin])
+
+        else:
+            # Load the data
+            observation_data, JULES_data = _load_site_data(site_files, plot_kwargs["stress_indicator"])
+
+            # -- identify overlapping time periods --
+            x_range = list(_get_date_range(observation_data, JULES_data))
+
+        # The full figure is zoomed to the three year windows when saving them, so the lines are decimated
+        # for the windows
+        rescale_windows = []
+        if(window is None and window_export == "rescale"):
+            rescale_windows = _get_plot_windows(x_range[0], x_range[1])
+
+        decimation_x_range = None
+        if(len(rescale_windows) > 0):
+            decimation_x_range = rescale_windows[0]
 
         # Plot the flux data
-        plot_flux_data(JULES_data, observation_data, JULES_labels, title=site_files[0],
-                       smoothing = smoothing, smoothing_type = smoothing_type, data_colours = data_colours,
-                       observation_colours = observation_colour, stress_indicator = stress_indicator,
-                       x_range = [start_date, end_date], percentiles = percentiles)
+        with timed_stage("plot_flux_data"):
+            plot_flux_data(JULES_data, observation_data, JULES_labels, title=site_files[0],
+                           x_range = x_range, decimation_x_range = decimation_x_range, **plot_kwargs)
 
         # -- Save the plot --
         # Check the output folder for this site exists. If not create it.
-        if(not exists(output_folder + site_files[0] + "/")):
-            makedirs(output_folder + site_files[0] + "/")
+        makedirs(output_folder + site_files[0] + "/", exist_ok = True)
 
-        # Save the entire time series plot
-        plt.savefig(output_folder + site_files[0] + "/" + site_files[0] + "_flux_data.png")
+        # Save the plot
+        with timed_stage("savefig", detail = _get_window_file_name(site_files[0], window)):
+            plt.savefig(output_folder + site_files[0] + "/" + _get_window_file_name(site_files[0], window))
+        saved_files.append(_get_window_file_name(site_files[0], window))
 
         # If there are more than 3 years of data plot each set of 3 years separately
-        if(num_years > 3):
-            for i in range(0, num_years-2):
-                # Calculate the start and end dates for this plot
-                start_date_plot = date(start_date.year + i, 1, 1)
-                end_date_plot = date(start_date.year + i + 3, 1, 1)
-
+        if(window is None and window_export == "rescale"):
+            for window_plot in rescale_windows:
                 # change the x_range to the new start and end dates
-                plt.xlim(start_date_plot, end_date_plot)
+                plt.xlim(window_plot[0], window_plot[1])
 
                 # Save the plot
-                file_name = site_files[0] + "_flux_data_" + str(start_date_plot.year) + "_" + str(end_date_plot.year) + ".png"
-                plt.savefig(output_folder + site_files[0] + "/" + file_name)
+                with timed_stage("savefig", detail = _get_window_file_name(site_files[0], window_plot)):
+                    plt.savefig(output_folder + site_files[0] + "/"
+                                + _get_window_file_name(site_files[0], window_plot))
+                saved_files.append(_get_window_file_name(site_files[0], window_plot))
+
+    except Exception:
+        return site_files[0], format_exc(), saved_files
 
-        plt.close()
+    finally:
+        plt.close("all")
+        set_instrumentation_site("")
 
-        itter += 1
+    return site_files[0], None, saved_files
 
 if __name__ == "__main__":
     # Define the input folders
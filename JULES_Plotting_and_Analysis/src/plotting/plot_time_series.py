@@ -3,7 +3,11 @@ Plot timeseries.
 """
 
 import matplotlib.pyplot as plt
+import numpy as np
 from datetime import datetime
+from JULES_Plotting_and_Analysis.src.data_conversions.rolling_quantiles import rolling_quantiles
+from JULES_Plotting_and_Analysis.src.plotting.line_decimation import decimate_time_series
+from JULES_Plotting_and_Analysis.src.instrumentation import timed_stage
 
 
 def plot_time_series(data_xarray, col_key,
@@ -16,7 +20,10 @@ def plot_time_series(data_xarray, col_key,
                      axs=None,
                      title=None,
                      linestyle='-',
-                     linewidth=1):
+                     linewidth=1,
+                     smoothed=False,
+                     decimation=None,
+                     decimation_x_range=None):
     """
     Plot the daily total for a given variable.
 
@@ -32,45 +39,57 @@ def plot_time_series(data_xarray, col_key,
     title (str): The title of the plot.
     linestyle (str): The linestyle of the plot.
     linewidth (int): The width of the line.
+    smoothed (bool): Whether data_xarray is already the output of smooth_time_series with the same smoothing,
+                     so the smoothing does not need to be recalculated.
+    decimation (str): Decimate the lines to the pixel width of the axis before drawing them, so the drawing and
+                      saving costs do not depend on the length of the record. 'min_max' keeps the minimum and
+                      maximum of each pixel, preserving the peaks. 'lttb' keeps one point per pixel by
+                      largest-triangle-three-buckets, which keeps the shape of the line with fewer points but may
+                      drop peaks. If None every point is drawn.
+    decimation_x_range (list): The range of dates the decimation is resolved for, in the form
+                               [min datetime, max datetime]. Set it to the narrowest range the axis will be
+                               zoomed to within x_range. If None x_range is used, or the full range of the data.
+                               With decimation the data outside x_range is not drawn.
 
     Returns:
     None
     """
 
-    # Create a copy of the input xarray dataset so that we don't modify the input data
-    data_xarray_tmp = data_xarray[[col_key]].copy()
-
-    # Smooth the data if a smoothing range is given
-    if (smoothing != None):
-        if(smoothing_type == 'mean'):
-            # Calculate mean from the daily total GPP
-            data_xarray_tmp['mean'] = (data_xarray_tmp[col_key].rolling(time=smoothing,
-                                                                        center=True,
-                                                                        min_periods=1).mean())
-        elif(smoothing_type == 'median'):
-            # Calculate median and confidence intervals from the daily total GPP
-            data_xarray_tmp['median'] = (data_xarray_tmp[col_key].rolling(time=smoothing,
-                                                                          center=True,
-                                                                          min_periods=1)
-                                         .construct('tmp').quantile(.50, dim='tmp'))
-
-            if(percentiles != None):
-                data_xarray_tmp['lower']  = (data_xarray_tmp[col_key].rolling(time=smoothing,
-                                                                              center=True,
-                                                                              min_periods=1)
-                                             .construct('tmp').quantile(1-percentiles[0]/100., dim='tmp'))
-                data_xarray_tmp['upper']  = (data_xarray_tmp[col_key].rolling(time=smoothing,
-                                                                              center=True,
-                                                                              min_periods=1)
-                                             .construct('tmp').quantile(1-percentiles[1]/100., dim='tmp'))
-        else:
-            raise ValueError("The input smoothing_type must be either 'mean' or 'median'.")
+    # Smooth the data, unless it has already been smoothed by smooth_time_series
+    if(smoothed):
+        data_xarray_tmp = data_xarray
+    else:
+        data_xarray_tmp = smooth_time_series(data_xarray, col_key, smoothing = smoothing,
+                                             smoothing_type = smoothing_type, percentiles = percentiles)
 
     # Create a new figure and set axs if there is no input axis
     if (axs == None):
         fig = plt.figure(figsize=(5, 5))
         axs = plt.gca()
 
+    # Decimate the plotted lines to the resolution of the axis
+    if(decimation != None):
+        if(smoothing == None):
+            line_keys = [col_key]
+        elif(smoothing_type == 'median' and percentiles != None):
+            line_keys = ['median', 'lower', 'upper']
+        else:
+            line_keys = [smoothing_type]
+
+        # Convert the dates to times on the time axis
+        x_range_times = None
+        if(x_range != None):
+            x_range_times = [np.datetime64(datetime.combine(x_range[0], datetime.min.time())),
+                             np.datetime64(datetime.combine(x_range[1], datetime.min.time()))]
+
+        decimation_x_range_times = None
+        if(decimation_x_range != None):
+            decimation_x_range_times = [np.datetime64(datetime.combine(decimation_x_range[0], datetime.min.time())),
+                                        np.datetime64(datetime.combine(decimation_x_range[1], datetime.min.time()))]
+
+        data_xarray_tmp = decimate_time_series(data_xarray_tmp, line_keys, axs, x_range = x_range_times,
+                                               resolution_x_range = decimation_x_range_times, method = decimation)
+
     if (smoothing == None):
         # Plot the daily GPP for all sites
         data_xarray_tmp[col_key].plot(color=c, label=label, ax=axs, linestyle=linestyle, linewidth=linewidth)
@@ -101,4 +120,52 @@ def plot_time_series(data_xarray, col_key,
     if (title != None):
         axs.set_title(title)
 
-    return None
\ No newline at end of file
+    return None
+
+
+def smooth_time_series(data_xarray, col_key, smoothing=None, smoothing_type='mean', percentiles=None):
+    """
+    Smooth the time series of a given variable, as plotted by plot_time_series.
+
+    Args:
+    data_xarray (xarray.Dataset): The input xarray dataset.
+    col_key (str): The key for the variable.
+    smoothing (int): The number of days to smooth the data by. If None no smoothing is applied.
+    smoothing_type (str): The type of smoothing to apply to the data. 'mean' or 'median'.
+    percentiles (list): The percentiles of the band plotted around the median. List of floats.
+
+    Returns:
+    data_xarray_tmp (xarray.Dataset): Dataset holding the variable and the smoothed values, 'mean' or 'median'
+                                      and the 'lower' and 'upper' percentile values.
+    """
+
+    # Create a copy of the input xarray dataset so that we don't modify the input data
+    data_xarray_tmp = data_xarray[[col_key]].copy()
+
+    # Smooth the data if a smoothing range is given
+    if (smoothing != None):
+        with timed_stage("smoothing_" + str(smoothing_type), detail = col_key):
+            if(smoothing_type == 'mean'):
+                # Calculate mean from the daily total GPP
+                data_xarray_tmp['mean'] = (data_xarray_tmp[col_key].rolling(time=smoothing,
+                                                                            center=True,
+                                                                            min_periods=1).mean())
+            elif(smoothing_type == 'median'):
+                # Calculate median and confidence intervals from the daily total GPP
+                # All the quantiles are calculated from a single pass over the rolling windows
+                quantiles = [.50]
+                if(percentiles != None):
+                    quantiles += [1-percentiles[0]/100., 1-percentiles[1]/100.]
+
+                rolling_values = rolling_quantiles(data_xarray_tmp[col_key], smoothing, quantiles,
+                                                   center=True, min_periods=1)
+
+                data_xarray_tmp['median'] = rolling_values[0]
+
+                if(percentiles != None):
+                    data_xarray_tmp['lower'] = rolling_values[1]
+                    data_xarray_tmp['upper'] = rolling_values[2]
+            else:
+                raise ValueError("The input smoothing_type must be either 'mean' or 'median'.")
+
+    return data_xarray_tmp
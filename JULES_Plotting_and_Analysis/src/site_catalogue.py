@@ -0,0 +1,221 @@
+"""
+Functions to find the files for each site in a catalogue of observation and JULES run folders.
+
+Each folder is scanned once and its files are matched against a regular expression with a "site" group, giving
+a {site: file path} index for the folder. Site names are normalised so that observation files (e.g.
+"AT-Neu_2002-2012_FLUXNET2015_Flux.nc") and JULES output files (e.g. "AT_Neu-JULES_vn7.4.nc") give the same
+site. The indexes can be saved to a JSON file and are reused until the folder is modified.
+"""
+
+import json
+import re
+from os import scandir, stat, replace, getpid
+from os.path import abspath, join, exists
+
+# The default file name patterns. The "site" group gives the site name.
+OBSERVATION_FILE_PATTERN = r"^(?P<site>[^_]+)_.*\.nc$"
+JULES_FILE_PATTERN = r"^(?P<site>[^-]+)-.*\.nc$"
+
+
+def normalise_site_name(site):
+    """
+    Normalise a site name so the observation and JULES file names give the same site, e.g. "AT-Neu" -> "AT_Neu".
+
+    Args:
+    site (str): The site name.
+
+    Returns:
+    site (str): The normalised site name.
+    """
+
+    return site.replace("-", "_")
+
+
+def index_site_files(folder, file_pattern = JULES_FILE_PATTERN, index_file = None, save_index = True):
+    """
+    Get the file for each site in a folder.
+
+    If a site matches more than one file the first file name, in sorted order, is used.
+
+    Args:
+    folder (str): The folder holding the files.
+    file_pattern (str): Regular expression matched against each file name, with a "site" group giving the site
+                        name. Files that do not match are ignored.
+    index_file (str): JSON file the index is saved to and reused from while the folder is unchanged. If None the
+                      folder is always scanned.
+    save_index (bool): Whether to save a new index to index_file after scanning the folder. If False a saved
+                       index is still reused, but the file is never written, e.g. for dry runs.
+
+    Returns:
+    site_files (dict): {normalised site name: file path}
+    """
+
+    folder_key = abspath(folder)
+    folder_mtime = stat(folder).st_mtime_ns
+
+    # Reuse the saved index if the folder has not been modified since it was saved
+    saved_indexes = {}
+    if(index_file is not None):
+        saved_indexes = _load_site_indexes(index_file)
+        saved_index = saved_indexes.get(folder_key)
+
+        if(saved_index is not None and saved_index.get("mtime_ns") == folder_mtime
+                and saved_index.get("file_pattern") == file_pattern):
+            return {site: join(folder, file_name) for site, file_name in saved_index["sites"].items()}
+
+    # Scan the folder once
+    compiled_pattern = re.compile(file_pattern)
+    if("site" not in compiled_pattern.groupindex):
+        raise ValueError("The input file_pattern must have a 'site' group, e.g. " + JULES_FILE_PATTERN)
+
+    with scandir(folder) as entries:
+        file_names = sorted([entry.name for entry in entries if entry.is_file()])
+
+    site_file_names = {}
+    for file_name in file_names:
+        match = compiled_pattern.match(file_name)
+        if(match is not None):
+            site_file_names.setdefault(normalise_site_name(match.group("site")), file_name)
+
+    # Save the index
+    if(index_file is not None and save_index):
+        saved_indexes[folder_key] = {"mtime_ns": folder_mtime, "file_pattern": file_pattern,
+                                     "sites": site_file_names}
+        _save_site_indexes(index_file, saved_indexes)
+
+    return {site: join(folder, file_name) for site, file_name in site_file_names.items()}
+
+
+def get_site_catalogue(observation_folder, JULES_run_folders, observation_file_pattern = OBSERVATION_FILE_PATTERN,
+                       JULES_file_pattern = JULES_FILE_PATTERN, index_file = None, save_index = True):
+    """
+    Get the observation and JULES output files of the sites available in every folder.
+
+    Args:
+    observation_folder (str): Folder containing the observation files.
+    JULES_run_folders (list): Folders containing the JULES output files. List of str.
+    observation_file_pattern (str): Regular expression for the observation file names, see index_site_files.
+    JULES_file_pattern (str): Regular expression for the JULES output file names, see index_site_files.
+    index_file (str): JSON file the folder indexes are saved to, see index_site_files. If None the folders are
+                      always scanned.
+    save_index (bool): Whether to save new folder indexes to index_file, see index_site_files.
+
+    Returns:
+    collated_sites_files (list): For each site, sorted by name, a list of the site name followed by the
+                                 observation file and JULES output file paths.
+    """
+
+    observation_files = index_site_files(observation_folder, observation_file_pattern, index_file, save_index)
+    JULES_run_files = [index_site_files(folder, JULES_file_pattern, index_file, save_index)
+                       for folder in JULES_run_folders]
+
+    collated_sites_files = []
+    for site in sorted(observation_files):
+        # Only include the sites available in all the folders
+        if(all(site in JULES_files for JULES_files in JULES_run_files)):
+            collated_sites_files.append([site, observation_files[site]]
+                                        + [JULES_files[site] for JULES_files in JULES_run_files])
+
+    return collated_sites_files
+
+
+def filter_site_catalogue(collated_sites_files, sites = None, exclude_sites = None):
+    """
+    Select sites from a site catalogue.
+
+    Args:
+    collated_sites_files (list): The catalogue, see get_site_catalogue.
+    sites (list): The names of the sites to keep, in either the observation or JULES file form (e.g. "AT-Neu" or
+                  "AT_Neu"). If None all the sites are kept.
+    exclude_sites (list): The names of the sites to remove. Sites that are not in the catalogue are ignored. If
+                          None no sites are removed.
+
+    Returns:
+    collated_sites_files (list): The catalogue entries of the selected sites, in catalogue order.
+    """
+
+    if(sites is not None):
+        sites = _normalise_site_names(sites, "sites")
+
+        catalogue_sites = [site_files[0] for site_files in collated_sites_files]
+        missing_sites = [site for site in sites if site not in catalogue_sites]
+        if(len(missing_sites) > 0):
+            raise ValueError("The sites " + str(missing_sites) + " are not available in all the folders.")
+
+        collated_sites_files = [site_files for site_files in collated_sites_files if site_files[0] in sites]
+
+    if(exclude_sites is not None):
+        exclude_sites = _normalise_site_names(exclude_sites, "exclude_sites")
+
+        collated_sites_files = [site_files for site_files in collated_sites_files
+                                if site_files[0] not in exclude_sites]
+
+    return collated_sites_files
+
+
+def _normalise_site_names(sites, input_name):
+    """
+    Check and normalise a list of site names.
+
+    Args:
+    sites (list, str): The site names.
+    input_name (str): The name of the input, used in the error message.
+
+    Returns:
+    sites (list): The normalised site names.
+    """
+
+    if(type(sites) == str):
+        sites = [sites]
+    elif(type(sites) != list):
+        raise ValueError("The input " + input_name + " must be a string or list of site names.")
+
+    return [normalise_site_name(site) for site in sites]
+
+
+def _load_site_indexes(index_file):
+    """
+    Load the saved folder indexes.
+
+    Args:
+    index_file (str): The JSON file holding the indexes.
+
+    Returns:
+    indexes (dict): {absolute folder path: {"mtime_ns": int, "file_pattern": str, "sites": {site: file name}}}
+                    Empty if there is no valid saved index.
+    """
+
+    if(not exists(index_file)):
+        return {}
+
+    try:
+        with open(index_file) as file:
+            indexes = json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+    if(type(indexes) != dict):
+        return {}
+
+    return indexes
+
+
+def _save_site_indexes(index_file, indexes):
+    """
+    Save the folder indexes.
+
+    Args:
+    index_file (str): The JSON file holding the indexes.
+    indexes (dict): The indexes, see _load_site_indexes.
+
+    Returns:
+    None
+    """
+
+    # Write to a temporary file first so other processes never read a partly written index
+    tmp_index_file = index_file + "." + str(getpid()) + ".tmp"
+    with open(tmp_index_file, "w") as file:
+        json.dump(indexes, file, indent = 1)
+    replace(tmp_index_file, index_file)
+
+    return None
@@ -0,0 +1,439 @@
+"""
+Benchmark suite for the loaders, daily reductions, smoothing and plotting.
+
+Synthetic JULES output and observation files of a configurable size are written to a temporary folder. Each
+benchmark is timed over several repeats and its peak Python memory use is recorded with tracemalloc in a
+separate run, so the memory tracing does not affect the timings. The results are saved as JSON together with
+the git commit and library versions, so runs on different commits can be compared.
+
+To benchmark an older commit, check it out and copy this folder into it. Benchmarks of code the commit does not
+have yet are skipped, and benchmarks that fail on it are recorded as failed.
+
+Run from the repository root with:
+    python -m benchmarks.benchmark_suite --years 5 --output-folder benchmarks/results
+
+Compare two runs with:
+    python -m benchmarks.benchmark_suite --compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime
+from importlib import import_module
+from inspect import signature
+from io import BytesIO
+from os import makedirs
+from os.path import dirname, abspath, join
+from statistics import median
+from tempfile import TemporaryDirectory
+from timeit import repeat
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+# Only the functions available since the first commit are imported here. The functions added by later commits
+# are imported by the benchmarks that use them, so the suite can also be run against older commits.
+from JULES_Plotting_and_Analysis.src.load_jules_output_file import (load_jules_output_file_pandas,
+                                                                    load_jules_output_file_xarray)
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import (to_daily_total, to_daily_mean,
+                                                                             to_daily_median, to_daily_max,
+                                                                             to_daily_min, to_daily_std,
+                                                                             get_daily_values_at_time)
+from JULES_Plotting_and_Analysis.src.data_conversions.average_pfts import mean_pfts
+from JULES_Plotting_and_Analysis.src.plotting.plot_time_series import plot_time_series
+from JULES_Plotting_and_Analysis.src.plotting.plot_flux_results import plot_flux_data
+from benchmarks.synthetic_jules_data import write_synthetic_site_files
+
+REPOSITORY_FOLDER = dirname(dirname(abspath(__file__)))
+
+# The package holding the code benchmarked
+PACKAGE = "JULES_Plotting_and_Analysis.src."
+
+# The variables plotted by plot_flux_data with both stress indicators, for commits without get_flux_data_variables
+FLUX_DATA_VARIABLES = ["gpp_gb", "latent_heat", "fsmc_gb", "psi_root_zone_pft", "psi_leaf_pft"]
+
+
+def get_benchmarks(observation_file_path, data_file_paths):
+    """
+    Get the benchmarks to run on a set of site files.
+
+    Args:
+    observation_file_path (str): The path of the observation file.
+    data_file_paths (list): The paths of the JULES output files. List of str.
+
+    Returns:
+    benchmarks (list): List of (name, function) with each function taking no arguments. The function is None
+                       if the code it benchmarks is not available at the commit being benchmarked.
+    """
+
+    # Functions added after the first commit, None if they are not available
+    get_flux_data_variables = import_optional(PACKAGE + "plotting.plot_flux_results", "get_flux_data_variables")
+    smooth_time_series = import_optional(PACKAGE + "plotting.plot_time_series", "smooth_time_series")
+    export_columnar_store = import_optional(PACKAGE + "columnar_store", "export_columnar_store")
+    load_columnar_store = import_optional(PACKAGE + "columnar_store", "load_columnar_store")
+    reduce_pfts = import_optional(PACKAGE + "data_conversions.average_pfts", "reduce_pfts")
+    to_smoothed_daily_value = import_optional(PACKAGE + "data_conversions.smoothed_daily_value",
+                                              "to_smoothed_daily_value")
+    get_time_alignment = import_optional(PACKAGE + "data_conversions.time_alignment", "get_time_alignment")
+    colocate_observations = import_optional(PACKAGE + "data_conversions.time_alignment", "colocate_observations")
+    clear_time_alignment_cache = import_optional(PACKAGE + "data_conversions.time_alignment",
+                                                 "clear_time_alignment_cache")
+
+    flux_data_variables = FLUX_DATA_VARIABLES
+    if(get_flux_data_variables is not None):
+        flux_data_variables = get_flux_data_variables("beta&wp")
+
+    loads_variables = accepts_argument(load_jules_output_file_xarray, "variables")
+
+    def load_variables(file_path, variables):
+        # Older loaders read every variable, so the variables are selected after loading
+        if(loads_variables):
+            return load_jules_output_file_xarray(file_path, variables = variables).load()
+
+        return load_jules_output_file_xarray(file_path)[variables].load()
+
+    # Data used by the daily reduction, smoothing and plotting benchmarks, loaded into memory once
+    data_xarray = load_jules_output_file_xarray(data_file_paths[0]).load()
+    data_xarrays = [load_variables(path, flux_data_variables) for path in data_file_paths]
+    observation_xarray = load_variables(observation_file_path, ["GPP", "Qle"])
+    daily_xarray = to_daily_mean(data_xarray[["latent_heat"]])
+
+    store_folder = None
+    if(export_columnar_store is not None):
+        store_folder = export_columnar_store(data_file_paths[0], data_file_paths[0] + ".store")
+
+    def plot_flux_data_render():
+        fig, axs = plot_flux_data(data_xarrays, observation_xarray,
+                                  labels = ["run " + str(i) for i in range(len(data_xarrays))],
+                                  data_colours = ["C" + str(i) for i in range(len(data_xarrays))],
+                                  observation_colours = "black",
+                                  stress_indicator = ["beta&wp"] * len(data_xarrays),
+                                  smoothing = 30,
+                                  smoothing_type = "median",
+                                  percentiles = [75, 25])
+        fig.savefig(BytesIO(), format = "png")
+        plt.close(fig)
+
+    def plot_time_series_render(decimation):
+        fig = plt.figure(figsize = (10, 4))
+        if(decimation is None):
+            plot_time_series(data_xarray, "latent_heat", axs = plt.gca())
+        else:
+            plot_time_series(data_xarray, "latent_heat", axs = plt.gca(), decimation = decimation)
+        fig.savefig(BytesIO(), format = "png")
+        plt.close(fig)
+
+    def get_time_alignment_uncached():
+        clear_time_alignment_cache()
+        get_time_alignment(data_xarray["time"].values, observation_xarray["time"].values, model_time_offset = -0.5)
+
+    benchmarks = [
+        ("load_pandas", lambda: load_jules_output_file_pandas(data_file_paths[0])),
+        ("load_xarray", lambda: load_jules_output_file_xarray(data_file_paths[0]).load()),
+        ("load_xarray_flux_variables", lambda: load_variables(data_file_paths[0], flux_data_variables)),
+        ("load_columnar_store",
+         optional_benchmark(lambda: load_columnar_store(store_folder).load(), load_columnar_store)),
+        ("load_columnar_store_flux_variables",
+         optional_benchmark(lambda: load_columnar_store(store_folder, variables = flux_data_variables).load(),
+                            load_columnar_store)),
+        ("to_daily_total", lambda: to_daily_total(data_xarray)),
+        ("to_daily_mean", lambda: to_daily_mean(data_xarray)),
+        ("to_daily_median", lambda: to_daily_median(data_xarray)),
+        ("to_daily_max", lambda: to_daily_max(data_xarray)),
+        ("to_daily_min", lambda: to_daily_min(data_xarray)),
+        ("to_daily_std", lambda: to_daily_std(data_xarray)),
+        ("get_daily_values_at_time", lambda: get_daily_values_at_time(data_xarray, "12:00:00")),
+        ("get_daily_values_at_times",
+         optional_benchmark(lambda: get_daily_values_at_time(data_xarray, ["06:00:00", "12:00:00", "18:00:00"]),
+                            accepts_input(get_daily_values_at_time, data_xarray.isel(time = slice(0, 96)),
+                                          ["06:00:00", "12:00:00"]))),
+        ("mean_pfts", lambda: mean_pfts(data_xarray.copy(), ["psi_leaf_pft", "psi_root_zone_pft", "gpp_pft"])),
+        ("reduce_pfts_weighted",
+         optional_benchmark(lambda: reduce_pfts(data_xarray, ["psi_leaf_pft", "psi_root_zone_pft", "gpp_pft"],
+                                                weights = "frac"), reduce_pfts)),
+        ("smoothing_mean",
+         optional_benchmark(lambda: smooth_time_series(daily_xarray, "latent_heat", smoothing = 30),
+                            smooth_time_series)),
+        ("smoothing_median_percentiles",
+         optional_benchmark(lambda: smooth_time_series(daily_xarray, "latent_heat", smoothing = 30,
+                                                       smoothing_type = "median", percentiles = [75, 25]),
+                            smooth_time_series)),
+        ("smoothed_daily_total",
+         optional_benchmark(lambda: to_smoothed_daily_value(data_xarray, "gpp_gb", "total", smoothing = 30,
+                                                            unit_conversion = "kgC m-2 s-1 -> gC m-2 timestep-1"),
+                            to_smoothed_daily_value)),
+        ("get_time_alignment", optional_benchmark(get_time_alignment_uncached, get_time_alignment)),
+        ("colocate_observations",
+         optional_benchmark(lambda: colocate_observations(data_xarray, observation_xarray,
+                                                          model_keys = ["gpp_gb", "latent_heat"],
+                                                          model_time_offset = -0.5), colocate_observations)),
+        ("plot_time_series_raw", lambda: plot_time_series_render(None)),
+        ("plot_time_series_raw_decimated",
+         optional_benchmark(lambda: plot_time_series_render("min_max"),
+                            accepts_argument(plot_time_series, "decimation"))),
+        ("plot_flux_data", plot_flux_data_render),
+    ]
+
+    return benchmarks
+
+
+def import_optional(module_name, name):
+    """
+    Import a function that may not be available at the commit being benchmarked.
+
+    Args:
+    module_name (str): The module holding the function.
+    name (str): The name of the function.
+
+    Returns:
+    function (function): The function. None if the module or the function does not exist.
+    """
+
+    try:
+        return getattr(import_module(module_name), name)
+    except (ImportError, AttributeError):
+        return None
+
+
+def accepts_argument(function, argument):
+    """
+    Check if a function takes an argument, for arguments added after the first commit.
+
+    Args:
+    function (function): The function.
+    argument (str): The name of the argument.
+
+    Returns:
+    accepts (bool): Whether the function takes the argument.
+    """
+
+    return argument in signature(function).parameters
+
+
+def accepts_input(function, *args, **kwargs):
+    """
+    Check if a function accepts an input that was added after the first commit, by calling it with a small input.
+
+    Args:
+    function (function): The function.
+    *args, **kwargs: The small input.
+
+    Returns:
+    accepts (bool): Whether the function accepts the input.
+    """
+
+    try:
+        function(*args, **kwargs)
+    except (TypeError, AttributeError, ValueError):
+        return False
+
+    return True
+
+
+def optional_benchmark(function, available):
+    """
+    Get a benchmark that is only run if the code it benchmarks is available.
+
+    Args:
+    function (function): The benchmark, taking no arguments.
+    available: The function benchmarked, or whether the code is available. None or False if it is not.
+
+    Returns:
+    function (function): The benchmark. None if the code is not available.
+    """
+
+    if(available is None or available is False):
+        return None
+
+    return function
+
+
+def run_benchmark_suite(n_years = 1, timestep_minutes = 30, n_pfts = 5, n_soil_layers = 4, n_runs = 2,
+                        number = 3, benchmark_names = None, output_folder = None):
+    """
+    Run the benchmark suite on synthetic files and print the results.
+
+    Args:
+    n_years (int): The number of years of synthetic data.
+    timestep_minutes (int): The time step of the synthetic data in minutes.
+    n_pfts (int): The number of plant functional types.
+    n_soil_layers (int): The number of soil layers.
+    n_runs (int): The number of synthetic JULES output files, used by the plot_flux_data benchmark.
+    number (int): The number of times to repeat each timing.
+    benchmark_names (list): The names of the benchmarks to run. If None all the benchmarks are run.
+    output_folder (str): The folder to save the results in. If None the results are not saved.
+
+    Returns:
+    results (dict): The run metadata (see get_run_metadata), the results, the benchmarks skipped as the code they
+                    benchmark is not available at this commit and the error of each benchmark that failed.
+    """
+
+    results = {"metadata": get_run_metadata(), "results": [], "skipped": [], "failed": {}}
+    results["metadata"]["parameters"] = {"n_years": n_years, "timestep_minutes": timestep_minutes,
+                                         "n_pfts": n_pfts, "n_soil_layers": n_soil_layers, "n_runs": n_runs,
+                                         "number": number}
+
+    with TemporaryDirectory() as folder:
+        observation_file_path, data_file_paths = write_synthetic_site_files(folder, n_years = n_years,
+                                                                            timestep_minutes = timestep_minutes,
+                                                                            n_pfts = n_pfts,
+                                                                            n_soil_layers = n_soil_layers,
+                                                                            n_runs = n_runs)
+
+        print(f"{'benchmark':<30} {'min (s)':>10} {'median (s)':>11} {'peak memory (MB)':>17}")
+        for name, function in get_benchmarks(observation_file_path, data_file_paths):
+            if(benchmark_names is not None and name not in benchmark_names):
+                continue
+
+            # The code benchmarked was added after the commit being benchmarked
+            if(function is None):
+                results["skipped"].append(name)
+                print(f"{name:<30} skipped, not available at this commit")
+                continue
+
+            # Older commits may fail on inputs handled by later commits, which should not stop the other benchmarks
+            try:
+                times = repeat(function, number = 1, repeat = number)
+                peak_memory = get_peak_memory(function)
+            except Exception as error:
+                results["failed"][name] = repr(error)
+                print(f"{name:<30} failed: {error!r}")
+                continue
+
+            results["results"].append({"name": name, "min_time": min(times), "median_time": median(times),
+                                       "peak_memory": peak_memory})
+            print(f"{name:<30} {min(times):>10.4f} {median(times):>11.4f} {peak_memory / 1024 ** 2:>17.1f}")
+
+    if(output_folder is not None):
+        makedirs(output_folder, exist_ok = True)
+        output_file_path = join(output_folder, results["metadata"]["commit"][:10] + "_"
+                                + results["metadata"]["date"].replace(":", "") + ".json")
+
+        with open(output_file_path, "w") as output_file:
+            json.dump(results, output_file, indent = 2)
+
+        print("Results saved to " + output_file_path)
+
+    return results
+
+
+def get_peak_memory(function):
+    """
+    Get the peak Python memory allocated while running a function, including numpy arrays.
+
+    Args:
+    function (function): The function to run, taking no arguments.
+
+    Returns:
+    peak_memory (int): The peak memory in bytes.
+    """
+
+    tracemalloc.start()
+    try:
+        function()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return peak_memory
+
+
+def get_run_metadata():
+    """
+    Get the git commit, date and library versions for a benchmark run.
+
+    Returns:
+    metadata (dict): The run metadata.
+    """
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd = REPOSITORY_FOLDER, capture_output = True,
+                                text = True, check = True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd = REPOSITORY_FOLDER,
+                               capture_output = True, text = True, check = True).stdout.strip() != ""
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+        dirty = False
+
+    metadata = {"commit": commit,
+                "dirty": dirty,
+                "date": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "xarray": xr.__version__,
+                "matplotlib": matplotlib.__version__}
+
+    return metadata
+
+
+def compare_benchmark_results(baseline_file_path, new_file_path):
+    """
+    Print the change in time and peak memory of each benchmark between two saved runs.
+
+    Args:
+    baseline_file_path (str): The path of the saved baseline results.
+    new_file_path (str): The path of the saved new results.
+
+    Returns:
+    comparison (dict): {benchmark name: (time ratio, peak memory ratio)}, new / baseline.
+    """
+
+    with open(baseline_file_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(new_file_path) as new_file:
+        new = json.load(new_file)
+
+    if(baseline["metadata"].get("parameters") != new["metadata"].get("parameters")):
+        print("Warning: the runs used different parameters, the results may not be comparable.")
+
+    print("baseline " + baseline["metadata"]["commit"][:10] + ", new " + new["metadata"]["commit"][:10])
+    print(f"{'benchmark':<30} {'baseline (s)':>12} {'new (s)':>10} {'time ratio':>11} {'memory ratio':>13}")
+
+    baseline_results = {result["name"]: result for result in baseline["results"]}
+
+    comparison = {}
+    for result in new["results"]:
+        if(result["name"] not in baseline_results):
+            continue
+
+        baseline_result = baseline_results[result["name"]]
+        time_ratio = result["min_time"] / baseline_result["min_time"]
+        memory_ratio = result["peak_memory"] / max(baseline_result["peak_memory"], 1)
+
+        comparison[result["name"]] = (time_ratio, memory_ratio)
+        print(f"{result['name']:<30} {baseline_result['min_time']:>12.4f} {result['min_time']:>10.4f} "
+              f"{time_ratio:>11.2f} {memory_ratio:>13.2f}")
+
+    return comparison
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description = "Benchmark the JULES plotting and analysis code.")
+    parser.add_argument("--years", type = int, default = 1, help = "Years of synthetic data.")
+    parser.add_argument("--timestep", type = int, default = 30, help = "Time step in minutes.")
+    parser.add_argument("--pfts", type = int, default = 5, help = "Number of plant functional types.")
+    parser.add_argument("--soil-layers", type = int, default = 4, help = "Number of soil layers.")
+    parser.add_argument("--runs", type = int, default = 2, help = "Number of JULES output files.")
+    parser.add_argument("--number", type = int, default = 3, help = "Repeats of each timing.")
+    parser.add_argument("--benchmarks", nargs = "+", default = None, help = "The benchmarks to run.")
+    parser.add_argument("--output-folder", default = None, help = "Folder to save the results in.")
+    parser.add_argument("--compare", nargs = 2, metavar = ("BASELINE", "NEW"), default = None,
+                        help = "Compare two saved results instead of running the benchmarks.")
+    args = parser.parse_args()
+
+    if(args.compare is not None):
+        compare_benchmark_results(*args.compare)
+    else:
+        run_benchmark_suite(n_years = args.years, timestep_minutes = args.timestep, n_pfts = args.pfts,
+                            n_soil_layers = args.soil_layers, n_runs = args.runs, number = args.number,
+                            benchmark_names = args.benchmarks, output_folder = args.output_folder)
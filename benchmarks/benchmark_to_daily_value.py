@@ -0,0 +1,49 @@
+"""
+Benchmark the fixed time step daily reductions in to_daily_value against xarray's resample.
+
+Run from the repository root with:
+    python -m benchmarks.benchmark_to_daily_value
+"""
+
+from timeit import repeat
+
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import (to_daily_total, to_daily_mean,
+                                                                             to_daily_max, to_daily_std)
+from benchmarks.synthetic_jules_data import make_synthetic_jules_dataset
+
+
+def run_benchmark(n_years = 10, number = 3):
+    """
+    Time the daily reductions with the fixed time step method and with resample and print the speed up.
+
+    Args:
+    n_years (int): The number of years of synthetic data.
+    number (int): The number of times to repeat each timing. The fastest is reported.
+
+    Returns:
+    results (dict): {statistic: (fixed time step seconds, resample seconds)}
+    """
+
+    # A grid cell and a PFT variable on a fixed half hourly time step
+    data_xarray = make_synthetic_jules_dataset(n_years = n_years)[["gpp_gb", "psi_leaf_pft"]]
+
+    benchmarks = {"total": (to_daily_total, "sum"),
+                  "mean": (to_daily_mean, "mean"),
+                  "max": (to_daily_max, "max"),
+                  "std": (to_daily_std, "std")}
+
+    results = {}
+    print("statistic  fixed timestep (s)  resample (s)  speed up")
+    for statistic, (to_daily_function, resample_method) in benchmarks.items():
+        fixed_time = min(repeat(lambda: to_daily_function(data_xarray), number = 1, repeat = number))
+        resample_time = min(repeat(lambda: getattr(data_xarray.resample(time = "1D"), resample_method)(),
+                                   number = 1, repeat = number))
+
+        results[statistic] = (fixed_time, resample_time)
+        print(f"{statistic:<10} {fixed_time:>18.4f} {resample_time:>13.4f} {resample_time / fixed_time:>9.1f}x")
+
+    return results
+
+
+if __name__ == "__main__":
+    run_benchmark()
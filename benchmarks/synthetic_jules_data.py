@@ -0,0 +1,129 @@
+"""
+Generate synthetic JULES output and observation files for benchmarking.
+
+The files have the same layout as JULES point runs and PLUMBER2 flux files: a time dimension, a single grid
+cell (y, x) and pft, tile and soil dimensions for the variables that have them. The size of the files is set by
+the number of years, the time step, the number of plant functional types and the number of soil layers.
+"""
+
+from os import makedirs
+from os.path import join
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+
+def make_synthetic_jules_dataset(n_years = 1, timestep_minutes = 30, n_pfts = 5, n_soil_layers = 4,
+                                 start = "2000-01-01 00:30", seed = 0):
+    """
+    Make a synthetic JULES output dataset.
+
+    Args:
+    n_years (int): The number of years of data.
+    timestep_minutes (int): The time step in minutes.
+    n_pfts (int): The number of plant functional types.
+    n_soil_layers (int): The number of soil layers.
+    start (str): The first time step.
+    seed (int): The seed for the random values.
+
+    Returns:
+    data_xarray (xarray.Dataset): The synthetic dataset.
+    """
+
+    time_values = pd.date_range(start, periods = n_years * 365 * 24 * 60 // timestep_minutes,
+                                freq = str(timestep_minutes) + "min")
+    n_times = len(time_values)
+    n_tiles = n_pfts + 4
+    rng = np.random.default_rng(seed)
+
+    # Diurnal cycle, zero at night, so the daily totals and time of day values are realistic
+    hours = time_values.hour.values + time_values.minute.values / 60.
+    diurnal = np.maximum(np.sin(np.pi * (hours - 6.) / 12.), 0.)[:, None, None]
+
+    data_xarray = xr.Dataset(
+        {"gpp_gb": (("time", "y", "x"), 1e-7 * diurnal * rng.random((n_times, 1, 1))),
+         "latent_heat": (("time", "y", "x"), 300. * diurnal * rng.random((n_times, 1, 1))),
+         "fsmc_gb": (("time", "y", "x"), rng.random((n_times, 1, 1))),
+         "psi_root_zone_pft": (("time", "pft", "y", "x"), -rng.random((n_times, n_pfts, 1, 1))),
+         "psi_leaf_pft": (("time", "pft", "y", "x"),
+                          -rng.random((n_times, n_pfts, 1, 1)) - 2. * diurnal[:, None]),
+         "gpp_pft": (("time", "pft", "y", "x"), 1e-7 * diurnal[:, None] * rng.random((n_times, n_pfts, 1, 1))),
+         "frac": (("time", "tile", "y", "x"), np.full((n_times, n_tiles, 1, 1), 1. / n_tiles)),
+         "t_soil": (("time", "soil", "y", "x"), 280. + rng.random((n_times, n_soil_layers, 1, 1))),
+         "smcl": (("time", "soil", "y", "x"), 100. * rng.random((n_times, n_soil_layers, 1, 1))),
+         "latitude": (("y", "x"), [[47.1]]),
+         "longitude": (("y", "x"), [[11.3]])},
+        coords = {"time": time_values})
+
+    data_xarray["gpp_gb"].attrs["units"] = "kg m-2 s-1"
+    data_xarray["latent_heat"].attrs["units"] = "W m-2"
+
+    return data_xarray
+
+
+def make_synthetic_observation_dataset(n_years = 1, timestep_minutes = 30, start = "2000-01-01 00:30", seed = 1):
+    """
+    Make a synthetic flux observation dataset, with GPP and latent heat.
+
+    Args:
+    n_years (int): The number of years of data.
+    timestep_minutes (int): The time step in minutes.
+    start (str): The first time step.
+    seed (int): The seed for the random values.
+
+    Returns:
+    data_xarray (xarray.Dataset): The synthetic dataset.
+    """
+
+    time_values = pd.date_range(start, periods = n_years * 365 * 24 * 60 // timestep_minutes,
+                                freq = str(timestep_minutes) + "min")
+    rng = np.random.default_rng(seed)
+
+    hours = time_values.hour.values + time_values.minute.values / 60.
+    diurnal = np.maximum(np.sin(np.pi * (hours - 6.) / 12.), 0.)[:, None, None]
+
+    data_xarray = xr.Dataset(
+        {"GPP": (("time", "y", "x"), 10. * diurnal * rng.random((len(time_values), 1, 1))),
+         "Qle": (("time", "y", "x"), 300. * diurnal * rng.random((len(time_values), 1, 1)))},
+        coords = {"time": time_values})
+
+    data_xarray["GPP"].attrs["units"] = "umol m-2 s-1"
+    data_xarray["Qle"].attrs["units"] = "W m-2"
+
+    return data_xarray
+
+
+def write_synthetic_site_files(folder, site = "AT-Neu", n_years = 1, timestep_minutes = 30, n_pfts = 5,
+                               n_soil_layers = 4, n_runs = 2):
+    """
+    Write a synthetic observation file and JULES output files for a single site, named as in the PLUMBER2 and
+    JULES run folders.
+
+    Args:
+    folder (str): The folder to write the files to.
+    site (str): The site name, as used by the observation files, for example "AT-Neu".
+    n_years (int): The number of years of data.
+    timestep_minutes (int): The time step in minutes.
+    n_pfts (int): The number of plant functional types.
+    n_soil_layers (int): The number of soil layers.
+    n_runs (int): The number of JULES output files.
+
+    Returns:
+    observation_file_path (str): The path of the observation file.
+    data_file_paths (list): The paths of the JULES output files. List of str.
+    """
+
+    makedirs(folder, exist_ok = True)
+
+    observation_file_path = join(folder, site + "_FLUXNET2015_Flux.nc")
+    make_synthetic_observation_dataset(n_years, timestep_minutes).to_netcdf(observation_file_path)
+
+    data_file_paths = []
+    for i in range(n_runs):
+        data_file_path = join(folder, site.replace("-", "_") + "-JULES_vn7.4-run" + str(i) + ".nc")
+        make_synthetic_jules_dataset(n_years, timestep_minutes, n_pfts, n_soil_layers,
+                                     seed = i).to_netcdf(data_file_path)
+        data_file_paths.append(data_file_path)
+
+    return observation_file_path, data_file_paths
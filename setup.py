@@ -12,6 +12,9 @@ setup(name='JULES_Plotting_and_Analysis',
       description='A package to plot JULES output data',
       author='Cale Baguley',
       url='https://github.com/CaleBaguley/JULES-plotting-and-analysis-code',
-      packages=packages
+      packages=packages,
+      python_requires='>=3.11',
+      entry_points={'console_scripts': [
+          'jules-plot-sites = JULES_Plotting_and_Analysis.src.batch_plot_sites:main']}
       )
 
@@ -0,0 +1,84 @@
+"""
+Shared fixtures for the tests.
+"""
+
+from os import makedirs
+from os.path import join
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+
+def make_jules_dataset(start = "2000-01-01 00:30", periods = 48 * 3, freq = "30min", n_pfts = 3, seed = 0):
+    """
+    Make a small JULES output like dataset, with a grid box and a per PFT variable.
+
+    Args:
+    start (str): The first time step.
+    periods (int): The number of time steps.
+    freq (str): The time step, as a pandas frequency.
+    n_pfts (int): The number of plant functional types.
+    seed (int): The seed for the random values.
+
+    Returns:
+    data_xarray (xarray.Dataset): The dataset.
+    """
+
+    time_values = pd.date_range(start, periods = periods, freq = freq)
+    rng = np.random.default_rng(seed)
+
+    return xr.Dataset({"gpp_gb": (("time", "y", "x"), rng.random((periods, 1, 1))),
+                       "psi_leaf_pft": (("time", "pft", "y", "x"), -rng.random((periods, n_pfts, 1, 1)))},
+                      coords = {"time": time_values})
+
+
+@pytest.fixture
+def jules_dataset():
+    return make_jules_dataset()
+
+
+@pytest.fixture
+def jules_file(tmp_path):
+    file_path = str(tmp_path / "site-JULES.nc")
+    make_jules_dataset().to_netcdf(file_path)
+
+    return file_path
+
+
+def write_site_files(folder, sites = ("AT-Neu", "US-Ha1"), start = "2000-01-01 03:00", periods = 8 * 365 * 2,
+                     freq = "3h", n_runs = 1):
+    """
+    Write a small catalogue of observation and JULES output files for the multi-site plotting.
+
+    Args:
+    folder (str): The folder the catalogue is written to.
+    sites (tuple): The site names, in the observation file form, e.g. "AT-Neu".
+    start (str): The first time step.
+    periods (int): The number of time steps.
+    freq (str): The time step, as a pandas frequency.
+    n_runs (int): The number of JULES run folders.
+
+    Returns:
+    observation_folder (str): The folder holding the observation files.
+    JULES_run_folders (list): The folders holding the JULES output files.
+    """
+
+    observation_folder = join(folder, "Flux")
+    JULES_run_folders = [join(folder, "run_" + str(i)) for i in range(n_runs)]
+    for sub_folder in [observation_folder] + JULES_run_folders:
+        makedirs(sub_folder, exist_ok = True)
+
+    for i in range(len(sites)):
+        data_xarray = make_jules_dataset(start = start, periods = periods, freq = freq, seed = i)
+
+        xr.Dataset({"GPP": data_xarray["gpp_gb"] * 1e3, "Qle": data_xarray["gpp_gb"] * 100.}).to_netcdf(
+            join(observation_folder, sites[i] + "_Flux.nc"))
+
+        for j in range(n_runs):
+            xr.Dataset({"gpp_gb": data_xarray["gpp_gb"] * (j + 1), "latent_heat": data_xarray["gpp_gb"] * 100.,
+                        "fsmc_gb": data_xarray["gpp_gb"] / 2.}).to_netcdf(
+                join(JULES_run_folders[j], sites[i].replace("-", "_") + "-JULES.nc"))
+
+    return observation_folder, JULES_run_folders
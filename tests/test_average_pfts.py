@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.data_conversions.average_pfts import mean_pfts, reduce_pfts
+from conftest import make_jules_dataset
+
+
+def make_weighted_dataset():
+    data_xarray = make_jules_dataset(periods = 10)
+    rng = np.random.default_rng(2)
+
+    # The tile fractions, with the PFTs first followed by the other surface types
+    data_xarray["frac"] = (("time", "tile", "y", "x"), rng.random((10, 3 + 4, 1, 1)))
+    data_xarray["gpp_pft"] = (("time", "pft", "y", "x"), rng.random((10, 3, 1, 1)))
+    data_xarray["psi_leaf_pft"][0, 1] = np.nan
+
+    return data_xarray
+
+
+@pytest.mark.parametrize("reduction", ["mean", "sum"])
+def test_unweighted_matches_xarray(reduction):
+    data_xarray = make_weighted_dataset()
+
+    data_xarray_out = reduce_pfts(data_xarray, ["psi_leaf_pft", "gpp_pft"], reduction)
+
+    for col_id in ["psi_leaf_pft", "gpp_pft"]:
+        expected = getattr(data_xarray[col_id], reduction)(dim = "pft")
+        xr.testing.assert_allclose(data_xarray_out[col_id + "_" + reduction], expected)
+
+
+@pytest.mark.parametrize("reduction", ["mean", "sum"])
+def test_weighted_by_tile_fractions(reduction):
+    data_xarray = make_weighted_dataset()
+
+    data_xarray_out = reduce_pfts(data_xarray, ["psi_leaf_pft", "gpp_pft"], reduction, weights = "frac")
+
+    weights = data_xarray["frac"].values[:, :3]
+    for col_id in ["psi_leaf_pft", "gpp_pft"]:
+        values = data_xarray[col_id].values
+
+        # Missing values are given no weight
+        value_weights = np.where(np.isnan(values), 0., weights)
+        expected = np.nansum(values * value_weights, axis = 1)
+        if(reduction == "mean"):
+            expected = expected / value_weights.sum(axis = 1)
+
+        np.testing.assert_allclose(data_xarray_out[col_id + "_weighted_" + reduction].values, expected)
+
+
+def test_weights_data_array():
+    data_xarray = make_weighted_dataset()
+    weights = xr.DataArray([1., 0., 0.], dims = "pft")
+
+    data_xarray_out = reduce_pfts(data_xarray, "gpp_pft", weights = weights, suffix = "_first")
+
+    xr.testing.assert_allclose(data_xarray_out["gpp_pft_first"], data_xarray["gpp_pft"].isel(pft = 0, drop = True))
+
+
+def test_input_variables_are_unchanged():
+    data_xarray = make_weighted_dataset()
+
+    data_xarray_out = reduce_pfts(data_xarray, ["gpp_pft"])
+
+    assert "gpp_pft_mean" not in data_xarray
+    assert data_xarray_out["gpp_pft"].data is data_xarray["gpp_pft"].data
+
+    mean_pfts(data_xarray, "gpp_pft")
+    assert "gpp_pft_mean" in data_xarray
+
+
+def test_invalid_inputs():
+    data_xarray = make_weighted_dataset()
+
+    with pytest.raises(ValueError):
+        reduce_pfts(data_xarray, "gpp_gb")
+
+    with pytest.raises(ValueError):
+        reduce_pfts(data_xarray, "gpp_pft", "median")
+
+    with pytest.raises(ValueError):
+        reduce_pfts(data_xarray, "gpp_pft", weights = xr.DataArray([1., 1.], dims = "pft"))
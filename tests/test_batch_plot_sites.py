@@ -0,0 +1,130 @@
+from os import listdir, makedirs, sep
+from os.path import exists, join
+
+import pytest
+
+from JULES_Plotting_and_Analysis.src.batch_plot_sites import load_run_config, main
+from JULES_Plotting_and_Analysis.src.plotting import plot_flux_results_multiple_sites
+
+CONFIG = """
+observation_folder = "Flux"
+JULES_run_folders = ["run_a", "/data/run_b"]
+JULES_labels = ["run a", "run b"]
+stress_indicator = ["beta", "beta"]
+output_folder = "figures"
+catalogue_index_file = "index.json"
+smoothing = 5
+"""
+
+
+def write_config(folder, text = CONFIG, file_name = "run.toml"):
+    config_file = join(folder, file_name)
+    with open(config_file, "w") as file:
+        file.write(text)
+
+    return config_file
+
+
+def make_catalogue(folder):
+    for sub_folder in ["Flux", "run_a", "run_b"]:
+        makedirs(join(folder, sub_folder))
+
+    for site in ["AT-Neu", "DE-Tha", "US-Ha1"]:
+        open(join(folder, "Flux", site + "_2003-2006_FLUXNET2015_Flux.nc"), "w").close()
+        for sub_folder in ["run_a", "run_b"]:
+            open(join(folder, sub_folder, site.replace("-", "_") + "-JULES_vn7.4.nc"), "w").close()
+
+    return write_config(folder, CONFIG.replace("/data/run_b", "run_b"))
+
+
+def test_load_run_config(tmp_path):
+    config = load_run_config(write_config(str(tmp_path)))
+
+    # The relative paths are relative to the configuration file and absolute paths are unchanged
+    assert config["observation_folder"] == join(str(tmp_path), "Flux")
+    assert config["JULES_run_folders"] == [join(str(tmp_path), "run_a"), "/data/run_b"]
+    assert config["output_folder"] == join(str(tmp_path), "figures") + sep
+    assert config["catalogue_index_file"] == join(str(tmp_path), "index.json")
+    assert config["smoothing"] == 5
+    assert config["JULES_labels"] == ["run a", "run b"]
+
+
+@pytest.mark.parametrize("text, file_name", [(CONFIG.replace('output_folder = "figures"', ""), "run.toml"),
+                                             (CONFIG + "colour = 'red'\n", "run.toml"),
+                                             ("output_folder = ['a', 'b']\n", "run.toml"),
+                                             (CONFIG, "run.ini")])
+def test_invalid_config(tmp_path, text, file_name):
+    with pytest.raises(ValueError):
+        load_run_config(write_config(str(tmp_path), text, file_name))
+
+
+@pytest.fixture
+def plot_calls(monkeypatch):
+    calls = []
+
+    def plot_multi_site_flux_data(**kwargs):
+        calls.append(kwargs)
+        return {"plotted": [], "skipped": [], "failed": []}
+
+    monkeypatch.setattr(plot_flux_results_multiple_sites, "plot_multi_site_flux_data", plot_multi_site_flux_data)
+
+    return calls
+
+
+def test_command_line_overrides(tmp_path, plot_calls):
+    config_file = write_config(str(tmp_path),
+                               CONFIG + 'sites = ["AT-Neu"]\ntime_range = ["2001-01-01", "2002-01-01"]\n')
+
+    assert main([config_file]) == 0
+    assert plot_calls[-1]["sites"] == ["AT-Neu"]
+    assert plot_calls[-1]["time_range"] == ["2001-01-01", "2002-01-01"]
+    assert "exclude_sites" not in plot_calls[-1]
+
+    assert main([config_file, "--sites", "DE-Tha", "US-Ha1", "--exclude-sites", "US-Ha1", "--jobs", "3",
+                 "--skip-unchanged"]) == 0
+    assert plot_calls[-1]["sites"] == ["DE-Tha", "US-Ha1"]
+    assert plot_calls[-1]["exclude_sites"] == ["US-Ha1"]
+    assert plot_calls[-1]["n_jobs"] == 3
+    assert plot_calls[-1]["skip_unchanged"]
+
+
+@pytest.mark.parametrize("args, time_range", [(["--start", "2003-01-01", "--end", "2003-12-31"],
+                                               ["2003-01-01", "2003-12-31"]),
+                                              (["--start", "2003-01-01"], ["2003-01-01", None]),
+                                              (["--end", "2003-12-31"], [None, "2003-12-31"])])
+def test_time_range_overrides(tmp_path, plot_calls, args, time_range):
+    config_file = write_config(str(tmp_path), CONFIG + 'time_range = ["2001-01-01", "2002-01-01"]\n')
+
+    assert main([config_file] + args) == 0
+    assert plot_calls[-1]["time_range"] == time_range
+
+
+def test_failed_sites_exit_code(tmp_path, monkeypatch):
+    monkeypatch.setattr(plot_flux_results_multiple_sites, "plot_multi_site_flux_data",
+                        lambda **kwargs: {"plotted": [], "skipped": [], "failed": [("AT_Neu", "error")]})
+
+    assert main([write_config(str(tmp_path))]) == 1
+
+
+def test_invalid_config_exits(tmp_path):
+    with pytest.raises(SystemExit):
+        main([write_config(str(tmp_path), CONFIG, "run.ini")])
+
+
+def test_dry_run_is_read_only(tmp_path, plot_calls, capsys):
+    config_file = make_catalogue(str(tmp_path))
+    files_before = {folder: sorted(listdir(join(str(tmp_path), folder))) for folder in ["", "Flux", "run_a", "run_b"]}
+
+    assert main([config_file, "--dry-run", "--exclude-sites", "DE-Tha", "--start", "2003-01-01"]) == 0
+
+    output = capsys.readouterr().out
+    assert "AT_Neu" in output and "US_Ha1" in output and "DE_Tha" not in output
+    assert "2 sites would be plotted." in output
+    assert "time range: 2003-01-01 to None" in output
+
+    # Nothing is plotted and neither the index nor the figures folder is written
+    assert plot_calls == []
+    assert not exists(join(str(tmp_path), "index.json"))
+    assert not exists(join(str(tmp_path), "figures"))
+    assert files_before == {folder: sorted(listdir(join(str(tmp_path), folder)))
+                            for folder in ["", "Flux", "run_a", "run_b"]}
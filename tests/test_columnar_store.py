@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.columnar_store import (export_columnar_store, is_columnar_store_current,
+                                                            load_columnar_store)
+
+
+def test_store_matches_file(jules_file, tmp_path):
+    store_folder = str(tmp_path / "store")
+    export_columnar_store(jules_file, store_folder)
+
+    with xr.open_dataset(jules_file) as data_xarray:
+        xr.testing.assert_identical(load_columnar_store(store_folder), data_xarray.load())
+
+        # An end date includes the whole of that day
+        data_xarray_selected = load_columnar_store(store_folder, variables = "gpp_gb",
+                                                   time_range = ["2000-01-02", "2000-01-02"])
+        xr.testing.assert_identical(data_xarray_selected,
+                                    data_xarray[["gpp_gb"]].sel(time = slice("2000-01-02", "2000-01-02")))
+
+    assert isinstance(data_xarray_selected["gpp_gb"].values.base, np.memmap)
+
+
+def test_store_is_current(jules_file, tmp_path):
+    store_folder = str(tmp_path / "store")
+    export_columnar_store(jules_file, store_folder, variables = ["gpp_gb"])
+
+    assert is_columnar_store_current(store_folder, jules_file, variables = ["gpp_gb"])
+    assert not is_columnar_store_current(store_folder, jules_file)
+
+    file_stat = os.stat(jules_file)
+    os.utime(jules_file, ns = (file_stat.st_atime_ns, file_stat.st_mtime_ns + 10 ** 9))
+
+    assert not is_columnar_store_current(store_folder, jules_file, variables = ["gpp_gb"])
+
+
+def test_reexport_removes_dropped_variables(jules_file, tmp_path):
+    store_folder = str(tmp_path / "store")
+    export_columnar_store(jules_file, store_folder)
+    export_columnar_store(jules_file, store_folder, variables = ["gpp_gb"])
+
+    assert "psi_leaf_pft.npy" not in os.listdir(store_folder)
+    assert list(load_columnar_store(store_folder).data_vars) == ["gpp_gb"]
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import get_daily_values_at_time
+from JULES_Plotting_and_Analysis.src.plotting import daily_series_plan
+from JULES_Plotting_and_Analysis.src.plotting.daily_series_plan import DailySeriesRequest, compute_daily_series_plan
+from JULES_Plotting_and_Analysis.src.plotting.plot_time_series import smooth_time_series
+from conftest import make_jules_dataset
+
+
+@pytest.fixture
+def computed_requests(monkeypatch):
+    requests = []
+    compute_daily_series = daily_series_plan._compute_daily_series
+
+    def count_compute_daily_series(data_xarray, request, cache_folder):
+        requests.append(request)
+        return compute_daily_series(data_xarray, request, cache_folder)
+
+    monkeypatch.setattr(daily_series_plan, "_compute_daily_series", count_compute_daily_series)
+
+    return requests
+
+
+@pytest.mark.parametrize("n_jobs", [1, 3])
+def test_duplicate_requests_are_computed_once(computed_requests, n_jobs):
+    data_xarray = make_jules_dataset(periods = 48 * 10)
+    other_xarray = make_jules_dataset(periods = 48 * 10, seed = 1)
+
+    # The same dataset passed twice, the same percentiles as a list and tuple, and smoothing settings that have
+    # no effect without smoothing
+    requests = [DailySeriesRequest(0, "gpp_gb", statistic = "total", smoothing = 3, smoothing_type = "median",
+                                   percentiles = [25, 75]),
+                DailySeriesRequest(1, "gpp_gb", statistic = "total", smoothing = 3, smoothing_type = "median",
+                                   percentiles = (25, 75)),
+                DailySeriesRequest(2, "gpp_gb", statistic = "total", smoothing = 3, smoothing_type = "median",
+                                   percentiles = (25, 75)),
+                DailySeriesRequest(0, "psi_leaf_pft", time_of_day = "12:00:00", pft_mean = True),
+                DailySeriesRequest(1, "psi_leaf_pft", time_of_day = "12:00:00", pft_mean = True,
+                                   smoothing_type = "median", percentiles = (10, 90)),
+                DailySeriesRequest(0, "gpp_gb", statistic = "mean")]
+
+    daily_series = compute_daily_series_plan([data_xarray, data_xarray, other_xarray], requests, n_jobs = n_jobs)
+
+    assert len(computed_requests) == 4
+    assert daily_series[0] is daily_series[1]
+    assert daily_series[3] is daily_series[4]
+    assert daily_series[2] is not daily_series[0]
+    assert not np.allclose(daily_series[0]["median"].values, daily_series[2]["median"].values)
+
+
+def test_time_of_day_pft_mean(computed_requests):
+    data_xarray = make_jules_dataset(periods = 48 * 10)
+
+    daily_series = compute_daily_series_plan([data_xarray], [DailySeriesRequest(0, "psi_leaf_pft", smoothing = 3,
+                                                                                time_of_day = "12:00:00",
+                                                                                pft_mean = True)])
+
+    # The PFT mean is taken after selecting the time of day
+    expected = smooth_time_series(get_daily_values_at_time(data_xarray[["psi_leaf_pft"]], "12:00:00")
+                                  .mean(dim = "pft"), "psi_leaf_pft", smoothing = 3)
+    xr.testing.assert_allclose(daily_series[0], expected)
+    assert "pft" in data_xarray["psi_leaf_pft"].dims
+
+
+def test_request_without_statistic_or_time_of_day():
+    with pytest.raises(ValueError):
+        compute_daily_series_plan([make_jules_dataset()], [DailySeriesRequest(0, "gpp_gb")])
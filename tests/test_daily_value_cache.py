@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.data_conversions.daily_value_cache import (cached_to_daily_value,
+                                                                               get_cache_file_path)
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import to_daily_value
+
+
+def test_cache_is_reused(jules_file, tmp_path):
+    cache_folder = str(tmp_path / "cache")
+
+    with xr.open_dataset(jules_file) as data_xarray:
+        daily = cached_to_daily_value(data_xarray, "gpp_gb", "mean", cache_folder)
+        assert len(os.listdir(cache_folder)) == 1
+
+        cached = cached_to_daily_value(data_xarray, "gpp_gb", "mean", cache_folder)
+
+    xr.testing.assert_allclose(cached, daily)
+    assert len(os.listdir(cache_folder)) == 1
+
+
+def test_subsets_are_keyed_separately(jules_file, tmp_path):
+    cache_folder = str(tmp_path / "cache")
+
+    with xr.open_dataset(jules_file) as data_xarray:
+        whole = cached_to_daily_value(data_xarray, "psi_leaf_pft", "mean", cache_folder)
+
+        for subset in [data_xarray.isel(pft = 0), data_xarray.isel(pft = [1]), data_xarray.isel(pft = [1]).load()]:
+            daily = cached_to_daily_value(subset, "psi_leaf_pft", "mean", cache_folder)
+            xr.testing.assert_allclose(daily, to_daily_value(subset[["psi_leaf_pft"]].load(), "mean"))
+
+        # A subset of the time steps
+        subset = data_xarray.isel(time = slice(47, None))
+        daily = cached_to_daily_value(subset, "psi_leaf_pft", "mean", cache_folder)
+        xr.testing.assert_allclose(daily, whole.isel(time = slice(1, None)))
+
+
+def test_edited_values_are_not_served_from_cache(jules_file, tmp_path):
+    cache_folder = str(tmp_path / "cache")
+
+    with xr.open_dataset(jules_file) as data_xarray:
+        data_xarray = data_xarray.load()
+
+    cached_to_daily_value(data_xarray, "gpp_gb", "total", cache_folder)
+    data_xarray["gpp_gb"].values[:] = 1.
+
+    daily = cached_to_daily_value(data_xarray, "gpp_gb", "total", cache_folder)
+    np.testing.assert_allclose(daily["gpp_gb"].values[1:-1], 48.)
+
+
+def test_variables_without_source_are_not_cached(jules_dataset, tmp_path):
+    assert get_cache_file_path(jules_dataset, "gpp_gb", "mean", str(tmp_path)) is None
@@ -0,0 +1,47 @@
+import numpy as np
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.data_conversions.incremental_daily_value import update_daily_value_store
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import to_daily_statistics
+from conftest import make_jules_dataset
+
+
+def test_updates_match_full_record(tmp_path):
+    file_path = str(tmp_path / "site-JULES.nc")
+    store_path = str(tmp_path / "site-daily.nc")
+    full_record = make_jules_dataset(periods = 48 * 4 + 5)
+
+    # The file is written in parts, with the last day incomplete at the first update
+    for n_times in [48 + 10, 48 * 3, 48 * 4 + 5]:
+        full_record.isel(time = slice(0, n_times)).to_netcdf(file_path)
+        daily = update_daily_value_store(file_path, store_path, ["gpp_gb", "psi_leaf_pft"])
+
+    expected = to_daily_statistics(full_record, ("total", "mean"))
+
+    assert np.datetime64(daily.attrs["last_processed_time"]) == full_record["time"].values[-1]
+    for key in ["gpp_gb", "psi_leaf_pft"]:
+        np.testing.assert_allclose(daily[key].transpose(*expected[key].dims).values, expected[key].values)
+
+
+def test_unchanged_file_returns_store(tmp_path):
+    file_path = str(tmp_path / "site-JULES.nc")
+    store_path = str(tmp_path / "site-daily.nc")
+    make_jules_dataset().to_netcdf(file_path)
+
+    daily = update_daily_value_store(file_path, store_path, "gpp_gb")
+
+    xr.testing.assert_identical(update_daily_value_store(file_path, store_path, "gpp_gb"), daily)
+
+
+def test_restarted_file_is_reprocessed(tmp_path):
+    file_path = str(tmp_path / "site-JULES.nc")
+    store_path = str(tmp_path / "site-daily.nc")
+
+    make_jules_dataset(start = "2000-01-01 00:30").to_netcdf(file_path)
+    update_daily_value_store(file_path, store_path, "gpp_gb")
+
+    restarted = make_jules_dataset(start = "2001-06-01 00:30", seed = 1)
+    restarted.to_netcdf(file_path)
+    daily = update_daily_value_store(file_path, store_path, "gpp_gb")
+
+    np.testing.assert_array_equal(daily["time"].values, to_daily_statistics(restarted)["time"].values)
@@ -0,0 +1,115 @@
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.plotting.line_decimation import decimate_time_series, get_lttb_positions, \
+    get_min_max_positions
+
+
+def make_line_dataset(n_values = 20000):
+    rng = np.random.default_rng(3)
+    time = pd.date_range("2000-01-01", periods = n_values, freq = "30min").values
+
+    line = np.sin(np.arange(n_values) / 500) + rng.normal(0, 0.1, n_values)
+    line[1234] = 10.
+    line[15678] = -10.
+    line[50:70] = np.nan
+
+    return xr.Dataset({"median": ("time", line), "upper": ("time", line + rng.random(n_values))},
+                      coords = {"time": time})
+
+
+def bin_extremes(x_values, y_values, n_bins):
+    x_values = x_values.astype(float)
+    bin_index = np.clip(np.searchsorted(np.linspace(x_values[0], x_values[-1], n_bins + 1), x_values,
+                                        side = "right") - 1, 0, n_bins - 1)
+
+    return [(np.nanmin(y_values[bin_index == i]), np.nanmax(y_values[bin_index == i]))
+            for i in range(n_bins) if not np.isnan(y_values[bin_index == i]).all()]
+
+
+def test_min_max_keeps_the_extremes_of_every_bin():
+    data_xarray = make_line_dataset()
+    x_values = data_xarray["time"].values.astype(np.int64)
+    lines = [data_xarray["median"].values, data_xarray["upper"].values]
+
+    positions = get_min_max_positions(data_xarray["time"].values, lines, 100)
+
+    assert len(positions) <= 4 * 100 * len(lines)
+    assert positions[0] == 0 and positions[-1] == len(x_values) - 1
+    for line in lines:
+        assert bin_extremes(x_values, line, 100) == bin_extremes(x_values[positions], line[positions], 100)
+
+
+def test_min_max_keeps_short_lines():
+    np.testing.assert_array_equal(get_min_max_positions(np.arange(8), [np.arange(8)], 2), np.arange(8))
+
+
+@pytest.mark.parametrize("get_positions", [get_min_max_positions, get_lttb_positions])
+def test_invalid_inputs(get_positions):
+    with pytest.raises(ValueError):
+        get_positions(np.arange(100), [np.arange(100)], 0)
+
+    with pytest.raises(ValueError):
+        get_positions(np.arange(100)[::-1], [np.arange(100)], 2)
+
+
+def test_lttb_keeps_one_point_per_bucket():
+    data_xarray = make_line_dataset()
+    line = data_xarray["median"].values
+
+    positions = get_lttb_positions(data_xarray["time"].values, [line], 100)
+
+    assert len(positions) <= 100 + 2
+    assert positions[0] == 0 and positions[-1] == len(line) - 1
+    assert not np.isnan(line[positions[1:-1]]).any()
+
+    # The isolated spikes form the largest triangles in their buckets
+    assert 1234 in positions and 15678 in positions
+
+
+@pytest.mark.parametrize("method", ["min_max", "lttb"])
+def test_decimate_time_series(method):
+    data_xarray = make_line_dataset()
+    fig, axs = plt.subplots(figsize = (4, 2), dpi = 50)
+
+    data_xarray_out = decimate_time_series(data_xarray, ["median", "upper"], axs, method = method)
+    plt.close(fig)
+
+    assert data_xarray_out.sizes["time"] < data_xarray.sizes["time"] / 10
+    for key in ["median", "upper"]:
+        xr.testing.assert_equal(data_xarray_out[key], data_xarray[key].sel(time = data_xarray_out["time"]))
+
+    if(method == "min_max"):
+        for key in ["median", "upper"]:
+            assert data_xarray_out[key].max() == data_xarray[key].max()
+            assert data_xarray_out[key].min() == data_xarray[key].min()
+
+
+def test_decimate_time_series_keeps_the_extremes_outside_the_range_shown():
+    data_xarray = make_line_dataset()
+    fig, axs = plt.subplots(figsize = (4, 2), dpi = 50)
+    x_range = [data_xarray["time"].values[5000], data_xarray["time"].values[6000]]
+
+    data_xarray_out = decimate_time_series(data_xarray, ["median"], axs, x_range = x_range)
+    plt.close(fig)
+
+    assert data_xarray_out["median"].max() == 10.
+    assert data_xarray_out["median"].min() == -10.
+
+    # The first, last, minimum and maximum of each side, and the nearest time to the range shown
+    assert (data_xarray_out["time"] < x_range[0]).sum() <= 5
+    assert (data_xarray_out["time"] > x_range[1]).sum() <= 5
+
+
+def test_unknown_method():
+    fig, axs = plt.subplots()
+    with pytest.raises(ValueError):
+        decimate_time_series(make_line_dataset(), ["median"], axs, method = "every_other")
+    plt.close(fig)
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.instrumentation import (disable_instrumentation, enable_instrumentation,
+                                                             get_instrumentation_records)
+from JULES_Plotting_and_Analysis.src.load_jules_output_file import (get_daily_time_chunks,
+                                                                    load_jules_output_file_pandas,
+                                                                    load_jules_output_file_xarray)
+
+
+def test_daily_time_chunks_hold_whole_days():
+    time_values = pd.date_range("2000-01-01 00:30", periods = 48 * 5, freq = "30min").values
+
+    # The first day is missing its 00:00 time step, which is the last time step of the file
+    assert get_daily_time_chunks(time_values, 2) == (47 + 48, 48 * 2, 48 + 1)
+
+
+def test_daily_time_chunks_cftime():
+    time_values = xr.date_range("2001-02-27 00:30", periods = 48 * 3, freq = "30min", calendar = "noleap",
+                                use_cftime = True).values
+
+    # 2001-02-28 is followed by 2001-03-01, as in the Gregorian calendar
+    assert get_daily_time_chunks(time_values, 1) == (47, 48, 48, 1)
+
+
+def test_daily_time_chunks_chunk_days():
+    with pytest.raises(ValueError):
+        get_daily_time_chunks(pd.date_range("2000-01-01", periods = 4, freq = "1h").values, 0)
+
+
+def test_chunked_loading(jules_file):
+    data_xarray = load_jules_output_file_xarray(jules_file, variables = "gpp_gb", chunk_days = 2)
+
+    assert data_xarray.chunksizes["time"] == (47 + 48, 48 + 1)
+    assert list(data_xarray.data_vars) == ["gpp_gb"]
+
+
+def test_pandas_chunks_match_whole_file(jules_file):
+    df = load_jules_output_file_pandas(jules_file, variables = ["gpp_gb"])
+    df_chunks = list(load_jules_output_file_pandas(jules_file, variables = ["gpp_gb"], chunk_days = 1))
+
+    assert len(df_chunks) == 4
+    pd.testing.assert_frame_equal(pd.concat(df_chunks), df)
+
+
+def test_open_is_timed_as_the_open_stage(jules_file):
+    enable_instrumentation()
+    try:
+        load_jules_output_file_xarray(jules_file, variables = "gpp_gb")
+        records = get_instrumentation_records()
+    finally:
+        disable_instrumentation()
+
+    assert [(record["stage"], record["detail"]) for record in records] == [("open", jules_file)]
@@ -0,0 +1,54 @@
+import numpy as np
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.load_multi_site_dataset import get_daily_site_mask, load_multi_site_dataset
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import to_daily_value
+from conftest import make_jules_dataset
+
+
+def write_sites(tmp_path):
+    site_datasets = {"AT-Neu": make_jules_dataset(start = "2000-01-01 00:30", periods = 48 * 3),
+                     "US-Ha1": make_jules_dataset(start = "2000-01-02 00:30", periods = 48 * 3, seed = 1)}
+
+    file_paths = []
+    for site, data_xarray in site_datasets.items():
+        file_paths.append(str(tmp_path / (site + "-JULES.nc")))
+        data_xarray.to_netcdf(file_paths[-1])
+
+    return file_paths, site_datasets
+
+
+def test_sites_are_stacked_lazily(tmp_path):
+    file_paths, site_datasets = write_sites(tmp_path)
+
+    data_xarray = load_multi_site_dataset(file_paths, list(site_datasets), chunk_days = 1)
+
+    assert data_xarray["gpp_gb"].chunks is not None
+    assert data_xarray.sizes["time"] == 48 * 4
+    assert data_xarray.chunksizes["site"] == (1, 1)
+
+    for site, site_xarray in site_datasets.items():
+        values = data_xarray["gpp_gb"].sel(site = site)
+        mask = data_xarray["time_mask"].sel(site = site).values
+        np.testing.assert_array_equal(values.values[mask], site_xarray["gpp_gb"].values)
+        assert np.isnan(values.values[~mask]).all()
+
+
+def test_daily_values_of_stacked_sites(tmp_path):
+    file_paths, site_datasets = write_sites(tmp_path)
+
+    data_xarray = load_multi_site_dataset(file_paths, list(site_datasets))
+    daily = to_daily_value(data_xarray[["gpp_gb"]], "total").where(get_daily_site_mask(data_xarray))
+
+    for site, site_xarray in site_datasets.items():
+        expected = to_daily_value(site_xarray[["gpp_gb"]], "total")
+        np.testing.assert_allclose(daily["gpp_gb"].sel(site = site, time = expected["time"]).values,
+                                   expected["gpp_gb"].values)
+
+
+def test_sites_read_into_memory(tmp_path):
+    file_paths, site_datasets = write_sites(tmp_path)
+
+    data_xarray = load_multi_site_dataset(file_paths, list(site_datasets), chunk_days = None)
+
+    assert data_xarray["gpp_gb"].chunks is None
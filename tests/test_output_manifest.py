@@ -0,0 +1,53 @@
+import os
+
+from JULES_Plotting_and_Analysis.src.output_manifest import (get_output_fingerprint, is_output_current,
+                                                             save_output_manifest)
+
+
+def make_outputs(tmp_path):
+    input_file = tmp_path / "site-JULES.nc"
+    input_file.write_bytes(b"jules")
+    figure = tmp_path / "figures" / "site.png"
+    figure.parent.mkdir()
+    figure.write_bytes(b"png")
+
+    manifest_file = str(figure.parent / "manifest.json")
+    fingerprint = get_output_fingerprint([str(input_file)], {"smoothing": 7})
+    save_output_manifest(manifest_file, fingerprint, [figure.name])
+
+    return str(input_file), figure, manifest_file
+
+
+def test_unchanged_outputs_are_current(tmp_path):
+    input_file, figure, manifest_file = make_outputs(tmp_path)
+
+    assert is_output_current(manifest_file, get_output_fingerprint([input_file], {"smoothing": 7}))
+
+
+def test_modified_input_is_not_current(tmp_path):
+    input_file, figure, manifest_file = make_outputs(tmp_path)
+
+    input_stat = os.stat(input_file)
+    os.utime(input_file, ns = (input_stat.st_atime_ns, input_stat.st_mtime_ns + 10 ** 9))
+
+    assert not is_output_current(manifest_file, get_output_fingerprint([input_file], {"smoothing": 7}))
+
+
+def test_changed_settings_are_not_current(tmp_path):
+    input_file, figure, manifest_file = make_outputs(tmp_path)
+
+    assert not is_output_current(manifest_file, get_output_fingerprint([input_file], {"smoothing": 30}))
+
+
+def test_deleted_output_is_not_current(tmp_path):
+    input_file, figure, manifest_file = make_outputs(tmp_path)
+    figure.unlink()
+
+    assert not is_output_current(manifest_file, get_output_fingerprint([input_file], {"smoothing": 7}))
+
+
+def test_missing_manifest_is_not_current(tmp_path):
+    input_file, figure, manifest_file = make_outputs(tmp_path)
+    os.remove(manifest_file)
+
+    assert not is_output_current(manifest_file, get_output_fingerprint([input_file], {"smoothing": 7}))
@@ -0,0 +1,156 @@
+import matplotlib
+
+matplotlib.use("Agg")
+
+from datetime import date
+from os import listdir
+from os.path import exists, join
+from shutil import copyfile
+
+import pytest
+
+from JULES_Plotting_and_Analysis.src.plotting.plot_flux_results_multiple_sites import (_get_plot_windows,
+                                                                                       _get_site_date_range,
+                                                                                       _get_site_time_ranges,
+                                                                                       _get_window_file_name,
+                                                                                       _load_site_data,
+                                                                                       plot_multi_site_flux_data)
+from conftest import write_site_files
+
+
+def plot_sites(folder, observation_folder, JULES_run_folders, **kwargs):
+    output_folder = join(folder, "figures") + "/"
+    kwargs = dict({"smoothing": 5, "data_colours": ["blue"] * len(JULES_run_folders), "observation_colour": "orange"},
+                  **kwargs)
+
+    summary = plot_multi_site_flux_data(observation_folder, JULES_run_folders,
+                                        ["run " + str(i) for i in range(len(JULES_run_folders))], output_folder,
+                                        ["beta"] * len(JULES_run_folders), **kwargs)
+
+    return summary, output_folder
+
+
+def add_broken_site(observation_folder, JULES_run_folders, site = "DE-Tha"):
+    # A site whose JULES output is not a valid file
+    copyfile(join(observation_folder, listdir(observation_folder)[0]), join(observation_folder, site + "_Flux.nc"))
+    for folder in JULES_run_folders:
+        with open(join(folder, site.replace("-", "_") + "-JULES.nc"), "w") as file:
+            file.write("not a netCDF file")
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_failed_sites_are_reported(tmp_path, n_jobs):
+    observation_folder, JULES_run_folders = write_site_files(str(tmp_path))
+    add_broken_site(observation_folder, JULES_run_folders)
+
+    summary, output_folder = plot_sites(str(tmp_path), observation_folder, JULES_run_folders, n_jobs = n_jobs)
+
+    # The other sites are still plotted
+    assert summary["plotted"] == ["AT_Neu", "US_Ha1"]
+    assert summary["skipped"] == []
+    assert list(summary["failed"]) == ["DE_Tha"]
+    assert "Traceback" in summary["failed"]["DE_Tha"]
+
+    for site in ["AT_Neu", "US_Ha1"]:
+        assert exists(join(output_folder, site, site + "_flux_data.png"))
+    assert not exists(join(output_folder, "DE_Tha", "DE_Tha_flux_data.png"))
+
+
+def test_invalid_n_jobs(tmp_path):
+    observation_folder, JULES_run_folders = write_site_files(str(tmp_path))
+
+    with pytest.raises(ValueError):
+        plot_sites(str(tmp_path), observation_folder, JULES_run_folders, n_jobs = 0)
+
+
+def test_plot_windows():
+    # Three years or less are not split
+    assert _get_plot_windows(date(2000, 1, 1), date(2003, 1, 1)) == []
+
+    assert _get_plot_windows(date(2000, 1, 1), date(2005, 1, 1)) == [[date(2000, 1, 1), date(2003, 1, 1)],
+                                                                     [date(2001, 1, 1), date(2004, 1, 1)],
+                                                                     [date(2002, 1, 1), date(2005, 1, 1)]]
+
+    assert _get_window_file_name("AT_Neu", None) == "AT_Neu_flux_data.png"
+    assert _get_window_file_name("AT_Neu", [date(2001, 1, 1), date(2004, 1, 1)]) == "AT_Neu_flux_data_2001_2004.png"
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_sliced_windows_match_rescaled_windows(tmp_path, n_jobs):
+    # Six hourly time steps, including the 06:00 and 12:00 steps the stress indicators are read at
+    observation_folder, JULES_run_folders = write_site_files(str(tmp_path), sites = ("AT-Neu",),
+                                                             start = "2000-01-01 06:00", freq = "6h",
+                                                             periods = 4 * 365 * 5)
+
+    saved_files = {}
+    for window_export in ["rescale", "slice"]:
+        summary, output_folder = plot_sites(str(tmp_path / window_export), observation_folder, JULES_run_folders,
+                                            window_export = window_export, n_jobs = n_jobs)
+
+        assert summary["plotted"] == ["AT_Neu"]
+        saved_files[window_export] = sorted(listdir(join(output_folder, "AT_Neu")))
+
+    assert saved_files["slice"] == saved_files["rescale"]
+    assert [file_name for file_name in saved_files["slice"] if file_name.endswith(".png")] == \
+        ["AT_Neu_flux_data.png", "AT_Neu_flux_data_2000_2003.png", "AT_Neu_flux_data_2001_2004.png",
+         "AT_Neu_flux_data_2002_2005.png"]
+
+
+def test_invalid_window_export(tmp_path):
+    observation_folder, JULES_run_folders = write_site_files(str(tmp_path))
+
+    with pytest.raises(ValueError):
+        plot_sites(str(tmp_path), observation_folder, JULES_run_folders, window_export = "zoom")
+
+
+def test_site_time_ranges():
+    collated_sites_files = [["AT_Neu"], ["US_Ha1"]]
+
+    assert _get_site_time_ranges(collated_sites_files) == {"AT_Neu": None, "US_Ha1": None}
+    assert _get_site_time_ranges(collated_sites_files, ("2001-01-01", None),
+                                 {"US-Ha1": ["2002-01-01", "2002-06-30"], "DE-Tha": [None, None]}) == \
+        {"AT_Neu": ["2001-01-01", None], "US_Ha1": ["2002-01-01", "2002-06-30"]}
+
+    with pytest.raises(ValueError):
+        _get_site_time_ranges(collated_sites_files, ["2001-01-01"])
+
+    with pytest.raises(ValueError):
+        _get_site_time_ranges(collated_sites_files, site_time_ranges = [["2001-01-01", None]])
+
+
+def test_end_date_includes_the_whole_day(tmp_path):
+    observation_folder, JULES_run_folders = write_site_files(str(tmp_path), sites = ("AT-Neu",))
+    site_files = ["AT_Neu", join(observation_folder, "AT-Neu_Flux.nc"), join(JULES_run_folders[0], "AT_Neu-JULES.nc")]
+
+    # The plotted period runs to the end of the end date
+    assert _get_site_date_range(site_files, ["2000-03-01", "2000-06-30"]) == (date(2000, 3, 1), date(2000, 7, 1))
+    assert _get_site_date_range(site_files, [None, "2000-06-30 12:00"]) == (date(2000, 1, 1), date(2000, 7, 1))
+    assert _get_site_date_range(site_files) == (date(2000, 1, 1), date(2002, 1, 1))
+
+    observation_data, JULES_data = _load_site_data(site_files, ["beta"], time_range = [None, "2000-06-30"])
+    for data in [observation_data] + JULES_data:
+        assert str(data["time"].values[-1]).startswith("2000-06-30T21:00")
+
+    with pytest.raises(ValueError):
+        _get_site_date_range(site_files, ["2005-01-01", None])
+
+
+@pytest.mark.parametrize("window_export", ["rescale", "slice"])
+def test_windows_are_cut_to_the_time_range(tmp_path, window_export):
+    observation_folder, JULES_run_folders = write_site_files(str(tmp_path), sites = ("AT-Neu", "DE-Tha", "US-Ha1"),
+                                                             start = "2000-01-01 06:00", freq = "6h",
+                                                             periods = 4 * 365 * 5)
+
+    summary, output_folder = plot_sites(str(tmp_path), observation_folder, JULES_run_folders,
+                                        window_export = window_export, exclude_sites = ["DE-Tha"],
+                                        time_range = ["2001-03-01", "2004-06-30"],
+                                        site_time_ranges = {"US-Ha1": ["2002-01-01", "2002-12-31"]})
+
+    assert summary["plotted"] == ["AT_Neu", "US_Ha1"]
+    assert not exists(join(output_folder, "DE_Tha"))
+
+    # The windows are named by the whole years they cover
+    assert sorted(file_name for file_name in listdir(join(output_folder, "AT_Neu")) if file_name.endswith(".png")) == \
+        ["AT_Neu_flux_data.png", "AT_Neu_flux_data_2001_2004.png", "AT_Neu_flux_data_2002_2005.png"]
+    assert [file_name for file_name in listdir(join(output_folder, "US_Ha1")) if file_name.endswith(".png")] == \
+        ["US_Ha1_flux_data.png"]
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.data_conversions.rolling_quantiles import rolling_quantiles
+
+
+def make_data_array(n_times = 200, seed = 4):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size = (n_times, 3))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    values[:40, 1] = np.nan
+
+    return xr.DataArray(values, dims = ("time", "pft"), coords = {"time": np.arange(n_times)})
+
+
+@pytest.mark.filterwarnings("ignore:All-NaN slice encountered")
+@pytest.mark.parametrize("window", [1, 4, 7, 30])
+@pytest.mark.parametrize("center", [True, False])
+@pytest.mark.parametrize("min_periods", [1, 3])
+def test_matches_rolling_construct_quantile(window, center, min_periods):
+    data_array = make_data_array()
+    quantiles = [0.5, 0.25, 0.75, 0.]
+
+    # A small block size so the windows are sorted in several blocks
+    data_arrays_out = rolling_quantiles(data_array, window, quantiles, center = center,
+                                        min_periods = min_periods, max_block_size = 50)
+
+    constructed = data_array.rolling(time = window, center = center,
+                                     min_periods = min_periods).construct("window")
+    n_valid = constructed.count("window")
+    for quantile, data_array_out in zip(quantiles, data_arrays_out):
+        expected = constructed.quantile(quantile, dim = "window")
+        expected = expected.where(n_valid >= min_periods)
+
+        assert data_array_out.dims == data_array.dims
+        xr.testing.assert_allclose(data_array_out, expected)
+
+
+def test_rolls_over_the_given_dimension():
+    data_array = make_data_array().transpose("pft", "time")
+
+    data_array_out = rolling_quantiles(data_array, 5, 0.5)[0]
+
+    assert data_array_out.dims == ("pft", "time")
+    expected = data_array.rolling(time = 5, center = True, min_periods = 1).construct("window").median("window")
+    xr.testing.assert_allclose(data_array_out.drop_vars("quantile"), expected)
+
+
+def test_invalid_inputs():
+    data_array = make_data_array()
+
+    with pytest.raises(ValueError):
+        rolling_quantiles(data_array, 0, 0.5)
+
+    with pytest.raises(ValueError):
+        rolling_quantiles(data_array, 5, "median")
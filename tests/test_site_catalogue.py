@@ -0,0 +1,94 @@
+import json
+from os import makedirs, stat, utime
+from os.path import exists, join
+
+import pytest
+
+from JULES_Plotting_and_Analysis.src.site_catalogue import get_site_catalogue, index_site_files
+
+
+def make_folder(folder, file_names):
+    makedirs(folder, exist_ok = True)
+    for file_name in file_names:
+        open(join(folder, file_name), "w").close()
+
+    return folder
+
+
+def touch_folder(folder):
+    # Move the modification time forward, so the change is seen whatever the resolution of the file system
+    mtime_ns = stat(folder).st_mtime_ns + 10 ** 9
+    utime(folder, ns = (mtime_ns, mtime_ns))
+
+
+def test_index_site_files(tmp_path):
+    folder = make_folder(str(tmp_path / "run"), ["AT_Neu-JULES.nc", "AT_Neu-JULES_old.nc", "US-Ha1-JULES.nc",
+                                                "notes.txt"])
+
+    # The first file of each site in sorted order is used, and the site names are normalised
+    assert index_site_files(folder) == {"AT_Neu": join(folder, "AT_Neu-JULES.nc"),
+                                        "US": join(folder, "US-Ha1-JULES.nc")}
+    assert index_site_files(folder, r"^(?P<site>[A-Z]{2}.[A-Za-z0-9]{3})-.*\.nc$")["US_Ha1"] == \
+        join(folder, "US-Ha1-JULES.nc")
+
+    with pytest.raises(ValueError):
+        index_site_files(folder, r"^(.*)\.nc$")
+
+
+def test_saved_index_is_reused_until_the_folder_changes(tmp_path):
+    folder = make_folder(str(tmp_path / "run"), ["AT_Neu-JULES.nc"])
+    index_file = str(tmp_path / "index.json")
+
+    assert index_site_files(folder, index_file = index_file) == {"AT_Neu": join(folder, "AT_Neu-JULES.nc")}
+
+    # Edit the saved index, so it can be told apart from a scan of the folder
+    with open(index_file) as file:
+        indexes = json.load(file)
+    list(indexes.values())[0]["sites"]["DE_Tha"] = "DE_Tha-JULES.nc"
+    with open(index_file, "w") as file:
+        json.dump(indexes, file)
+
+    assert set(index_site_files(folder, index_file = index_file)) == {"AT_Neu", "DE_Tha"}
+
+    # A different file pattern scans the folder again
+    assert set(index_site_files(folder, r"^(?P<site>[^-]+)-JULES\.nc$", index_file = index_file)) == {"AT_Neu"}
+
+    # Adding a file modifies the folder, so the saved index is replaced
+    open(join(folder, "US_Ha1-JULES.nc"), "w").close()
+    touch_folder(folder)
+
+    assert set(index_site_files(folder, index_file = index_file)) == {"AT_Neu", "US_Ha1"}
+    with open(index_file) as file:
+        assert set(list(json.load(file).values())[0]["sites"]) == {"AT_Neu", "US_Ha1"}
+
+
+def test_index_is_not_saved_without_save_index(tmp_path):
+    folder = make_folder(str(tmp_path / "run"), ["AT_Neu-JULES.nc"])
+    index_file = str(tmp_path / "index.json")
+
+    index_site_files(folder, index_file = index_file, save_index = False)
+
+    assert not exists(index_file)
+
+
+def test_invalid_saved_index_is_ignored(tmp_path):
+    folder = make_folder(str(tmp_path / "run"), ["AT_Neu-JULES.nc"])
+    index_file = str(tmp_path / "index.json")
+    with open(index_file, "w") as file:
+        file.write("{not json")
+
+    assert index_site_files(folder, index_file = index_file) == {"AT_Neu": join(folder, "AT_Neu-JULES.nc")}
+
+
+def test_site_catalogue(tmp_path):
+    observation_folder = make_folder(str(tmp_path / "obs"), ["AT-Neu_Flux.nc", "DE-Tha_Flux.nc", "US-Ha1_Flux.nc"])
+    run_folders = [make_folder(str(tmp_path / "run_a"), ["AT_Neu-a.nc", "DE_Tha-a.nc", "US_Ha1-a.nc"]),
+                   make_folder(str(tmp_path / "run_b"), ["AT_Neu-b.nc", "US_Ha1-b.nc"])]
+
+    collated_sites_files = get_site_catalogue(observation_folder, run_folders)
+
+    # Only the sites in every folder
+    assert collated_sites_files == [["AT_Neu", join(observation_folder, "AT-Neu_Flux.nc"),
+                                     join(run_folders[0], "AT_Neu-a.nc"), join(run_folders[1], "AT_Neu-b.nc")],
+                                    ["US_Ha1", join(observation_folder, "US-Ha1_Flux.nc"),
+                                     join(run_folders[0], "US_Ha1-a.nc"), join(run_folders[1], "US_Ha1-b.nc")]]
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.data_conversions.smoothed_daily_value import rolling_mean, to_smoothed_daily_value
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import to_daily_value
+from JULES_Plotting_and_Analysis.src.data_conversions.unit_conversions import convert_daily_units
+from JULES_Plotting_and_Analysis.src.plotting.plot_time_series import smooth_time_series
+from conftest import make_jules_dataset
+
+
+@pytest.mark.parametrize("window", [1, 2, 5, 30])
+def test_rolling_mean_matches_xarray(window):
+    rng = np.random.default_rng(5)
+    values = rng.normal(size = (60, 2, 3))
+    values[rng.random(values.shape) < 0.3] = np.nan
+    values[:10, 0, 0] = np.nan
+
+    data_array = xr.DataArray(values, dims = ("time", "y", "x"))
+    expected = data_array.rolling(time = window, center = True, min_periods = 1).mean()
+
+    np.testing.assert_allclose(rolling_mean(values, window), expected.values)
+
+
+def test_rolling_mean_invalid_window():
+    with pytest.raises(ValueError):
+        rolling_mean(np.arange(10.), 0)
+
+
+@pytest.mark.parametrize("col_key, statistic, kwargs", [
+    ("gpp_gb", "total", {"smoothing": 5, "unit_conversion": "kgC m-2 s-1 -> gC m-2 timestep-1"}),
+    ("gpp_gb", "total", {}),
+    ("psi_leaf_pft", "min", {"smoothing": 4}),
+    ("psi_leaf_pft", "mean", {"smoothing": 5, "smoothing_type": "median", "percentiles": [25, 75]}),
+    ("gpp_gb", "max", {"smoothing": 7, "smoothing_type": "median"})])
+def test_matches_daily_value_then_smoothing(col_key, statistic, kwargs):
+    data_xarray = make_jules_dataset(periods = 48 * 40)
+    data_xarray["gpp_gb"][48 * 3:48 * 5] = np.nan
+
+    data_xarray_out = to_smoothed_daily_value(data_xarray, col_key, statistic, **kwargs)
+
+    # The separate steps, as the plot_daily functions used to run them
+    data_xarray_daily = convert_daily_units(to_daily_value(data_xarray, statistic), col_key,
+                                            kwargs.get("unit_conversion"), data_xarray)
+    expected = smooth_time_series(data_xarray_daily, col_key, smoothing = kwargs.get("smoothing"),
+                                  smoothing_type = kwargs.get("smoothing_type", "mean"),
+                                  percentiles = kwargs.get("percentiles"))
+
+    assert set(data_xarray_out.data_vars) == set(expected.data_vars)
+    for key in expected.data_vars:
+        np.testing.assert_allclose(data_xarray_out[key].transpose(*expected[key].dims).values, expected[key].values)
+    np.testing.assert_array_equal(data_xarray_out["time"].values, expected["time"].values)
+
+
+def test_input_is_unchanged():
+    data_xarray = make_jules_dataset(periods = 48 * 10)
+    data_xarray_copy = data_xarray.copy(deep = True)
+
+    to_smoothed_daily_value(data_xarray, "gpp_gb", "total", smoothing = 3,
+                            unit_conversion = "kgC m-2 s-1 -> gC m-2 timestep-1")
+
+    xr.testing.assert_identical(data_xarray, data_xarray_copy)
+
+
+def test_invalid_smoothing_type():
+    with pytest.raises(ValueError):
+        to_smoothed_daily_value(make_jules_dataset(), "gpp_gb", "total", smoothing = 3, smoothing_type = "mode")
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.data_conversions.streaming_daily_value import stream_daily_values
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import to_daily_statistics, to_daily_value
+
+
+def test_blocks_match_whole_file(jules_file, jules_dataset):
+    daily = stream_daily_values(jules_file, "mean", block_days = 1)
+    expected = to_daily_value(jules_dataset, "mean")
+
+    for key in expected.data_vars:
+        np.testing.assert_allclose(daily[key].transpose(*expected[key].dims).values, expected[key].values)
+
+
+@pytest.mark.parametrize("statistic", ["max", ["total", "min"]])
+def test_output_file_is_written_block_by_block(jules_file, jules_dataset, tmp_path, statistic):
+    output_file = str(tmp_path / "daily.nc")
+
+    with stream_daily_values(jules_file, statistic, block_days = 1, output_file = output_file) as daily:
+        if(type(statistic) == str):
+            expected = to_daily_value(jules_dataset, statistic)
+        else:
+            expected = to_daily_statistics(jules_dataset, statistic)
+
+        np.testing.assert_array_equal(daily["time"].values, expected["time"].values)
+        for key in expected.data_vars:
+            np.testing.assert_allclose(daily[key].transpose(*expected[key].dims).values, expected[key].values)
+
+    # The file holds all the daily values once it is closed
+    with xr.open_dataset(output_file) as daily:
+        assert daily.sizes["time"] == len(expected["time"])
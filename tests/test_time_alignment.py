@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.data_conversions.time_alignment import (clear_time_alignment_cache,
+                                                                             colocate_observations,
+                                                                             get_time_alignment)
+
+
+def make_series(start, periods, freq, values = None):
+    time_values = pd.date_range(start, periods = periods, freq = freq)
+    if(values is None):
+        values = np.arange(periods, dtype = float)
+
+    return xr.Dataset({"value": ("time", values)}, coords = {"time": time_values})
+
+
+@pytest.fixture(autouse = True)
+def empty_cache():
+    clear_time_alignment_cache()
+    yield
+    clear_time_alignment_cache()
+
+
+def test_same_timestep_with_offset():
+    # JULES times label the end of each half hour, the observations the start
+    model = make_series("2000-01-01 00:30", 10, "30min")
+    observations = make_series("2000-01-01 00:00", 10, "30min")
+
+    model_out, observations_out = colocate_observations(model, observations, model_time_offset = -0.5)
+
+    np.testing.assert_array_equal(model_out["time"].values, observations["time"].values)
+    np.testing.assert_array_equal(model_out["value"].values, observations_out["value"].values)
+
+
+def test_averaged_onto_coarser_timestep():
+    model = make_series("2000-01-01 00:00", 48, "30min")
+    observations = make_series("2000-01-01 00:00", 24, "1h")
+
+    model_out, observations_out = colocate_observations(model, observations)
+
+    assert len(model_out["time"]) == 24
+    np.testing.assert_allclose(model_out["value"].values, np.arange(24) * 2 + 0.5)
+    np.testing.assert_array_equal(observations_out["value"].values, np.arange(24))
+
+
+def test_only_shared_period_is_kept():
+    model = make_series("2000-01-01 00:00", 10, "1h")
+    observations = make_series("2000-01-01 05:00", 10, "1h")
+
+    model_out, observations_out = colocate_observations(model, observations)
+
+    np.testing.assert_array_equal(model_out["time"].values, model["time"].values[5:])
+    np.testing.assert_array_equal(observations_out["value"].values, np.arange(5))
+
+
+def test_min_count():
+    values = np.arange(48, dtype = float)
+    values[2] = np.nan
+    model = make_series("2000-01-01 00:00", 48, "30min", values)
+    observations = make_series("2000-01-01 00:00", 24, "1h")
+
+    model_out, observations_out = colocate_observations(model, observations, min_count = 2)
+
+    assert np.isnan(model_out["value"].values[1])
+    assert np.count_nonzero(np.isnan(model_out["value"].values)) == 1
+
+
+def test_no_overlap():
+    model = make_series("2000-01-01", 10, "1h")
+    observations = make_series("2001-01-01", 10, "1h")
+
+    with pytest.raises(ValueError):
+        colocate_observations(model, observations)
+
+
+def test_alignment_is_cached():
+    model_times = pd.date_range("2000-01-01", periods = 1000, freq = "30min").values
+    observation_times = pd.date_range("2000-01-01", periods = 500, freq = "1h").values
+
+    alignment = get_time_alignment(model_times, observation_times, model_time_offset = -0.5)
+
+    assert get_time_alignment(model_times, observation_times, model_time_offset = -0.5) is alignment
+    assert get_time_alignment(model_times, observation_times) is not alignment
+
+
+def test_axes_with_different_gaps_are_cached_separately():
+    model_times = pd.date_range("2000-01-01", periods = 1000, freq = "1h").values
+    observation_times = pd.date_range("2000-01-01", periods = 1000, freq = "1h").values
+
+    # The same number of times, with a gap in a different place
+    first_gap = np.delete(observation_times, 11)
+    second_gap = np.delete(observation_times, 12)
+
+    first_alignment = get_time_alignment(model_times, first_gap)
+    second_alignment = get_time_alignment(model_times, second_gap)
+
+    assert second_alignment is not first_alignment
+    assert second_alignment.observation_bins[11] == 11
+    assert first_alignment.observation_bins[11] == 12
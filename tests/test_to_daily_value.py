@@ -0,0 +1,118 @@
+from datetime import time
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import (DAILY_STATISTICS, to_daily_value,
+                                                                             to_daily_mean, to_daily_total,
+                                                                             to_daily_statistics,
+                                                                             get_daily_statistics_labels,
+                                                                             get_daily_values_at_time)
+from conftest import make_jules_dataset
+
+
+def resample_daily_value(data_xarray, statistic):
+    return getattr(data_xarray.resample(time = "1D"), DAILY_STATISTICS[statistic])()
+
+
+@pytest.mark.parametrize("irregular", [False, True])
+def test_statistics_match_single_statistics(irregular):
+    data_xarray = make_jules_dataset()
+    if(irregular):
+        data_xarray = data_xarray.isel(time = np.delete(np.arange(data_xarray.sizes["time"]), [10, 11]))
+
+    daily = to_daily_statistics(data_xarray, ("total", "max", "std"), quantiles = [0.5])
+
+    assert list(daily["stat"].values) == get_daily_statistics_labels(("total", "max", "std"), [0.5])
+    for statistic in ["total", "max", "std"]:
+        expected = to_daily_value(data_xarray, statistic)
+        for key in data_xarray.data_vars:
+            np.testing.assert_allclose(daily[key].sel(stat = statistic).transpose(*expected[key].dims).values,
+                                       expected[key].values)
+
+    expected = to_daily_value(data_xarray, "quantile", quantile = 0.5)
+    np.testing.assert_allclose(daily["gpp_gb"].sel(stat = "quantile_0.5").values,
+                               expected["gpp_gb"].transpose(*daily["gpp_gb"].sel(stat = "quantile_0.5").dims).values)
+
+
+def test_unknown_statistic():
+    with pytest.raises(ValueError):
+        to_daily_statistics(make_jules_dataset(), "mode")
+
+
+@pytest.mark.parametrize("statistic", list(DAILY_STATISTICS))
+def test_fixed_timestep_matches_resample(statistic):
+    # Partial first and last days, as the times start at 00:30 and end part way through a day
+    data_xarray = make_jules_dataset(start = "2000-01-01 00:30", periods = 48 * 3 + 10)
+
+    # Missing values, including a day with no values for one PFT
+    data_xarray["gpp_gb"][5:20] = np.nan
+    data_xarray["psi_leaf_pft"][47:95, 1] = np.nan
+
+    daily = to_daily_value(data_xarray, statistic)
+    expected = resample_daily_value(data_xarray, statistic)
+
+    np.testing.assert_array_equal(daily["time"].values, expected["time"].values)
+    for key in data_xarray.data_vars:
+        assert daily[key].dims == expected[key].dims
+        np.testing.assert_allclose(daily[key].values, expected[key].values, equal_nan = True)
+
+
+def test_quantile_matches_resample():
+    data_xarray = make_jules_dataset(periods = 48 * 2 + 7)
+    data_xarray["gpp_gb"][3:9] = np.nan
+
+    daily = to_daily_value(data_xarray, "quantile", quantile = 0.25)
+    expected = data_xarray.resample(time = "1D").quantile(0.25)
+
+    for key in data_xarray.data_vars:
+        np.testing.assert_allclose(daily[key].transpose(*expected[key].dims).values, expected[key].values,
+                                   equal_nan = True)
+
+
+def test_irregular_time_steps_are_resampled():
+    data_xarray = make_jules_dataset(periods = 48 * 2)
+    data_xarray = data_xarray.isel(time = np.delete(np.arange(48 * 2), [10, 11, 60]))
+
+    xr.testing.assert_allclose(to_daily_mean(data_xarray), resample_daily_value(data_xarray, "mean"))
+
+
+def test_data_array_input():
+    data_xarray = make_jules_dataset()
+
+    daily = to_daily_total(data_xarray["gpp_gb"])
+
+    assert isinstance(daily, xr.DataArray)
+    np.testing.assert_allclose(daily.values, to_daily_total(data_xarray)["gpp_gb"].values)
+
+
+@pytest.mark.parametrize("statistic", ["total", "max"])
+def test_daily_chunks_match_in_memory(statistic):
+    data_xarray = make_jules_dataset(periods = 48 * 5 + 3)
+    data_xarray["gpp_gb"][60:70] = np.nan
+
+    # Chunks of whole days are reduced one at a time, other chunks are resampled
+    for chunks in [(47 + 48, 48 * 2, 48 + 4), (50, 48 * 5 + 3 - 50)]:
+        daily = to_daily_value(data_xarray.chunk({"time": chunks}), statistic).compute()
+        expected = to_daily_value(data_xarray, statistic)
+        for key in data_xarray.data_vars:
+            xr.testing.assert_allclose(daily[key].transpose(*expected[key].dims), expected[key])
+
+
+@pytest.mark.parametrize("start, periods", [("2000-01-01 00:30", 48 * 10), ("2000-01-01 13:00", 48 * 3 + 5),
+                                            ("2000-01-01 06:00", 48 * 2 + 13)])
+def test_times_of_day_match_selection(start, periods):
+    data_xarray = make_jules_dataset(start = start, periods = periods)
+    times_selected = ["06:00:00", "12:00:00", "12:15:00"]
+
+    # Several times of day are indexed by position for a dataset and selected for a DataArray
+    daily = get_daily_values_at_time(data_xarray, times_selected)
+    for key in data_xarray.data_vars:
+        expected = get_daily_values_at_time(data_xarray[key], times_selected)
+        np.testing.assert_array_equal(daily["time"].values, expected["time"].values)
+        np.testing.assert_array_equal(daily[key].transpose(*expected.dims).values, expected.values)
+
+    # A single time of day
+    daily = get_daily_values_at_time(data_xarray, "12:00:00")
+    np.testing.assert_array_equal(daily["gpp_gb"].values, data_xarray["gpp_gb"].sel(time = time(12)).values)
@@ -0,0 +1,88 @@
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+import xarray as xr
+
+from JULES_Plotting_and_Analysis.src.data_conversions.to_daily_value import to_daily_value
+from JULES_Plotting_and_Analysis.src.data_conversions.unit_conversions import (convert_daily_units,
+                                                                               get_timestep_seconds,
+                                                                               get_unit_scale_factor)
+from JULES_Plotting_and_Analysis.src.plotting.plot_flux_results import plot_flux_data
+from conftest import make_jules_dataset
+
+
+def test_timestep_seconds():
+    assert get_timestep_seconds(make_jules_dataset()) == 30 * 60
+    assert get_timestep_seconds(make_jules_dataset(freq = "1h")) == 60 * 60
+
+
+@pytest.mark.parametrize("freq, seconds", [("30min", 1800), ("3h", 3 * 3600)])
+def test_scale_factors(freq, seconds):
+    data_xarray = make_jules_dataset(freq = freq)
+
+    assert get_unit_scale_factor(data_xarray, "kgC m-2 s-1 -> gC m-2 timestep-1") == pytest.approx(1000. * seconds)
+    assert get_unit_scale_factor(data_xarray, "umol m-2 s-1 -> gC m-2 timestep-1") == \
+        pytest.approx(1e-6 * 12.01 * seconds)
+
+
+def test_unknown_conversion():
+    with pytest.raises(ValueError):
+        get_unit_scale_factor(make_jules_dataset(), "kg -> g")
+
+
+@pytest.mark.parametrize("statistic", ["total", "mean", "max", "min"])
+def test_converting_daily_values_matches_converting_every_time_step(statistic):
+    data_xarray = make_jules_dataset(periods = 48 * 4)
+    unit_conversion = "kgC m-2 s-1 -> gC m-2 timestep-1"
+
+    data_xarray_daily = to_daily_value(data_xarray, statistic)
+    data_xarray_daily_out = convert_daily_units(data_xarray_daily, "gpp_gb", unit_conversion, data_xarray)
+
+    # The conversion as it used to be applied, to every time step of the input
+    data_xarray_converted = data_xarray.copy()
+    data_xarray_converted["gpp_gb"] = data_xarray["gpp_gb"] * 1000. * 1800
+    expected = to_daily_value(data_xarray_converted, statistic)
+
+    xr.testing.assert_allclose(data_xarray_daily_out["gpp_gb"], expected["gpp_gb"])
+    xr.testing.assert_identical(data_xarray_daily_out["psi_leaf_pft"], data_xarray_daily["psi_leaf_pft"])
+
+
+def test_inputs_are_unchanged():
+    data_xarray = make_jules_dataset()
+    data_xarray_daily = to_daily_value(data_xarray, "total")
+    data_xarray_daily_copy = data_xarray_daily.copy(deep = True)
+
+    convert_daily_units(data_xarray_daily, "gpp_gb", "kgC m-2 s-1 -> gC m-2 timestep-1", data_xarray)
+
+    xr.testing.assert_identical(data_xarray_daily, data_xarray_daily_copy)
+    assert convert_daily_units(data_xarray_daily, "gpp_gb", None, data_xarray) is data_xarray_daily
+
+
+def test_plot_flux_data_does_not_convert_the_inputs():
+    data_xarray = make_jules_dataset(periods = 48 * 5)
+    data_xarray["latent_heat"] = data_xarray["gpp_gb"] * 100.
+    data_xarray["fsmc_gb"] = data_xarray["gpp_gb"] / 2.
+    observation_xarray = xr.Dataset({"GPP": data_xarray["gpp_gb"] * 1e3, "Qle": data_xarray["latent_heat"]})
+    data_xarray_copy = data_xarray.copy(deep = True)
+    observation_xarray_copy = observation_xarray.copy(deep = True)
+
+    # Plotting twice must not convert the units twice
+    gpp_lines = []
+    for i in range(2):
+        fig, axs = plot_flux_data(data_xarray, observation_xarray, "run", "blue", "orange", ["beta"])
+        gpp_lines.append([line.get_ydata() for line in axs[0].lines])
+        plt.close(fig)
+
+    xr.testing.assert_identical(data_xarray, data_xarray_copy)
+    xr.testing.assert_identical(observation_xarray, observation_xarray_copy)
+
+    np.testing.assert_allclose(gpp_lines[0][0], to_daily_value(data_xarray, "total")["gpp_gb"].values.ravel()
+                               * 1000. * 1800)
+    np.testing.assert_allclose(gpp_lines[0][1], to_daily_value(observation_xarray, "total")["GPP"].values.ravel()
+                               * 1e-6 * 12.01 * 1800)
+    for line, line_again in zip(gpp_lines[0], gpp_lines[1]):
+        np.testing.assert_array_equal(line, line_again)